@@ -0,0 +1,202 @@
+""" One-pass adaptive Huffman coding (FGK algorithm) for byte sources.
+
+Encoder and decoder start from a tree containing only the NYT ("not yet transmitted") node
+and update it identically after every symbol, so no codebook has to be transmitted.
+A symbol seen for the first time is sent as the code of NYT followed by its 8 raw bits.
+
+The encoded bit stream is packed MSB first, the last byte is padded with zeros.
+The decoder has to be told the number of symbols to decode.
+
+```python
+from adaptiveHuffman import AdaptiveHuffmanCodec
+encoded = AdaptiveHuffmanCodec().encode(b'exeneeeexniqneieinie')
+decoded = AdaptiveHuffmanCodec().decode(encoded, 20)
+```
+"""
+
+# Symbol value of internal nodes and of the NYT node
+_INTERNAL = -1
+_NYT = -2
+
+
+class AdaptiveHuffmanCodec:
+    """
+    FGK adaptive Huffman codec for symbols 0-255.
+
+    Nodes are kept in flat lists indexed by node id.
+    `order` lists the node ids by their implicit node number (index 0 is the lowest number),
+    which the sibling property is maintained on.
+    """
+
+    def __init__(self):
+        self.weight = [0]
+        self.parent = [-1]
+        self.children = [None]
+        self.symbol = [_NYT]
+        self.order = [0]
+        self.position = [0]
+        self.root = 0
+        self.nyt = 0
+        self.leaf = {}
+
+    def _code(self, node):
+        """
+        Get the code of given node, as (bitsize, value)
+        """
+        size = 0
+        value = 0
+        parent = self.parent
+        children = self.children
+        while node != self.root:
+            p = parent[node]
+            if children[p][1] == node:
+                value |= 1 << size
+            size += 1
+            node = p
+        return size, value
+
+    def _add(self, symbol):
+        """
+        Split NYT into a new NYT and a new leaf for `symbol`, return the new leaf.
+        """
+        old = self.nyt
+        nyt, leaf = len(self.weight), len(self.weight) + 1
+        self.weight += [0, 0]
+        self.parent += [old, old]
+        self.children += [None, None]
+        self.symbol += [_NYT, symbol]
+        self.children[old] = (nyt, leaf)
+        self.symbol[old] = _INTERNAL
+        # The new nodes get the lowest numbers
+        self.order[0:0] = [nyt, leaf]
+        self.position += [0, 0]
+        for i, node in enumerate(self.order):
+            self.position[node] = i
+        self.nyt = nyt
+        self.leaf[symbol] = leaf
+        return leaf
+
+    def _swap(self, a, b):
+        """
+        Swap two nodes (with their subtrees) in the tree and in the node order.
+        """
+        parent = self.parent
+        children = self.children
+        pa, pb = parent[a], parent[b]
+        if pa == pb:
+            # Siblings only trade places under their common parent
+            children[pa] = children[pa][::-1]
+        else:
+            ca = children[pa]
+            children[pa] = (b, ca[1]) if ca[0] == a else (ca[0], b)
+            cb = children[pb]
+            children[pb] = (a, cb[1]) if cb[0] == b else (cb[0], a)
+            parent[a], parent[b] = pb, pa
+        order = self.order
+        position = self.position
+        ia, ib = position[a], position[b]
+        order[ia], order[ib] = b, a
+        position[a], position[b] = ib, ia
+
+    def _update(self, node):
+        """
+        Increment the weight of `node` and its ancestors, keeping the sibling property.
+        """
+        weight = self.weight
+        order = self.order
+        position = self.position
+        last = len(order) - 1
+        while node != -1:
+            # Find the highest numbered node in the same weight block
+            w = weight[node]
+            i = position[node]
+            while i < last and weight[order[i + 1]] == w:
+                i += 1
+            leader = order[i]
+            if leader != node and leader != self.parent[node]:
+                self._swap(node, leader)
+            weight[node] = w + 1
+            node = self.parent[node]
+
+    def encode(self, data):
+        """
+        Encode given data.
+
+        :param data: sequence of byte values (bytes, list or array of ints 0-255)
+        :return: byte string
+        """
+        return b''.join(self.encode_streaming(data))
+
+    def encode_streaming(self, data, chunk_size=1 << 16):
+        """
+        Encode given data in streaming fashion.
+
+        :param data: sequence of byte values
+        :param chunk_size: number of bytes to collect before yielding them
+        :return: generator of byte strings
+        """
+        out = bytearray()
+        buffer = 0
+        size = 0
+        for s in data:
+            s = int(s)
+            leaf = self.leaf.get(s)
+            if leaf is None:
+                b, v = self._code(self.nyt)
+                b, v = b + 8, (v << 8) | s
+                leaf = self._add(s)
+            else:
+                b, v = self._code(leaf)
+            buffer = (buffer << b) | v
+            size += b
+            if size >= 64:
+                n = size >> 3
+                size -= n << 3
+                out += (buffer >> size).to_bytes(n, 'big')
+                buffer &= (1 << size) - 1
+                if len(out) >= chunk_size:
+                    yield bytes(out)
+                    out.clear()
+            self._update(leaf)
+        if size > 0:
+            n = (size + 7) >> 3
+            out += (buffer << (n * 8 - size)).to_bytes(n, 'big')
+        if out:
+            yield bytes(out)
+
+    def decode(self, data, count):
+        """
+        Decode given data.
+
+        :param data: encoded byte string
+        :param count: number of symbols to decode
+        :return: list of decoded byte values, fewer than `count` if the data ends early
+        """
+        decoded = []
+        data = iter(data)
+        buffer = 0
+        size = 0
+        children = self.children
+        symbol = self.symbol
+        try:
+            while len(decoded) < count:
+                node = self.root
+                while children[node] is not None:
+                    if size == 0:
+                        buffer = next(data)
+                        size = 8
+                    size -= 1
+                    node = children[node][(buffer >> size) & 1]
+                s = symbol[node]
+                if s == _NYT:
+                    # Raw 8 bits of a new symbol follow the NYT code
+                    s = buffer & ((1 << size) - 1)
+                    buffer = next(data)
+                    s = (s << (8 - size)) | (buffer >> size)
+                    node = self._add(s)
+                decoded.append(s)
+                self._update(node)
+        except StopIteration:
+            # Truncated data: stop at the end like the static Huffman decoder, the symbol cut off is dropped
+            pass
+        return decoded
@@ -0,0 +1,177 @@
+'''
+理论计算模块
+
+在二元对称信道 BSC(p) 上，由闭式计算信道解码后的误码率，以及由 PMF 计算信源编码的平均码长，
+参数扫描时可以直接给出期望值而不必仿真，也可用来检验仿真结果。
+
+重复码：每个码字对应一个信息比特，多数判决出错的概率为二项分布的尾部概率。
+码字长度为偶数时，票数相等判为 0，按信息比特等概计一半。
+
+线性分组码（汉明码及其扩展码、缩短码）按 channelDecoder 的伴随式查表解码计算，结果是精确的。
+设 e 为错误图样，s 为伴随式，信息位 j 解码后出错当且仅当 e_j 与“查表得到的出错位置为 j”恰有一个成立，
+查表得到位置 j 的伴随式只有 H 的第 j 列 h_j，因此
+    P_j = p + Pr(s = h_j) - 2·p·Pr(除第 j 位以外的错误的伴随式为 0)
+伴随式的分布为 E[(-1)^(u·s)] = (1-2p)^w(u·H) 的 Walsh-Hadamard 变换，u 取遍 2^(n-k) 个向量，
+w(u·H) 为对偶码码字的重量，计算量只取决于校验位数，与 2^k 个码字无关。
+'''
+
+from math import comb
+from numpy import arange, zeros, dot, log2, float64, int64, intp
+
+from linearCodes import hamming
+from byteSource import ganExtend
+from byteSourceEncoder import codec_from_pmf
+from pipeline import pmf_csv
+
+# 每次计算 u·H 的行数，限制中间数组的大小
+ROWS_PER_BLOCK = 1 << 9
+
+
+def repetition_error(n, p):
+    '''
+    重复码解码后的误码率
+
+    Args:
+        n (int): 码字长度
+        p (float): 信道错误概率
+    Returns:
+        (float): 信息比特出错的概率，也是码字解码出错的概率
+    '''
+    P = sum(comb(n, i) * p ** i * (1 - p) ** (n - i) for i in range(n // 2 + 1, n + 1))
+    if n % 2 == 0:
+        P += comb(n, n // 2) * (p * (1 - p)) ** (n // 2) / 2
+    return P
+
+
+def _parity_table(r):
+    '''
+    0 到 2^r-1 每个整数二进制中 1 的个数的奇偶性
+    '''
+    u = arange(1 << r)
+    parity = zeros(1 << r, dtype=int64)
+    for bit in range(r):
+        parity ^= (u >> bit) & 1
+    return parity
+
+
+def _walsh_hadamard(f):
+    '''
+    Walsh-Hadamard 变换 F(s) = Σ_u (-1)^(u·s) f(u)，u·s 为二进制按位与后 1 的个数
+    '''
+    f = f.astype(float64)
+    h = 1
+    while h < len(f):
+        a = f.reshape(-1, 2, h)
+        x = a[:, 0, :].copy()
+        a[:, 0, :] += a[:, 1, :]
+        a[:, 1, :] = x - a[:, 1, :]
+        h *= 2
+    return f
+
+
+def linear_error(code, p):
+    '''
+    系统线性分组码按伴随式查表纠正单个错误时，解码后的误码率
+
+    Args:
+        code (LinearCode): 线性分组码
+        p (float): 信道错误概率
+    Returns:
+        P_bit (float): 信息比特出错的平均概率
+        P_block (float): 错误图样不能被纠正（码字解码出错）的概率
+    '''
+    n, k = code.n, code.k
+    r = n - k
+    parity = _parity_table(r)
+    h = dot(code.H.T.astype(int64), code.weights)
+    u = arange(1 << r)
+    rho = 1 - 2 * p
+
+    # 对偶码码字 u·H 的重量，以及信息位上 u·h_j 的取值与 rho^(w-1) - rho^w 的乘积
+    W = zeros(1 << r, dtype=intp)
+    for i in range(0, 1 << r, ROWS_PER_BLOCK):
+        W[i:i + ROWS_PER_BLOCK] = parity[u[i:i + ROWS_PER_BLOCK, None] & h].sum(axis=1)
+    a = rho ** W.astype(float64)
+    b = rho ** (W - 1).clip(min=0).astype(float64) - a
+    bD = zeros(k)
+    for i in range(0, 1 << r, ROWS_PER_BLOCK):
+        bD += dot(b[i:i + ROWS_PER_BLOCK], parity[u[i:i + ROWS_PER_BLOCK, None] & h[:k]])
+
+    # 伴随式的分布，以及去掉第 j 位后伴随式为 0 的概率
+    Pr_s = _walsh_hadamard(a) / (1 << r)
+    Pr_zero = (a.sum() + bD) / (1 << r)
+
+    # 只有查表能得到位置 j 的信息位才会被纠正
+    info = arange(k)
+    corrected = code.syndrome_table[h[:k]] == info
+    P_j = p + corrected * (Pr_s[h[:k]] - 2 * p * Pr_zero)
+    correctable = int((code.syndrome_table >= 0).sum())
+    P_block = 1 - (1 - p) ** n - correctable * p * (1 - p) ** (n - 1)
+    return float(P_j.mean()), max(float(P_block), 0.0)
+
+
+def channel_error(code, p):
+    '''
+    由命令行中的信道编码参数计算解码后的误码率
+
+    Args:
+        code (tuple): 信道编码方式及参数，与 channelEncoder 相同，如 ('-r', 3)、('-h', 7)
+        p (float): 信道错误概率
+    Returns:
+        (tuple): 信息比特出错的概率和码字解码出错的概率，没有闭式时为 None
+    '''
+    method, *params = code
+    if method == '-r':
+        P = repetition_error(params[0], p)
+        return P, P
+    if method == '-l':
+        return linear_error(hamming(params[0] if params[0] in (3, 4) else 5), p)
+    if method in ('-h', '-H'):
+        return linear_error(hamming(params[0], method == '-H', params[1] if len(params) > 1 else None), p)
+    return None
+
+
+def average_length(P, lengths):
+    '''
+    由信源的概率分布计算平均码长
+
+    Args:
+        P (array): 长度为 256 的字节概率分布
+        lengths (array): 长度为 256 的码字长度
+    Returns:
+        (float): 平均码长（码字数据比特/信源字节）
+    '''
+    return float(dot(P, lengths))
+
+
+def huffman_lengths(pmf_bytes):
+    '''
+    由 PMF 文件内容构建霍夫曼码书，得到各符号的码字长度，码书与 byteSourceEncoder 共用缓存
+
+    Args:
+        pmf_bytes (bytes): PMF 文件内容
+    Returns:
+        (array): 长度为 256 的码字长度，不在码书中的符号为 0
+    '''
+    lengths = zeros(256)
+    for symbol, (word_len, word) in codec_from_pmf(pmf_bytes).get_code_table().items():
+        lengths[symbol] = word_len
+    return lengths
+
+
+def source_coding(P0):
+    '''
+    按 P0 的八次扩展构建的霍夫曼码的期望性能
+
+    Args:
+        P0 (float): 数据比特概率分布
+    Returns:
+        H (float): 信源熵（信息比特/字节）
+        L (float): 平均码长（码字数据比特/信源字节）
+        efficiency (float): 编码效率 H/L
+    '''
+    P = ganExtend(P0)
+    nonzero = P[P > 0]
+    H = float(-dot(nonzero, log2(nonzero)))
+    L = average_length(P, huffman_lengths(pmf_csv(P0)))
+    return H, L, H / L
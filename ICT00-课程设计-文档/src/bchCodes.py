@@ -0,0 +1,297 @@
+'''
+BCH 码模块
+
+码长 n = 2^m - 1、可纠正 t 个错误的二元本原 BCH 码，例如 (31,21)、(63,51)、(255,239) 均为 t = 2。
+生成多项式 g(x) 为 α, α^2, ..., α^2t 的极小多项式的最小公倍式，其中 α 为 GF(2^m) 的本原元。
+
+编码为系统码：码字依次为 k 位信息位和 n-k 位校验位，信息位对应 x^(n-1) 至 x^(n-k) 的系数，
+校验位为 m(x)·x^(n-k) 除以 g(x) 的余式，与 CRC 相同，按字节查表计算，所有码字同时计算。
+余式寄存器左对齐存放在若干个 64 位字中，因此 n-k 小于 8 或大于 64 时同样适用。
+
+解码时先用同一张表计算接收码字除以 g(x) 的余式，余式为 0 的码字无错，
+其余码字计算伴随式，再由 Berlekamp-Massey 算法求错误位置多项式，Chien 搜索求出错误位置并纠正。
+错误个数超过 t 时不纠正。
+'''
+
+from functools import lru_cache
+from numpy import (zeros, ones, hstack, packbits, unpackbits, arange, nonzero, array, where, take_along_axis, concatenate,
+                   uint8, uint64, int64)
+
+# GF(2^m) 的本原多项式，第 i 位为 x^i 的系数
+PRIMITIVE_POLY = {3: 0b1011, 4: 0b10011, 5: 0b100101, 6: 0b1000011, 7: 0b10001001,
+                  8: 0b100011101, 9: 0b1000010001, 10: 0b10000001001}
+
+
+class BCHCode:
+    '''
+    (n, k) 二元本原 BCH 码
+
+    Attributes:
+        m (int): 有限域 GF(2^m) 的次数
+        t (int): 可纠正的错误个数
+        n (int): 码字长度
+        k (int): 信息组长度
+        g (int): 生成多项式，第 i 位为 x^i 的系数
+        exp (list): α 的幂表，长度为 2n
+        log (list): 对数表，log[α^i] = i
+        exp_arr (array): 数组形式的幂表
+        log_arr (array): 数组形式的对数表，log_arr[0] 无意义
+        words (int): 余式寄存器的 64 位字数
+        crc_table (array): 按字节计算余式的查找表，每行为左对齐的 words 个字
+        syndrome_table (array): 由余式按字节计算伴随式的查找表
+    '''
+
+    def __init__(self, m, t):
+        '''
+        构造 BCH 码
+
+        Args:
+            m (int): 有限域 GF(2^m) 的次数
+            t (int): 可纠正的错误个数
+        '''
+        if m not in PRIMITIVE_POLY:
+            raise ValueError('BCH 码的 m 应在 %d 到 %d 之间' % (min(PRIMITIVE_POLY), max(PRIMITIVE_POLY)))
+        if t < 1:
+            raise ValueError('BCH 码的 t 应至少为 1')
+        n = (1 << m) - 1
+        self.m = m
+        self.t = t
+        self.n = n
+
+        # GF(2^m) 的幂表和对数表
+        self.exp = [0] * (2 * n)
+        self.log = [0] * (n + 1)
+        a = 1
+        for i in range(n):
+            self.exp[i] = self.exp[i + n] = a
+            self.log[a] = i
+            a <<= 1
+            if a >> m:
+                a ^= PRIMITIVE_POLY[m]
+        self.exp_arr = array(self.exp, dtype=int64)
+        self.log_arr = array(self.log, dtype=int64)
+
+        # 生成多项式为 α^1 ... α^2t 所在分圆陪集的极小多项式之积
+        g = 1
+        done = set()
+        for j in range(1, 2 * t + 1):
+            if j in done:
+                continue
+            coset = []
+            # t 很大时 j 可能不小于 n，α^j = α^(j mod n)
+            c = j % n
+            while c not in coset:
+                coset.append(c)
+                c = c * 2 % n
+            done.update(coset)
+            g = _mul_binary(g, self._minimal_poly(coset))
+        self.g = g
+        self.k = n - (g.bit_length() - 1)
+        if self.k <= 0:
+            raise ValueError('不存在 n = %d, t = %d 的 BCH 码' % (n, t))
+        r = n - self.k
+
+        # crc_table[i] = (i·x^r) mod g(x)，左移 shift 位使最高位与寄存器最高位对齐
+        self.words = -(-max(r, 8) // 64)
+        shift = 64 * self.words - r
+        table = zeros((256, self.words), dtype=uint64)
+        for i in range(256):
+            v = i << r
+            for bit in range(r + 7, r - 1, -1):
+                if v >> bit & 1:
+                    v ^= g << (bit - r)
+            v <<= shift
+            for w in range(self.words):
+                table[i, w] = v >> (64 * (self.words - 1 - w)) & 0xFFFFFFFFFFFFFFFF
+        self.crc_table = table
+
+        # syndrome_table[b][v] 为余式第 b 个字节为 v 时对 2t 个伴随式的贡献，余式第 i 位对 S_j 的贡献为 α^(-j(i+1))
+        j = arange(1, 2 * t + 1)
+        contribution = self.exp_arr[(-j[None, :] * (arange(self.words * 64)[:, None] + 1)) % n]
+        contribution[r:] = 0
+        value = arange(256)
+        self.syndrome_table = zeros((-(-r // 8), 256, 2 * t), dtype=int64)
+        for b in range(len(self.syndrome_table)):
+            for q in range(8):
+                self.syndrome_table[b] ^= ((value >> (7 - q)) & 1)[:, None] * contribution[b * 8 + q]
+
+    def _minimal_poly(self, coset):
+        '''
+        求分圆陪集对应的极小多项式 ∏(x + α^c)，系数均为 0 或 1
+
+        Returns:
+            (int): 极小多项式，第 i 位为 x^i 的系数
+        '''
+        poly = [1]
+        for c in coset:
+            # poly(x)·(x + α^c)
+            a = self.exp[c]
+            shifted = [0] + poly
+            for i, p in enumerate(poly):
+                shifted[i] ^= self.mul(p, a)
+            poly = shifted
+        return sum(p << i for i, p in enumerate(poly))
+
+    def mul(self, a, b):
+        '''
+        GF(2^m) 中的乘法
+        '''
+        if a == 0 or b == 0:
+            return 0
+        return self.exp[self.log[a] + self.log[b]]
+
+    def remainder(self, bits_mat):
+        '''
+        按字节查表计算每行多项式乘以 x^(n-k) 后除以 g(x) 的余式，与 CRC 相同
+
+        Args:
+            bits_mat (array): 每行为一个多项式的系数，从最高次开始
+        Returns:
+            (array): 每行 n-k 位余式的比特矩阵，从最高次开始
+        '''
+        r = self.n - self.k
+        # 前面补 0 使每行为整数个字节，不改变余式
+        pad = -bits_mat.shape[1] % 8
+        if pad:
+            bits_mat = hstack((zeros((len(bits_mat), pad), dtype=uint8), bits_mat))
+        data = packbits(bits_mat, axis=1).astype(uint64)
+
+        # 寄存器左对齐，第 0 个字为最高位，移出的最高字节与输入字节一起查表
+        R = zeros((len(bits_mat), self.words), dtype=uint64)
+        for b in range(data.shape[1]):
+            idx = (R[:, 0] >> uint64(56)) ^ data[:, b]
+            R[:, :-1] = (R[:, :-1] << uint64(8)) | (R[:, 1:] >> uint64(56))
+            R[:, -1] <<= uint64(8)
+            R ^= self.crc_table[idx]
+        return unpackbits(R.astype('>u8').view(uint8), axis=1)[:, :r]
+
+    def encode(self, BS_mat):
+        '''
+        系统编码
+
+        Args:
+            BS_mat (array): 每行 k 个信息位的比特矩阵
+        Returns:
+            (array): 每行一个码字的比特矩阵
+        '''
+        return hstack((BS_mat, self.remainder(BS_mat)))
+
+    def syndromes(self, R):
+        '''
+        由余式计算伴随式 S_j = c(α^j)，j = 1 ... 2t
+
+        remainder 得到的余式为 c(x)·x^(n-k) mod g(x)，α^j 是 g(x) 的根，
+        因此 S_j = R(α^j)·α^(-j(n-k))，按字节查 syndrome_table 计算
+
+        Args:
+            R (array): 每行为 remainder 得到的 n-k 位余式
+        Returns:
+            (array): 每行 2t 个伴随式
+        '''
+        data = packbits(R, axis=1)
+        S = zeros((len(R), 2 * self.t), dtype=int64)
+        for b in range(data.shape[1]):
+            S ^= self.syndrome_table[b][data[:, b]]
+        return S
+
+    def gf_mul(self, a, b):
+        '''
+        GF(2^m) 中的逐元素乘法，a、b 为同形状（或可广播）的整数数组
+        '''
+        product = self.exp_arr[self.log_arr[a] + self.log_arr[b]]
+        return where((a == 0) | (b == 0), 0, product)
+
+    def error_positions(self, S):
+        '''
+        由伴随式求错误位置（Berlekamp-Massey 算法和 Chien 搜索），所有码字同时计算
+
+        Args:
+            S (array): 每行 2t 个伴随式
+        Returns:
+            rows (array): 出错比特所在的行
+            cols (array): 出错比特在码字中的下标，错误个数超过 t 的码字不纠正
+        '''
+        n = self.n
+        t = self.t
+        N = len(S)
+        width = 2 * t + 1
+        degree = arange(width)
+
+        # Berlekamp-Massey 算法，每行为一个码字的错误位置多项式 Λ(x) 的系数，次数不超过 L
+        C = zeros((N, width), dtype=int64)
+        C[:, 0] = 1
+        B = C.copy()
+        L = zeros(N, dtype=int64)
+        b = ones(N, dtype=int64)
+        shift = ones(N, dtype=int64)
+        for i in range(2 * t):
+            # 二元码的 S_2j = S_j^2，奇数步（i 为奇数）的差值恒为 0
+            if i % 2:
+                shift += 1
+                continue
+            d = S[:, i].copy()
+            for j in range(1, i + 1):
+                d ^= self.gf_mul(C[:, j], S[:, i - j])
+
+            # C(x) -= d/b · x^shift · B(x)，d 为 0 的行不变
+            coef = where(d == 0, 0, self.exp_arr[(self.log_arr[d] - self.log_arr[b]) % n])
+            src = degree - shift[:, None]
+            B_shifted = where(src >= 0, take_along_axis(B, src.clip(min=0), axis=1), 0)
+            T = C
+            C = C ^ self.gf_mul(coef[:, None], B_shifted)
+
+            grow = (d != 0) & (2 * L <= i)
+            L = where(grow, i + 1 - L, L)
+            B = where(grow[:, None], T, B)
+            b = where(grow, d, b)
+            shift = where(grow, 1, shift + 1)
+
+        # L = 1 时 Λ(x) = 1 + C_1·x，唯一的根为 α^-e，e = log C_1
+        single = nonzero((L == 1) & (C[:, 1] != 0))[0]
+        single_cols = self.log_arr[C[single, 1]]
+
+        # 其余的码字用 Chien 搜索：x^e 的系数出错时 Λ(α^-e) = 0，只对 L 不超过 t 的码字计算
+        candidates = nonzero((L > 1) & (L <= t))[0]
+        logC = self.log_arr[C[candidates, :t + 1]]
+        zero = C[candidates, :t + 1] == 0
+        e = arange(n)
+        value = zeros((len(candidates), n), dtype=int64)
+        for j in range(t + 1):
+            term = self.exp_arr[logC[:, j, None] + (-j * e) % n]
+            term[zero[:, j]] = 0
+            value ^= term
+        roots = value == 0
+
+        # 根的个数与 L 相等时才能纠正
+        ok = roots.sum(axis=1) == L[candidates]
+        rows, e = nonzero(roots & ok[:, None])
+        rows = concatenate((single, candidates[rows]))
+        cols = n - 1 - concatenate((single_cols, e))
+        return rows, cols
+
+
+@lru_cache(maxsize=None)
+def bch(m, t):
+    '''
+    获取 BCH 码，构造一次后缓存
+
+    Args:
+        m (int): 有限域 GF(2^m) 的次数
+        t (int): 可纠正的错误个数
+    Returns:
+        (BCHCode): BCH 码
+    '''
+    return BCHCode(m, t)
+
+
+def _mul_binary(a, b):
+    '''
+    二元多项式乘法（无进位乘法）
+    '''
+    p = 0
+    while b:
+        if b & 1:
+            p ^= a
+        a <<= 1
+        b >>= 1
+    return p
@@ -0,0 +1,241 @@
+'''
+性能测试模块
+
+对各命令行程序的每个环节分别计时：信源生成、信道、霍夫曼编码/解码、重复码和汉明码的编码/解码以及各计算程序，
+在给定的信源长度（1 KB 至 1 GB）与 P0、p 的各种组合上运行，结果写入 JSON 文件，便于比较优化前后的结果。
+
+每个环节直接调用对应程序的 main（与命令行相同，包括读写文件），在单独启动的子进程中运行，
+因此峰值内存（peak RSS）只包含该环节本身；子进程导入模块后的内存记为 baseline。
+每个环节重复运行 repeat 次，记录每次调用的延时，吞吐量为信源字节数除以延时的中位数。
+某个环节出错（例如缺少依赖的库）时记录错误信息，不影响其他环节。
+
+不支持 resource 模块的系统（Windows）不记录峰值内存。
+'''
+
+import json
+import platform
+from sys import argv, executable, version
+from os import cpu_count
+from time import perf_counter, strftime
+from statistics import median
+from tempfile import TemporaryDirectory
+from pathlib import Path
+from multiprocessing import get_context
+from importlib import import_module
+import numpy
+
+from pipeline import pmf_csv
+
+try:
+    from resource import getrusage, RUSAGE_SELF
+except ImportError:
+    getrusage = None
+
+# 各环节依次运行，后面的环节使用前面环节的输出文件
+STAGES = ['byteSource', 'byteSource_calc', 'huffman_encode', 'huffman_decode', 'codding_effect',
+          'repeat_encode', 'byteChannel', 'repeat_decode', 'byteChannel_calc', 'channelCoder_calc',
+          'hamming_encode', 'hamming_decode']
+
+# 默认参数
+SIZES = [1 << 10, 1 << 20]
+P0S = [0.9]
+PS = [0.01]
+RUNS = 3
+REPEAT_N = 3
+HAMMING_M = 7
+
+# 长度的单位
+UNITS = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+
+
+def parse_size(text):
+    '''
+    解析信源长度，可以带 K、M、G 后缀，如 64K、1M
+    '''
+    text = text.strip().upper().rstrip('B')
+    if text and text[-1] in UNITS:
+        return int(float(text[:-1]) * UNITS[text[-1]])
+    return int(text)
+
+
+def stage_argv(stage, files, P0, p):
+    '''
+    得到一个环节调用的模块及其命令行参数
+
+    Args:
+        stage (str): 环节名称，见 STAGES
+        files (dict): 各中间文件的路径
+        P0 (float): 数据比特概率分布
+        p (float): 信道错误概率
+    Returns:
+        module (str): 模块名
+        args (list): 命令行参数，不包括程序名
+    '''
+    f = files
+    return {
+        'byteSource': ('byteSource', [P0, f['size'], f['source']]),
+        'byteSource_calc': ('byteSource_calc', [f['source'], f['source_csv']]),
+        'huffman_encode': ('byteSourceEncoder', [f['pmf'], f['source'], f['source_encoded']]),
+        'huffman_decode': ('byteSourceDecoder', [f['source_encoded'], f['source_decoded']]),
+        'codding_effect': ('codding_effect', [f['source'], f['source_encoded'], f['coding_csv']]),
+        'repeat_encode': ('channelEncoder', ['-r', f['source'], f['repeat_encoded'], REPEAT_N]),
+        'byteChannel': ('byteChannel', [f['repeat_encoded'], 1 - p, f['channel_output'], 1]),
+        'repeat_decode': ('channelDecoder', [f['channel_output'], f['repeat_decoded']]),
+        'byteChannel_calc': ('byteChannel_calc', [f['repeat_encoded'], f['channel_output'], f['channel_csv']]),
+        'channelCoder_calc': ('channelCoder_calc', [f['source'], f['repeat_encoded'], f['repeat_decoded'], f['channel_coder_csv']]),
+        'hamming_encode': ('channelEncoder', ['-h', f['source'], f['hamming_encoded'], HAMMING_M]),
+        'hamming_decode': ('channelDecoder', [f['hamming_encoded'], f['hamming_decoded']]),
+    }[stage]
+
+
+def peak_rss():
+    '''
+    当前进程的峰值内存（MB），不支持时为 None
+    '''
+    if getrusage is None:
+        return None
+    # Linux 下单位为 KB，macOS 下为字节
+    scale = 1 << 20 if platform.system() == 'Darwin' else 1 << 10
+    return getrusage(RUSAGE_SELF).ru_maxrss / scale
+
+
+def run_stage(stage, files, P0, p, repeat):
+    '''
+    在子进程中运行一个环节 repeat 次
+
+    Returns:
+        (dict): 每次调用的延时、峰值内存与导入模块后的内存，出错时为错误信息
+    '''
+    module, args = stage_argv(stage, files, P0, p)
+    args = [str(a) for a in args]
+    try:
+        module = import_module(module)
+        # byteChannel_calc 的 main 由 argparse 读取 sys.argv，直接调用 workflow
+        if module.__name__ == 'byteChannel_calc':
+            call = lambda: module.workflow(*args)
+        else:
+            call = lambda: module.main([module.__name__ + '.py'] + args)
+        baseline = peak_rss()
+        latencies = []
+        for i in range(repeat):
+            start = perf_counter()
+            call()
+            latencies.append(perf_counter() - start)
+    except Exception as e:
+        return {'error': '%s: %s' % (type(e).__name__, e)}
+    return {'latencies': latencies, 'peak_rss_MB': peak_rss(), 'baseline_rss_MB': baseline}
+
+
+def benchmark(sizes=SIZES, P0s=P0S, ps=PS, repeat=RUNS, stages=STAGES):
+    '''
+    对每种信源长度、P0、p 的组合运行各环节
+
+    Args:
+        sizes (list): 信源长度（字节）
+        P0s (list): 数据比特概率分布
+        ps (list): 信道错误概率
+        repeat (int): 每个环节的重复次数
+        stages (list): 需要计时的环节，依赖的环节仍会运行一次但不计时
+    Returns:
+        (dict): 运行环境与各环节的结果
+    '''
+    results = []
+    context = get_context('spawn')
+    for size in sizes:
+        for P0 in P0s:
+            for p in ps:
+                with TemporaryDirectory() as tmp:
+                    names = ['source', 'source_encoded', 'source_decoded', 'repeat_encoded', 'channel_output',
+                             'repeat_decoded', 'hamming_encoded', 'hamming_decoded']
+                    files = {name: str(Path(tmp) / (name + '.dat')) for name in names}
+                    for name in ('source_csv', 'coding_csv', 'channel_csv', 'channel_coder_csv'):
+                        files[name] = str(Path(tmp) / (name + '.csv'))
+                    files['pmf'] = str(Path(tmp) / 'pmf.csv')
+                    files['size'] = size
+                    Path(files['pmf']).write_bytes(pmf_csv(P0))
+
+                    for stage in STAGES:
+                        n = repeat if stage in stages else 1
+                        # 每个环节使用新的子进程，峰值内存互不影响
+                        with context.Pool(1) as pool:
+                            result = pool.apply(run_stage, (stage, files, P0, p, n))
+                        if stage not in stages:
+                            continue
+                        row = {'stage': stage, 'size': size, 'P0': P0, 'p': p, 'repeat': n}
+                        if 'error' in result:
+                            row['error'] = result['error']
+                        else:
+                            latency = median(result['latencies'])
+                            row.update({
+                                'latency_min': min(result['latencies']),
+                                'latency_median': latency,
+                                'latency_mean': sum(result['latencies']) / n,
+                                'MBps': size / (1 << 20) / latency if latency > 0 else None,
+                                'peak_rss_MB': result['peak_rss_MB'],
+                                'baseline_rss_MB': result['baseline_rss_MB'],
+                            })
+                        results.append(row)
+
+    return {
+        'meta': {
+            'time': strftime('%Y-%m-%d %H:%M:%S'),
+            'python': version.split()[0],
+            'numpy': numpy.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': cpu_count(),
+            'executable': executable,
+        },
+        'results': results,
+    }
+
+
+def compare(old, new):
+    '''
+    比较两次运行的结果
+
+    Args:
+        old (dict): 之前的结果
+        new (dict): 新的结果
+    Returns:
+        (list): 每行为 (环节, 信源长度, P0, p, 之前的延时, 新的延时, 加速比)
+    '''
+    def key(row):
+        return row['stage'], row['size'], row['P0'], row['p']
+
+    before = {key(row): row for row in old['results'] if 'error' not in row}
+    rows = []
+    for row in new['results']:
+        if 'error' in row or key(row) not in before:
+            continue
+        t0 = before[key(row)]['latency_median']
+        t1 = row['latency_median']
+        rows.append(key(row) + (t0, t1, t0 / t1 if t1 > 0 else None))
+    return rows
+
+
+def main(argv):
+    # 参数列表：
+    #   OUTPUT [sizes] [P0s] [ps] [repeat] [stages]   运行并写入 JSON 文件，各列表以逗号分隔，长度可带 K、M、G 后缀
+    #   -c OLD NEW                                      比较两次运行的结果
+    if argv[1] == '-c':
+        with open(argv[2]) as f_old, open(argv[3]) as f_new:
+            rows = compare(json.load(f_old), json.load(f_new))
+        for stage, size, P0, p, t0, t1, speedup in rows:
+            print('%-18s %12d  P0=%-5g p=%-7g %10.4fs -> %10.4fs  x%.2f' % (stage, size, P0, p, t0, t1, speedup))
+        return
+
+    OUTPUT = argv[1]
+    sizes = [parse_size(s) for s in argv[2].split(',')] if len(argv) > 2 else SIZES
+    P0s = [float(s) for s in argv[3].split(',')] if len(argv) > 3 else P0S
+    ps = [float(s) for s in argv[4].split(',')] if len(argv) > 4 else PS
+    repeat = int(argv[5]) if len(argv) > 5 else RUNS
+    stages = argv[6].split(',') if len(argv) > 6 else STAGES
+
+    report = benchmark(sizes, P0s, ps, repeat, stages)
+    with open(OUTPUT, 'w') as out_file:
+        json.dump(report, out_file, indent=2)
+
+
+if __name__ == '__main__':
+    main(argv)
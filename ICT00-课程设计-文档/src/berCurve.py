@@ -0,0 +1,194 @@
+'''
+误码率曲线模块
+
+对一种信道编码在多个信道错误概率 p（或 BPSK 硬判决下的 Eb/N0）上用蒙特卡罗方法估计解码后的误码率。
+每个点分块运行 随机信息比特 → channelEncoder → 二元对称信道 → channelDecoder，
+误码数达到目标值，或误码率置信区间的相对半宽小于目标值，或比特数达到上限时停止，
+因此 p 小时不会因固定长度而估计为 0，p 大时也不会做多余的运算。各点在进程池中并行运行。
+
+文件头作为边信息不经过信道，只有编码后的数据受噪声影响。
+置信区间为二项分布的 Wilson 区间；解码后的误码往往成组出现，区间只作为停止条件的参考。
+有闭式的编码（重复码、汉明码）同时给出 analytic 模块的理论值，以及理论值是否落在置信区间内。
+'''
+
+from sys import argv
+from math import erfc, sqrt
+from os import cpu_count
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor
+from numpy import random, unpackbits, concatenate, count_nonzero, zeros, uint8
+
+from channelEncoder import channel_encode
+from channelDecoder import channel_decode
+from pipeline import parse_code, code_rate, write_row
+from analytic import channel_error
+
+# 输出 CSV 文件的列
+COLUMNS = ['code', 'code_rate', 'EbN0_dB', 'p', 'bits', 'errors', 'BER', 'BER_low', 'BER_high', 'chunks', 'stop', 'time',
+           'BER_theory', 'theory_in_ci']
+
+# 每块的信息字节数
+CHUNK_BYTES = 1 << 16
+
+# 默认的停止条件
+TARGET_ERRORS = 100
+MAX_BITS = 1 << 28
+
+# 95% 置信区间
+Z = 1.96
+
+
+def wilson_interval(errors, bits, z=Z):
+    '''
+    误码率的 Wilson 置信区间
+
+    Args:
+        errors (int): 误码数
+        bits (int): 比特数
+        z (float): 标准正态分布的分位数
+    Returns:
+        (tuple): 置信区间的下限和上限
+    '''
+    if bits == 0:
+        return 0.0, 1.0
+    ber = errors / bits
+    denominator = 1 + z * z / bits
+    center = (ber + z * z / (2 * bits)) / denominator
+    half = z * sqrt(ber * (1 - ber) / bits + z * z / (4 * bits * bits)) / denominator
+    return max(center - half, 0.0), min(center + half, 1.0)
+
+
+def p_from_snr(EbN0_dB, rate):
+    '''
+    BPSK 调制、AWGN 信道硬判决时的比特错误概率，每个编码比特的能量为 rate·Eb
+
+    Args:
+        EbN0_dB (float): 每个信息比特的信噪比 Eb/N0（dB）
+        rate (float): 码率
+    Returns:
+        (float): 二元对称信道的错误概率 p
+    '''
+    return 0.5 * erfc(sqrt(rate * 10 ** (EbN0_dB / 10)))
+
+
+def simulate_point(code, p, seed=None, target_errors=TARGET_ERRORS, ci=None, max_bits=MAX_BITS,
+                   chunk_bytes=CHUNK_BYTES, EbN0_dB=None):
+    '''
+    估计一个点的解码后误码率
+
+    Args:
+        code (tuple): 信道编码方式及参数，与 channelEncoder 相同，如 ('-r', 3)
+        p (float): 二元对称信道的错误概率，给出 EbN0_dB 时由其计算
+        seed (int): 随机数种子
+        target_errors (int): 误码数达到该值时停止
+        ci (float): 置信区间的相对半宽小于该值时停止，None 表示不使用
+        max_bits (int): 信息比特数的上限
+        chunk_bytes (int): 每块的信息字节数
+        EbN0_dB (float): 每个信息比特的信噪比（dB）
+    Returns:
+        (dict): 以 COLUMNS 为键的结果
+    '''
+    rng = random.default_rng(seed)
+    start = perf_counter()
+    rate = None
+    bits = errors = chunks = 0
+    stop = 'max_bits'
+    while bits < max_bits:
+        BS = unpackbits(rng.integers(0, 256, min(chunk_bytes, -(-(max_bits - bits) // 8)), dtype=uint8))
+        header, C = channel_encode(BS, *code)
+        if rate is None:
+            rate = code_rate((header, C))
+            if EbN0_dB is not None:
+                p = p_from_snr(EbN0_dB, rate)
+
+        # 只有编码后的数据经过二元对称信道
+        Y = C ^ (rng.random(len(C)) < p)
+        R = channel_decode(concatenate((header, Y)))
+
+        bits += len(BS)
+        errors += int(count_nonzero(R != BS))
+        chunks += 1
+        if errors >= target_errors:
+            stop = 'errors'
+            break
+        if ci is not None and errors > 0:
+            low, high = wilson_interval(errors, bits)
+            if (high - low) / 2 <= ci * errors / bits:
+                stop = 'ci'
+                break
+
+    low, high = wilson_interval(errors, bits)
+    elapsed = perf_counter() - start
+
+    # 与理论值比较
+    theory = channel_error(code, p)
+    if theory is None:
+        BER_theory = in_ci = ''
+    else:
+        BER_theory = theory[0]
+        in_ci = int(low <= BER_theory <= high)
+    return dict(zip(COLUMNS, [
+        ' '.join(str(c) for c in code), rate, '' if EbN0_dB is None else EbN0_dB, p,
+        bits, errors, errors / bits if bits else 0.0, low, high, chunks, stop, elapsed, BER_theory, in_ci]))
+
+
+def ber_curve(code, points, out_file_name, snr=False, seed=None, workers=None, **options):
+    '''
+    并行估计误码率曲线上的各点，结果按点的顺序写入 CSV 文件
+
+    Args:
+        code (tuple): 信道编码方式及参数
+        points (list): 各点的 p，snr 为 True 时为 Eb/N0（dB）
+        out_file_name (str): 输出文件(.CSV) 的路径
+        snr (bool): points 是否为 Eb/N0
+        seed (int): 随机数种子，第 i 个点使用 (seed, i)
+        workers (int): 进程数，默认为 CPU 核数
+        options: 传给 simulate_point 的停止条件
+    Returns:
+        (list): 各点的结果
+    '''
+    # 启动进程池之前检查信道编码参数，不支持时 channel_encode 返回 None
+    if code is None:
+        raise ValueError('A channel code is required, e.g. -r,3')
+    if channel_encode(zeros(8, dtype=uint8), *code) is None:
+        raise ValueError('Unsupported channel code %r' % (code,))
+
+    with ProcessPoolExecutor(workers or cpu_count()) as executor:
+        futures = []
+        for i, point in enumerate(points):
+            point_seed = None if seed is None else (seed, i)
+            if snr:
+                futures.append(executor.submit(simulate_point, code, None, point_seed, EbN0_dB=point, **options))
+            else:
+                futures.append(executor.submit(simulate_point, code, point, point_seed, **options))
+        rows = [future.result() for future in futures]
+    for row in rows:
+        write_row(out_file_name, row, COLUMNS)
+    return rows
+
+
+def main(argv):
+    # 参数列表：[-s] OUTPUT CODE POINTS [errors] [max_bits] [seed] [ci]
+    #   -s        POINTS 为 Eb/N0（dB）
+    #   CODE      信道编码参数，与 channelEncoder 相同，以逗号分隔，如 -r,3 或 -b,8,2
+    #   POINTS    以逗号分隔的信道错误概率 p
+    #   errors    误码数达到该值时停止
+    #   max_bits  每个点信息比特数的上限
+    #   seed      随机数种子
+    #   ci        置信区间的相对半宽小于该值时停止
+    snr = argv[1] == '-s'
+    if snr:
+        argv = argv[1:]
+    OUTPUT = argv[1]
+    code = parse_code(argv[2].split(','))
+    points = [float(p) for p in argv[3].split(',')]
+    target_errors = int(argv[4]) if len(argv) > 4 else TARGET_ERRORS
+    max_bits = int(argv[5]) if len(argv) > 5 else MAX_BITS
+    seed = int(argv[6]) if len(argv) > 6 else None
+    ci = float(argv[7]) if len(argv) > 7 else None
+
+    ber_curve(code, points, OUTPUT, snr=snr, seed=seed, target_errors=target_errors, ci=ci, max_bits=max_bits)
+
+
+if __name__ == '__main__':
+    main(argv)
@@ -0,0 +1,245 @@
+'''
+比特级文件读写模块
+
+信道编码、解码以及各计算模块共用的输入输出函数。文件统一以 uint8 数组读入，
+需要逐比特处理时再展开为 0/1 的 uint8 数组，输出时重新打包为字节，
+全程不生成逐比特的 Python 字符串。
+
+信道编码文件的格式规范是：
+Header  |decode_method  : uint8, 解码方式 0 为重复码 1 为 线性分组码 2 为 汉明码 3 为 BCH 码 4 为 卷积码
+        |factor : uint8, 重复码的码字长度 或 线性分组码的奇偶校验长度 或 是否为扩展汉明码 或 BCH 码可纠正的错误个数 或 卷积码码率 k/(k+1) 的 k
+  ______|source_len   : uint32, 编码前序列的长度（比特）
+Extra   |n            : uint16, 码字长度（仅汉明码、BCH 码）
+  ______|k            : uint16, 信息组长度（仅汉明码、BCH 码）
+Extra   |frame_bits   : uint16, 每帧的信息位数（仅卷积码）
+Payload |encoded-data : many uint8
+
+基本文件头共 48 比特，经 3 次重复码编码后为 144 比特，即 18 字节；
+部分编码方式在其后附加参数（Extra），同样经 3 次重复码编码，
+因此 Payload 总是从字节边界开始。
+'''
+
+from numpy import fromfile, frombuffer, uint8, unpackbits, packbits, concatenate, zeros, repeat, array, bincount, int64, dot
+
+# 文件头为 8 + 8 + 32 = 48 比特，经 3 次重复码编码后共 144 比特，即 18 字节
+HEADER_BITS = 48
+HEADER_REPEAT = 3
+HEADER_BYTES = HEADER_BITS * HEADER_REPEAT // 8
+
+# 编码方式
+METHOD_REPEAT = 0
+METHOD_LINEAR = 1
+METHOD_HAMMING = 2
+METHOD_BCH = 3
+METHOD_CONV = 4
+# 比特交织后的文件，格式见 interleaver 模块
+METHOD_INTERLEAVE = 5
+
+# 各编码方式在基本文件头之后附加的参数字节数（编码前）
+HEADER_EXTRA = {METHOD_HAMMING: 4, METHOD_BCH: 4, METHOD_CONV: 2, METHOD_INTERLEAVE: 4}
+
+# 分块读取大文件时每块的字节数
+CHUNK_SIZE = 1 << 24
+
+# 每个字节中 1 的个数
+LUT_num_of_1 = array([bin(byte).count('1') for byte in range(256)], dtype=uint8)
+
+
+def read_bytes(PATH, offset=0):
+    '''
+    以 uint8 数组读入文件
+
+    Args:
+        PATH (str): 文件路径
+        offset (int): 跳过文件开头的字节数
+    Returns:
+        (array): 文件内容，uint8 数组
+    '''
+    return fromfile(PATH, dtype=uint8, offset=offset)
+
+
+def read_bits(PATH, offset=0):
+    '''
+    读入文件并展开为比特数组
+
+    Args:
+        PATH (str): 文件路径
+        offset (int): 跳过文件开头的字节数
+    Returns:
+        (array): 文件的比特序列，每个元素为 0 或 1 的 uint8
+    '''
+    return unpackbits(read_bytes(PATH, offset))
+
+
+def write_bits(PATH, *chunks):
+    '''
+    将若干段比特数组依次打包写入文件，末尾不足一个字节时补 0
+
+    Args:
+        PATH (str): 文件路径
+        chunks (array): 需要输出的比特数组，按顺序拼接
+    '''
+    bits = concatenate(chunks) if len(chunks) > 1 else chunks[0]
+    with open(PATH, 'wb') as ofs:
+        packbits(bits).tofile(ofs)
+
+
+def pad_zero(bits, n):
+    '''
+    根据需要在比特数组后面补足 0，使其长度为 n 的整数倍
+
+    Args:
+        bits (array): 比特数组
+        n (int): 分组长度
+    Returns:
+        (array): 补 0 后的比特数组
+    '''
+    lack0 = len(bits) % n
+    if lack0 != 0:
+        bits = concatenate((bits, zeros(n - lack0, dtype=bits.dtype)))
+    return bits
+
+
+def header_size(method):
+    '''
+    获取编码后文件头的字节数
+
+    Args:
+        method (int): 编码方式
+    Returns:
+        (int): 经 3 次重复码编码后的文件头字节数，包括附加参数
+    '''
+    return (HEADER_BITS // 8 + HEADER_EXTRA.get(method, 0)) * HEADER_REPEAT
+
+
+def encode_header(method, factor, source_length, extra=b''):
+    '''
+    生成经 3 次重复码编码的文件头
+
+    Args:
+        method (int): 编码方式
+        factor (int): 重复码的码字长度 或 线性分组码的奇偶校验长度
+        source_length (int): 编码前序列的长度
+        extra (bytes): 附加参数，长度由编码方式决定
+    Returns:
+        (array): 文件头比特数组，基本文件头为 144 比特
+    '''
+    raw = bytes((method, factor)) + source_length.to_bytes(4, 'big') + extra
+    return repeat(unpackbits(frombuffer(raw, dtype=uint8)), HEADER_REPEAT)
+
+
+def decode_repeated(raw, erased=None):
+    '''
+    对经 3 次重复码编码的字节做多数判决
+
+    Args:
+        raw (bytes): 编码后的字节，长度为 3 的整数倍
+        erased (bytes): 与 raw 等长的删除标记，比特为 1 表示该位被删除，不参与判决
+    Returns:
+        (bytes): 判决后的字节
+    '''
+    bits = unpackbits(frombuffer(raw, dtype=uint8)).reshape(-1, HEADER_REPEAT)
+    if erased is None:
+        votes = bits.sum(axis=1) * 2 > HEADER_REPEAT
+    else:
+        E = unpackbits(frombuffer(erased, dtype=uint8)).reshape(-1, HEADER_REPEAT)
+        votes = (bits & ~E).sum(axis=1) * 2 > HEADER_REPEAT - E.sum(axis=1)
+    return packbits(votes).tobytes()
+
+
+def decode_header(raw, erased=None):
+    '''
+    对文件开头的 18 字节做多数判决，解码文件头
+
+    Args:
+        raw (bytes): 文件开头的 18 字节
+        erased (bytes): 删除标记文件开头的 18 字节
+    Returns:
+        method (int): 编码方式
+        factor (int): 重复码的码字长度 或 线性分组码的奇偶校验长度
+        source_length (int): 编码前序列的长度
+    '''
+    if erased is not None:
+        erased = erased[:HEADER_BYTES]
+    headers = decode_repeated(raw[:HEADER_BYTES], erased)
+
+    method = headers[0]
+    factor = headers[1]
+    source_length = int.from_bytes(headers[2:6], 'big')
+    return method, factor, source_length
+
+
+def read_header(PATH, ERASURES=None):
+    '''
+    只读取文件开头的 18 字节并解码文件头，不读入整个文件
+
+    Args:
+        PATH (str): 编码后文件路径
+        ERASURES (str): 删除信道输出的删除标记文件路径，被删除的比特不参与判决
+    Returns:
+        method (int): 编码方式
+        factor (int): 重复码的码字长度 或 线性分组码的奇偶校验长度
+        source_length (int): 编码前序列的长度
+    '''
+    return decode_header(*_read_range(PATH, ERASURES, 0, HEADER_BYTES))
+
+
+def read_header_extra(PATH, method, ERASURES=None):
+    '''
+    读取并解码基本文件头之后的附加参数
+
+    Args:
+        PATH (str): 编码后文件路径
+        method (int): 编码方式
+        ERASURES (str): 删除标记文件路径
+    Returns:
+        (bytes): 附加参数，编码方式没有附加参数时为空
+    '''
+    return decode_repeated(*_read_range(PATH, ERASURES, HEADER_BYTES, header_size(method) - HEADER_BYTES))
+
+
+def _read_range(PATH, ERASURES, offset, size):
+    '''
+    读取文件及删除标记文件中同一段字节，没有删除标记文件时后者为 None
+    '''
+    ranges = []
+    for path in (PATH, ERASURES):
+        if path is None:
+            ranges.append(None)
+            continue
+        with open(path, 'rb') as ifs:
+            ifs.seek(offset)
+            ranges.append(ifs.read(size))
+    return ranges
+
+
+def count_ones(data):
+    '''
+    查表统计 uint8 数组中二进制 1 的个数
+
+    Args:
+        data (array): uint8 数组
+    Returns:
+        (int): 1 的个数
+    '''
+    return int(dot(bincount(data.ravel(), minlength=256), LUT_num_of_1))
+
+
+def read_histogram(PATH, chunk_size=CHUNK_SIZE):
+    '''
+    分块读取文件，统计每个字节取值出现的次数
+
+    Args:
+        PATH (str): 文件路径
+        chunk_size (int): 每次读取的字节数
+    Returns:
+        hist (array): 长度为 256 的数组，第 i 个元素为字节 i 出现的次数
+    '''
+    hist = zeros(256, dtype=int64)
+    with open(PATH, 'rb') as ifs:
+        while True:
+            chunk = ifs.read(chunk_size)
+            if not chunk:
+                break
+            hist += bincount(frombuffer(chunk, dtype=uint8), minlength=256)
+    return hist
@@ -3,8 +3,14 @@ __email__ = "chy126101@gmail.com"
 __version__ = "20201230.1532"
 
 from sys import argv
+from bisect import bisect_right
+from numpy import (random, linalg, asarray, loadtxt, fromfile, repeat, arange, cumsum, searchsorted, where,
+                   fill_diagonal, packbits, concatenate, vstack, eye, ones, zeros, uint8, int64)
 from byteSource import get_msg
 
+# 突发信道分块生成噪声时每块的字节数
+CHUNK_SIZE = 1 << 20
+
 def handleFileData(inputFileName, P):
     '''打开二进制文件(.csv)，处理数据
 
@@ -63,12 +69,225 @@ def outputResToFile(outputFileName, outputData):
         for i in outputData:
             ofn.write(i.to_bytes(1, 'big'))
 
+
+class MarkovChannel:
+    '''马尔可夫突发错误信道
+
+    信道状态为一个马尔可夫链，每个比特先按状态转移，再以当前状态的错误概率翻转。
+    同一状态的持续长度服从几何分布，因此按游程生成状态序列：一次抽取一批游程的长度，
+    用 repeat 展开为逐比特的状态，再一次生成全部错误比特。游程跨块时留到下一块，
+    所以分块生成与一次生成的统计特性相同。
+
+    Attributes:
+        P (array): 状态转移矩阵，P[i, j] 为由状态 i 转移到 j 的概率
+        e (array): 每个状态的比特错误概率
+        rng (Generator): 随机数生成器
+        state (int): 当前状态
+        left (int): 当前状态游程剩余的比特数
+    '''
+
+    def __init__(self, P, e, seed=None):
+        '''初始化信道，初始状态按平稳分布抽取
+
+        Args:
+            P (array): 状态转移矩阵
+            e (array): 每个状态的比特错误概率
+            seed (int): 随机数种子，相同的种子生成相同的噪声
+        '''
+        self.P = asarray(P, dtype=float)
+        self.e = asarray(e, dtype=float)
+        self.rng = random.default_rng(seed)
+
+        # 离开各状态的概率，以及离开后转移到各状态的累积概率
+        self.leave = 1 - self.P.diagonal()
+        jump = self.P.copy()
+        fill_diagonal(jump, 0)
+        self.jump_cumsum = cumsum(jump, axis=1) / where(self.leave > 0, self.leave, 1)[:, None]
+
+        w = cumsum(stationary(self.P))
+        self.state = min(int(searchsorted(w, self.rng.random() * w[-1], side='right')), len(w) - 1)
+        self.left = int(self._durations(asarray([self.state]))[0])
+
+    def _durations(self, states):
+        '''按几何分布抽取各游程的长度，不会离开的状态游程无限长
+        '''
+        leave = self.leave[states]
+        durations = self.rng.geometric(where(leave > 0, leave, 1))
+        durations[leave <= 0] = 1 << 62
+        return durations
+
+    def _next_states(self, state, count):
+        '''抽取由 state 开始的 count 次跳转后的状态序列
+        '''
+        if len(self.P) == 2:
+            # 两状态时每次跳转都到另一个状态
+            return (state + 1 + arange(count)) % 2
+        u = self.rng.random(count).tolist()
+        jump_cumsum = self.jump_cumsum.tolist()
+        last = len(self.P) - 1
+        states = [0] * count
+        for i in range(count):
+            state = min(bisect_right(jump_cumsum[state], u[i]), last)
+            states[i] = state
+        return asarray(states, dtype=int64)
+
+    def state_bits(self, n):
+        '''生成接下来 n 个比特的信道状态
+
+        Args:
+            n (int): 比特数
+        Returns:
+            (array): 每个比特的信道状态
+        '''
+        runs = [asarray([self.state])]
+        lengths = [asarray([self.left])]
+        total = self.left
+        state = self.state
+        # 按游程的平均长度估计还需要的游程数，一次抽取一批
+        mean = 1 / max(float(self.leave.mean()), 1e-9)
+        while total < n:
+            s = self._next_states(state, int((n - total) / mean * 1.2) + 1)
+            d = self._durations(s)
+            runs.append(s)
+            lengths.append(d)
+            total += int(d.sum())
+            state = int(s[-1])
+        runs = concatenate(runs)
+        lengths = concatenate(lengths)
+
+        # 最后一个游程超出 n 的部分留给下一块
+        ends = cumsum(lengths)
+        last = int(searchsorted(ends, n))
+        self.state = int(runs[last])
+        self.left = int(ends[last]) - n
+        lengths[last] -= self.left
+        return repeat(runs[:last + 1], lengths[:last + 1])
+
+    def noise(self, n_bytes):
+        '''生成 n_bytes 字节的噪声，1 表示该比特出错
+
+        Args:
+            n_bytes (int): 字节数
+        Returns:
+            (array): 噪声字节，uint8 数组
+        '''
+        states = self.state_bits(n_bytes * 8)
+        errors = self.rng.random(len(states)) < self.e[states]
+        return packbits(errors)
+
+
+def erasureChannel(inputFileName, outputFileName, erasureFileName, eps, seed=None, chunk_size=CHUNK_SIZE):
+    '''二元删除信道，分块生成删除标记
+
+    每个比特以概率 eps 被删除，输出文件中被删除的比特置 0，
+    删除标记按比特打包写入另一个与输出文件等长的文件，1 表示该比特被删除
+
+    Args:
+        inputFileName (str): 输入文件路径
+        outputFileName (str): 输出文件路径
+        erasureFileName (str): 删除标记文件路径
+        eps (float): 删除概率
+        seed (int): 随机数种子
+        chunk_size (int): 每块的字节数
+    '''
+    rng = random.default_rng(seed)
+    inputData = fromfile(inputFileName, dtype=uint8)
+    with open(outputFileName, 'wb') as ofn, open(erasureFileName, 'wb') as efn:
+        for i in range(0, len(inputData), chunk_size):
+            chunk = inputData[i:i + chunk_size]
+            mask = packbits(rng.random(len(chunk) * 8) < eps)
+            (chunk & ~mask).tofile(ofn)
+            mask.tofile(efn)
+
+
+def stationary(P):
+    '''求马尔可夫链的平稳分布
+
+    Args:
+        P (array): 状态转移矩阵
+    Returns:
+        (array): 平稳分布 w，满足 wP = w 且各分量之和为 1
+    '''
+    n = len(P)
+    A = vstack((P.T - eye(n), ones(n)))
+    b = zeros(n + 1)
+    b[-1] = 1
+    return linalg.lstsq(A, b, rcond=None)[0].clip(min=0)
+
+
+def gilbert_elliott(p, r, e_g, e_b, seed=None):
+    '''获得 Gilbert-Elliott 信道
+
+    Args:
+        p (float): 由好状态转移到坏状态的概率
+        r (float): 由坏状态转移到好状态的概率
+        e_g (float): 好状态的比特错误概率
+        e_b (float): 坏状态的比特错误概率
+        seed (int): 随机数种子
+    Returns:
+        (MarkovChannel): 两状态马尔可夫信道，状态 0 为好状态，1 为坏状态
+    '''
+    return MarkovChannel([[1 - p, p], [r, 1 - r]], [e_g, e_b], seed)
+
+
+def markov_channel(fileName, seed=None):
+    '''由 CSV 文件获得马尔可夫信道
+
+    文件的第 i 行为状态 i 转移到各状态的概率，最后一列为状态 i 的比特错误概率
+
+    Args:
+        fileName (str): CSV 文件路径
+        seed (int): 随机数种子
+    Returns:
+        (MarkovChannel): 马尔可夫信道
+    '''
+    table = loadtxt(fileName, delimiter=',', ndmin=2)
+    return MarkovChannel(table[:, :-1], table[:, -1], seed)
+
+
+def burstChannel(inputFileName, outputFileName, channel, chunk_size=CHUNK_SIZE):
+    '''将突发信道的噪声分块作用于输入文件
+
+    Args:
+        inputFileName (str): 输入文件路径
+        outputFileName (str): 输出文件路径
+        channel (MarkovChannel): 马尔可夫信道
+        chunk_size (int): 每块的字节数
+    '''
+    inputData = fromfile(inputFileName, dtype=uint8)
+    with open(outputFileName, 'wb') as ofn:
+        for i in range(0, len(inputData), chunk_size):
+            chunk = inputData[i:i + chunk_size]
+            (chunk ^ channel.noise(len(chunk))).tofile(ofn)
+
+
 def main(argv):
+    if argv[1] == '-g':
+        # Gilbert-Elliott 信道: 输入文件、输出文件、p、r、e_g、e_b，可选随机数种子
+        seed = int(argv[8]) if len(argv) > 8 else None
+        channel = gilbert_elliott(float(argv[4]), float(argv[5]), float(argv[6]), float(argv[7]), seed)
+        burstChannel(argv[2], argv[3], channel)
+        return
+    elif argv[1] == '-m':
+        # 马尔可夫信道: 输入文件、输出文件、状态转移及错误概率的 CSV 文件，可选随机数种子
+        seed = int(argv[5]) if len(argv) > 5 else None
+        burstChannel(argv[2], argv[3], markov_channel(argv[4], seed))
+        return
+    elif argv[1] == '-e':
+        # 二元删除信道: 输入文件、输出文件、删除标记文件、删除概率，可选随机数种子
+        seed = int(argv[6]) if len(argv) > 6 else None
+        erasureChannel(argv[2], argv[3], argv[4], float(argv[5]), seed)
+        return
+
     # 参数列表: 分别为输入文件路径、噪声文件路径以及输出文件路径
     inputFileName = argv[1]
     P = float(argv[2])
     outputFileName = argv[3]
 
+    # 可选的随机数种子，相同的种子得到相同的输出
+    if len(argv) > 4:
+        random.seed(int(argv[4]))
+
     # 处理用户输入
     inputData, noiseData = handleFileData(inputFileName, P)
 
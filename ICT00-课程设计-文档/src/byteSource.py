@@ -3,22 +3,36 @@ __email__ = "chy126101@gmail.com"
 __version__ = "20201231.2334"
 
 # 引入相关库
-from numpy import random, searchsorted, zeros
+from numpy import random, searchsorted, zeros, arange, unpackbits, uint8, multiply
 from csv import reader
 from sys import argv
 
-def ganExtend(P0):
-    '''获得八次扩展
+def ganExtend(P0, n=8):
+    '''获得 n 次扩展
 
     Args:
         P0 (float): 数据比特概率分布
+        n (int): 扩展次数，默认 8 次扩展即字节，n 比特的符号按大端序取值
     Returns:
-        Ext (list): 字节概率分布
+        Ext (array): 长度为 2**n 的符号概率分布
     '''
-    Ext = []
-    for i in range(256):
-        a = bin(i).count('1')
-        Ext.append(P0 ** (8 - a) * (1 - P0) ** a)
+    # 每个符号中 1 的个数
+    a = unpackbits(arange(1 << n, dtype='>u4').view(uint8)).reshape(-1, 32).sum(axis=1)
+    Ext = P0 ** (n - a) * (1 - P0) ** a
+    return Ext
+
+def extendPMF(P, k):
+    '''获得字节概率分布的 k 次扩展
+
+    Args:
+        P (array): 长度为 256 的字节概率分布
+        k (int): 扩展次数
+    Returns:
+        Ext (array): 长度为 256**k 的 k 字节符号概率分布，k 字节的符号按大端序取值
+    '''
+    Ext = P
+    for i in range(k - 1):
+        Ext = multiply.outer(Ext, P).ravel()
     return Ext
 
 def handleFileData(inputFileName):
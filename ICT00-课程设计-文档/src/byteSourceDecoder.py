@@ -18,15 +18,63 @@ Header  |header_size  : uint16, number of bytes for header
 ________|word
 Payload |encoded-data : many unit8
 
+Coders other than the static Huffman coder above start with an escape header instead,
+followed by coder specific data:
+
+Header  |header_size  : uint16, always 0 (never a valid header_size above)
+        |coder_id     : uint8, CODER_ADAPTIVE_HUFFMAN, CODER_BLOCK_HUFFMAN, CODER_RANS
+        |               or CODER_RANS_INTERLEAVED
+  ______|source_len   : uint32, number of symbols in source
+Payload |encoded-data : many unit8
+
+The block Huffman coder codes k-byte extended symbols (big endian, the source is padded with zeros
+to a multiple of k bytes), its canonical code is described by the code length of every symbol:
+
+Coder   |k            : uint8, number of bytes per symbol
+        |table_size   : uint32, number of bytes for the compressed table
+  ______|word_lens    : zlib compressed 256**k*uint8, code length of every symbol, 0 for no codeword
+Payload |encoded-data : many unit8
+
+The rANS coder stores the quantized symbol frequencies (summing to 2**PROB_BITS),
+its payload is the final rANS state followed by the renormalization words:
+
+Coder   |table_size   : uint32, number of bytes for the compressed table
+  ______|frequencies  : zlib compressed 256*uint16, quantized frequency of every symbol
+Payload |state        : uint32, final state of the encoder
+        |encoded-data : many uint16
+
+The interleaved rANS coder spreads the symbols over `lanes` states (symbol i belongs to lane
+i % lanes, the last row is padded), the renormalization words of a row follow in lane order:
+
+Coder   |lanes        : uint16, number of interleaved states
+        |table_size   : uint32, number of bytes for the compressed table
+  ______|frequencies  : zlib compressed 256*uint16, quantized frequency of every symbol
+Payload |states       : lanes*uint32, final states of the encoder
+        |encoded-data : many uint16
+
 """
 
 from csv import reader
 from io import BytesIO
 from sys import argv
+from zlib import decompress
 
 # Non-standard library
-from numpy import uint8,ceil,asarray,fromfile
+from numpy import uint8,ceil,asarray,fromfile,frombuffer,arange
 from dahuffman_no_EOF import HuffmanCodec
+from adaptiveHuffman import AdaptiveHuffmanCodec
+from tableCodec import TableCodec
+from rans import RansCodec
+
+# 编码方式，静态霍夫曼编码使用原有的首部格式，其他编码方式使用以 0 开头的首部
+CODER_HUFFMAN = 0
+CODER_ADAPTIVE_HUFFMAN = 1
+CODER_BLOCK_HUFFMAN = 2
+CODER_RANS = 3
+CODER_RANS_INTERLEAVED = 4
+
+# 分组霍夫曼编码每个符号的最大字节数，码长表共 256**k 项
+MAX_BLOCK_BYTES = 2
 
 
 def encode(pmf_file_name, in_file_name, out_file_name):
@@ -96,28 +144,26 @@ def encode(pmf_file_name, in_file_name, out_file_name):
     return (len(source), len(encoded))
 
 
-def decode(in_file_name, out_file_name):
+def read_header(in_file):
     """
-    @description: use to decode
-    @param: in_file_name: the path of input file
-    @param: out_file_name: the path of output file
-    @return: (len(encoded), len(decoded)): (the length of encoded source, the length of decoded source)
+    @description: read the header of an encoded file and rebuild the codebook
+    @param: in_file: binary file object positioned at the start of the encoded file
+    @return: (coder_id, codebook, source_len): (the coder used, dict mapping symbol to (word_len, word) or None for coders without codebook, the number of symbols in source)
     """
 
     # 高低位标志，little 表示反序，左边为低位右边为高位
     byteorder = 'little'
 
-    '''
-    以二进制读取文件
-    '''
-    with open(in_file_name, 'rb') as in_file:
-        # 第二位是首部长度(header_size)，以反序读取，转为 int
-        header_size = int.from_bytes(in_file.read(2), byteorder)
-        # 操作二进制数据，需使用BytesIO
-        # 以二进制读取首部(Header) header_size-2 位部分
-        header = BytesIO(in_file.read(header_size-2))
-        # 读取全部文件数据
-        encoded = in_file.read()
+    # 第二位是首部长度(header_size)，以反序读取，转为 int
+    header_size = int.from_bytes(in_file.read(2), byteorder)
+    # 首部长度为 0 表示使用其他编码方式，之后是编码方式和信源符号个数
+    if header_size == 0:
+        coder_id = in_file.read(1)[0]
+        source_len = int.from_bytes(in_file.read(4), byteorder)
+        return (coder_id, None, source_len)
+    # 操作二进制数据，需使用BytesIO
+    # 以二进制读取首部(Header) header_size-2 位部分
+    header = BytesIO(in_file.read(header_size-2))
 
     codebook = {}
     # 获取 symbol_count，位于header第一位的第零位
@@ -137,16 +183,119 @@ def decode(in_file_name, out_file_name):
         # 将码字长度、码字存入字典codebook中
         codebook[symbol] = (word_len, word)
 
-    # 将字典作为参数初始化一个HuffmanCodec类用于译码
-    codec = HuffmanCodec(codebook)
-    # 译码
-    # np.asarray()，将数据转化为ndarray但不占用新内存
-    decoded = asarray(codec.decode(encoded))[:source_len]
+    return (CODER_HUFFMAN, codebook, source_len)
+
+
+def decode_block(encoded, source_len):
+    """
+    @description: decode the coder specific data and payload of the block Huffman coder
+    @param: encoded: bytes following the escape header
+    @param: source_len: the number of bytes in source
+    @return: decoded: uint8 array of the decoded source
+    """
+
+    # 高低位标志，little 表示反序，左边为低位右边为高位
+    byteorder = 'little'
+
+    # 读取每个符号的字节数以及压缩后码长表的字节数
+    k = encoded[0]
+    table_size = int.from_bytes(encoded[1:5], byteorder)
+    if not 1 <= k <= MAX_BLOCK_BYTES:
+        raise ValueError('Unsupported block size %d' % k)
+    # 由码长表重建范式霍夫曼码
+    word_lens = frombuffer(decompress(encoded[5:5 + table_size]), dtype=uint8)
+    codec = TableCodec(word_lens)
+
+    # 译码 k 字节符号，再按大端序拆分为字节
+    symbols = codec.decode(encoded[5 + table_size:], -(-source_len // k))
+    shifts = 8 * arange(k - 1, -1, -1)
+    decoded = ((symbols[:, None] >> shifts) & 0xFF).astype(uint8).ravel()
+    return decoded[:source_len]
+
+
+def decode_rans(encoded, source_len, lanes=1):
+    """
+    @description: decode the coder specific data and payload of the rANS coder
+    @param: encoded: bytes following the escape header (and the number of lanes)
+    @param: source_len: the number of symbols in source
+    @param: lanes: the number of interleaved states
+    @return: decoded: uint8 array of the decoded source
+    """
+
+    # 读取压缩后频数表的字节数，由频数表重建 rANS 编码器
+    table_size = int.from_bytes(encoded[0:4], 'little')
+    frequencies = frombuffer(decompress(encoded[4:4 + table_size]), dtype='<u2')
+    codec = RansCodec(frequencies)
+
+    return codec.decode(encoded[4 + table_size:], source_len, lanes).astype(uint8)
+
+
+def decode_source(data):
+    """
+    @description: decode an encoded source held in memory
+    @param: data: the encoded source, including the header
+    @return: (decoded, len(encoded)): (the decoded source, the length of encoded source without header)
+    @raise: ValueError: if the header or the data is invalid, e.g. damaged by channel errors
+    """
+
+    # 读取首部，得到编码方式、码书和信源符号个数
+    in_file = BytesIO(data)
+    try:
+        coder_id, codebook, source_len = read_header(in_file)
+    except IndexError:
+        raise ValueError('Truncated header')
+    encoded = in_file.read()
+
+    # 码书必须存在，且码字长度不为 0
+    if coder_id == CODER_HUFFMAN and (not codebook or min(word_len for word_len, word in codebook.values()) == 0):
+        raise ValueError('Invalid codebook')
+
+    if coder_id == CODER_HUFFMAN:
+        # 将字典作为参数初始化一个HuffmanCodec类用于译码
+        codec = HuffmanCodec(codebook)
+        # 译码
+        # np.asarray()，将数据转化为ndarray但不占用新内存
+        decoded = asarray(codec.decode(encoded))[:source_len]
+    elif coder_id == CODER_ADAPTIVE_HUFFMAN:
+        # 自适应霍夫曼编码，码书随译码过程同步更新
+        decoded = asarray(AdaptiveHuffmanCodec().decode(encoded, source_len), dtype=uint8)
+    elif coder_id == CODER_BLOCK_HUFFMAN:
+        # 分组霍夫曼编码，码长表位于编码数据之前
+        decoded = decode_block(encoded, source_len)
+    elif coder_id == CODER_RANS:
+        # rANS 编码，频数表位于编码数据之前
+        decoded = decode_rans(encoded, source_len)
+    elif coder_id == CODER_RANS_INTERLEAVED:
+        # 交错 rANS 编码，首先读取状态的个数
+        lanes = int.from_bytes(encoded[0:2], 'little')
+        decoded = decode_rans(encoded[2:], source_len, lanes)
+    else:
+        raise ValueError('Unknown coder id %d' % coder_id)
+
+    # 返回译码结果，编码后长度
+    return (decoded, len(encoded))
+
+
+def decode(in_file_name, out_file_name):
+    """
+    @description: use to decode
+    @param: in_file_name: the path of input file
+    @param: out_file_name: the path of output file
+    @return: (len(encoded), len(decoded)): (the length of encoded source, the length of decoded source)
+    """
+
+    '''
+    以二进制读取文件
+    '''
+    with open(in_file_name, 'rb') as in_file:
+        data = in_file.read()
+
+    decoded, encoded_len = decode_source(data)
     # 存入输出文件
     decoded.tofile(out_file_name)
 
     # 返回编码后长度，译码后长度
-    return (len(encoded), len(decoded))
+    return (encoded_len, len(decoded))
 
 
 def main(argv):
@@ -18,48 +18,184 @@ Header  |header_size  : uint16, number of bytes for header
 ________|word
 Payload |encoded-data : many unit8
 
+Coders other than the static Huffman coder above start with an escape header instead,
+followed by coder specific data:
+
+Header  |header_size  : uint16, always 0 (never a valid header_size above)
+        |coder_id     : uint8, CODER_ADAPTIVE_HUFFMAN, CODER_BLOCK_HUFFMAN, CODER_RANS
+        |               or CODER_RANS_INTERLEAVED
+  ______|source_len   : uint32, number of symbols in source
+Payload |encoded-data : many unit8
+
+The block Huffman coder codes k-byte extended symbols (big endian, the source is padded with zeros
+to a multiple of k bytes), its canonical code is described by the code length of every symbol:
+
+Coder   |k            : uint8, number of bytes per symbol
+        |table_size   : uint32, number of bytes for the compressed table
+  ______|word_lens    : zlib compressed 256**k*uint8, code length of every symbol, 0 for no codeword
+Payload |encoded-data : many unit8
+
+The rANS coder stores the quantized symbol frequencies (summing to 2**PROB_BITS),
+its payload is the final rANS state followed by the renormalization words:
+
+Coder   |table_size   : uint32, number of bytes for the compressed table
+  ______|frequencies  : zlib compressed 256*uint16, quantized frequency of every symbol
+Payload |state        : uint32, final state of the encoder
+        |encoded-data : many uint16
+
+The interleaved rANS coder spreads the symbols over `lanes` states (symbol i belongs to lane
+i % lanes, the last row is padded), the renormalization words of a row follow in lane order:
+
+Coder   |lanes        : uint16, number of interleaved states
+        |table_size   : uint32, number of bytes for the compressed table
+  ______|frequencies  : zlib compressed 256*uint16, quantized frequency of every symbol
+Payload |states       : lanes*uint32, final states of the encoder
+        |encoded-data : many uint16
+
 """
 
 from csv import reader
-from io import BytesIO
+from io import StringIO
 from sys import argv
+from os import getpid, replace
+from functools import lru_cache
+from hashlib import sha1
+from pathlib import Path
+from tempfile import gettempdir
+from zlib import compress
 
 # Non-standard library
-from numpy import uint8,ceil,asarray,fromfile
+from numpy import uint8,ceil,fromfile,bincount,nonzero,zeros,concatenate,dot,arange
 from dahuffman_no_EOF import HuffmanCodec
+from adaptiveHuffman import AdaptiveHuffmanCodec
+from tableCodec import TableCodec
+from rans import RansCodec, lanes_for
+from byteSource import extendPMF
+from byteSourceDecoder import CODER_ADAPTIVE_HUFFMAN, CODER_BLOCK_HUFFMAN, CODER_RANS_INTERLEAVED, MAX_BLOCK_BYTES
+# decode 已移至 byteSourceDecoder，此处保留以兼容调用 byteSourceEncoder.decode 的代码
+from byteSourceDecoder import decode
 
+# 码书缓存目录，以 PMF 文件内容的哈希值作为文件名，设为 None 则不使用磁盘缓存
+# codec_from_pmf 每次调用时读取，运行中修改同样生效
+CACHE_DIR = Path(gettempdir()) / 'byteSourceEncoder.codebook'
 
-def encode(pmf_file_name, in_file_name, out_file_name):
+
+def codec_from_pmf(pmf_bytes, cache_dir=None):
     """
-    @description: use to encode
-    @param: pmf_file_name: the path of pmf file
-    @param: in_file_name: the path of input file
-    @param: out_file_name: the path of output file
-    @return: (len(source), len(encoded)): (the length of source, the length of encoded source)
+    @description: build (or load from cache) the Huffman codec for given PMF file contents
+    @param: pmf_bytes: raw contents of the pmf file
+    @param: cache_dir: directory of the on-disk codebook cache, None to use CACHE_DIR
+    @return: codec: HuffmanCodec
     """
+    return _codec_from_pmf(pmf_bytes, CACHE_DIR if cache_dir is None else cache_dir)
+
+
+@lru_cache(maxsize=32)
+def _codec_from_pmf(pmf_bytes, cache_dir):
+    """
+    @description: codec_from_pmf with the cache directory resolved, None disables the disk cache
+    """
+
+    # 内容相同的 PMF 文件对应同一个缓存文件
+    cache_file = None
+    if cache_dir is not None:
+        cache_file = Path(cache_dir) / (sha1(pmf_bytes).hexdigest() + '.pfxc')
+        if cache_file.is_file():
+            return HuffmanCodec.load(cache_file)
 
     '''
-    打开 CSV 文件并读取，然后保存为字典，
+    解析 CSV 文件内容，然后保存为字典，
     将第一列以 uint8 保存为键，
     第二列以 float 保存为值
     '''
-    with open(pmf_file_name, newline='') as csv_file:
-        pmf = dict([(uint8(row[0]), float(row[1]))
-                    for row in reader(csv_file)])
+    csv_file = StringIO(pmf_bytes.decode('utf-8'), newline='')
+    pmf = dict([(uint8(row[0]), float(row[1]))
+                for row in reader(csv_file)])
 
     # 构建赫夫曼树
     # 将EOF符号设置为“frequencies”中的第一个符号，
     # 这样“dahuffman”在构建Huffman树时不会添加新的EOF符号
     # 递归实现
     codec = HuffmanCodec.from_frequencies(pmf)
-    # 以 uint8 读取输入文件中的数据
-    source = fromfile(in_file_name, dtype='uint8')
-    # 使用source作为编码方案编码
-    # str.encode(encoding=source, errors='strict')
-    encoded = codec.encode(source)
 
-    # 返回编码后的码书
-    codebook = codec.get_code_table()
+    # 先写入临时文件再重命名，避免多个进程同时读写同一个缓存文件
+    if cache_file is not None:
+        tmp_file = cache_file.with_suffix('.%d.tmp' % getpid())
+        codec.save(tmp_file)
+        replace(tmp_file, cache_file)
+
+    return codec
+
+
+def codec_from_source(source):
+    """
+    @description: build the Huffman codec from the empirical distribution of the source
+    @param: source: uint8 array of the source
+    @return: codec: HuffmanCodec
+    """
+
+    # 统计每个字节出现的次数，只有出现过的符号进入码书
+    hist = bincount(source, minlength=256)
+    pmf = dict([(uint8(symbol), int(hist[symbol])) for symbol in nonzero(hist)[0]])
+    # 空文件时码书中至少保留一个符号
+    if not pmf:
+        pmf = {uint8(0): 1}
+    return HuffmanCodec.from_frequencies(pmf)
+
+
+def pmf_from_bytes(pmf_bytes):
+    """
+    @description: parse the contents of a pmf file
+    @param: pmf_bytes: raw contents of the pmf file
+    @return: P: array of the 256 symbol probabilities
+    """
+
+    # 解析 CSV 文件内容，第一列为符号，第二列为概率
+    P = zeros(256)
+    for row in reader(StringIO(pmf_bytes.decode('utf-8'), newline='')):
+        P[int(row[0])] = float(row[1])
+    return P
+
+
+@lru_cache(maxsize=8)
+def block_codec_from_pmf(pmf_bytes, k):
+    """
+    @description: build the Huffman codec of k-byte extended symbols for given PMF file contents
+    @param: pmf_bytes: raw contents of the pmf file
+    @param: k: number of bytes per symbol
+    @return: codec: TableCodec
+    """
+
+    # k 字节符号的概率分布为字节概率分布的 k 次扩展
+    Ext = extendPMF(pmf_from_bytes(pmf_bytes), k)
+    # 概率为 0 的符号也分配码字（取最小的概率），与逐字节的霍夫曼编码一致
+    Ext[Ext == 0] = Ext[Ext > 0].min()
+    return TableCodec.from_frequencies(Ext)
+
+
+def block_symbols(source, k):
+    """
+    @description: group the source into k-byte symbols, padding it with zeros
+    @param: source: uint8 array of the source
+    @param: k: number of bytes per symbol
+    @return: symbols: int array of big endian k-byte symbols
+    """
+
+    # 末尾补 0 使长度为 k 的整数倍
+    lack0 = len(source) % k
+    if lack0 != 0:
+        source = concatenate((source, zeros(k - lack0, dtype=uint8)))
+    return dot(source.reshape(-1, k).astype(int), 256 ** arange(k - 1, -1, -1))
+
+
+def gen_header(codebook, source_len):
+    """
+    @description: generate the header of the encoded file
+    @param: codebook: dict mapping symbol to (word_len, word)
+    @param: source_len: the number of symbols in source
+    @return: header: bytearray
+    """
+
     # 高低位标志，little 表示反序，左边为低位右边为高位
     byteorder = 'little'
     # 返回一个字节数组，
@@ -68,12 +204,11 @@ def encode(pmf_file_name, in_file_name, out_file_name):
     # 使用尾插法向字节数组 header 添加元素 len(codebook)-1
     # 对应 symbol_count，码书中符号个数减一，uint8 格式
     header.append(len(codebook)-1)
-    # 扩展列表，追加序列 len(source).to_bytes(4, byteorder)
+    # 扩展列表，追加序列 source_len.to_bytes(4, byteorder)
     # 对应 source_len，信源符号个数，uint32 格式
-    header.extend(len(source).to_bytes(4, byteorder))
+    header.extend(source_len.to_bytes(4, byteorder))
     # 向字节数组追加符号、码字长度以及码字
     for symbol, (word_len, word) in codebook.items():
-        (word_len, word) = codebook[symbol]
         # 返回 word_len/8 向上取整的值，用于指定保存这个码字所需的字节数
         word_bytes = int(ceil(word_len / 8))
         header.append(symbol)
@@ -82,12 +217,143 @@ def encode(pmf_file_name, in_file_name, out_file_name):
         header.extend(word.to_bytes(word_bytes, byteorder))
     # 将 header 首部三位转为二进制，即 Header 部分
     header[0:2] = len(header).to_bytes(2, byteorder)
+    return header
+
+
+def gen_coder_header(coder_id, source_len):
+    """
+    @description: generate the escape header used by coders other than the static Huffman coder
+    @param: coder_id: the coder used
+    @param: source_len: the number of symbols in source
+    @return: header: bytearray
+    """
+
+    # header_size 为 0，之后是编码方式以及信源符号个数
+    header = bytearray(2)
+    header.append(coder_id)
+    header.extend(source_len.to_bytes(4, 'little'))
+    return header
+
+
+def read_pmf(pmf_file_name):
+    """
+    @description: read the raw contents of a pmf file
+    @param: pmf_file_name: the path of pmf file, or None
+    @return: pmf_bytes: raw contents of the pmf file, None if no file is given
+    """
+
+    if pmf_file_name is None:
+        return None
+    with open(pmf_file_name, 'rb') as pmf_file:
+        return pmf_file.read()
+
+
+def encode_source(source, pmf_bytes=None):
+    """
+    @description: encode a source in memory with the static Huffman coder
+    @param: source: uint8 array of the source
+    @param: pmf_bytes: raw contents of the pmf file, None to build the code from the source itself
+    @return: (header, chunks): (the header, generator of the encoded byte chunks)
+    """
+
+    if pmf_bytes is None:
+        # 两遍扫描：由信源的经验分布构建码书，码书随首部一起写入文件
+        codec = codec_from_source(source)
+    else:
+        # 相同内容的 PMF 复用已构建的码书
+        codec = codec_from_pmf(pmf_bytes)
+
+    # 由码书生成首部
+    header = gen_header(codec.get_code_table(), len(source))
+    return (header, codec.encode_streaming(source))
+
+
+def write_encoded(out_file_name, header, chunks):
+    """
+    @description: write the header and the encoded chunks to the output file
+    @param: out_file_name: the path of output file
+    @param: header: the header
+    @param: chunks: iterable of encoded byte chunks
+    @return: encoded_len: the length of encoded source, without header
+    """
+
+    encoded_len = 0
+    with open(out_file_name, 'wb') as out_file:
+        out_file.write(header)
+        for chunk in chunks:
+            out_file.write(chunk)
+            encoded_len += len(chunk)
+    return encoded_len
+
+
+def encode(pmf_file_name, in_file_name, out_file_name):
+    """
+    @description: use to encode
+    @param: pmf_file_name: the path of pmf file, None to build the code from the input file itself
+    @param: in_file_name: the path of input file
+    @param: out_file_name: the path of output file
+    @return: (len(source), len(encoded)): (the length of source, the length of encoded source)
+    """
+
+    # 以 uint8 读取输入文件中的数据
+    source = fromfile(in_file_name, dtype='uint8')
 
     '''
     以二进制方式把数据写入输出文件
     首先写入首部
-    然后写入霍夫曼编码
+    然后边编码边写入霍夫曼编码
     '''
+    header, chunks = encode_source(source, read_pmf(pmf_file_name))
+    encoded_len = write_encoded(out_file_name, header, chunks)
+
+    # 返回信源长度，编码后的信源长度
+    return (len(source), encoded_len)
+
+
+def encode_adaptive(in_file_name, out_file_name):
+    """
+    @description: use to encode with one-pass adaptive Huffman coding, no pmf file is needed
+    @param: in_file_name: the path of input file
+    @param: out_file_name: the path of output file
+    @return: (len(source), len(encoded)): (the length of source, the length of encoded source)
+    """
+
+    # 以 uint8 读取输入文件中的数据
+    source = fromfile(in_file_name, dtype='uint8')
+
+    # 边编码边写入输出文件
+    encoded_len = write_encoded(out_file_name, *encode_source_adaptive(source))
+
+    # 返回信源长度，编码后的信源长度
+    return (len(source), encoded_len)
+
+
+def encode_source_adaptive(source):
+    """
+    @description: encode a source in memory with one-pass adaptive Huffman coding
+    @param: source: uint8 array of the source
+    @return: (header, chunks): (the header, generator of the encoded byte chunks)
+    """
+
+    # 码书随编码过程同步更新，首部只有编码方式和信源长度
+    header = gen_coder_header(CODER_ADAPTIVE_HUFFMAN, len(source))
+    return (header, AdaptiveHuffmanCodec().encode_streaming(source.tolist()))
+
+
+def encode_block(pmf_file_name, in_file_name, out_file_name, k):
+    """
+    @description: use to encode k-byte extended symbols with a canonical Huffman code
+    @param: pmf_file_name: the path of pmf file, None to build the code from the input file itself
+    @param: in_file_name: the path of input file
+    @param: out_file_name: the path of output file
+    @param: k: number of bytes per symbol, 1 to MAX_BLOCK_BYTES
+    @return: (len(source), len(encoded)): (the length of source, the length of encoded source)
+    """
+
+    # 以 uint8 读取输入文件中的数据
+    source = fromfile(in_file_name, dtype='uint8')
+    header, encoded = encode_source_block(source, read_pmf(pmf_file_name), k)
+
     with open(out_file_name, 'wb') as out_file:
         out_file.write(header)
         out_file.write(encoded)
@@ -96,69 +362,117 @@ def encode(pmf_file_name, in_file_name, out_file_name):
     return (len(source), len(encoded))
 
 
-def decode(in_file_name, out_file_name):
+def encode_source_block(source, pmf_bytes, k):
+    """
+    @description: encode a source in memory as k-byte extended symbols with a canonical Huffman code
+    @param: source: uint8 array of the source
+    @param: pmf_bytes: raw contents of the pmf file, None to build the code from the source itself
+    @param: k: number of bytes per symbol, 1 to MAX_BLOCK_BYTES
+    @return: (header, encoded): (the header, the encoded source)
+    """
+
+    if not 1 <= k <= MAX_BLOCK_BYTES:
+        raise ValueError('Block size must be between 1 and %d' % MAX_BLOCK_BYTES)
+
+    # 组合为 k 字节的符号
+    symbols = block_symbols(source, k)
+
+    if pmf_bytes is None:
+        # 两遍扫描：由信源中 k 字节符号的经验分布构建码书
+        hist = bincount(symbols, minlength=256 ** k)
+        # 空文件时码书中至少保留一个符号
+        if not hist.any():
+            hist[0] = 1
+        codec = TableCodec.from_frequencies(hist)
+    else:
+        # 相同内容的 PMF 复用已构建的码书
+        codec = block_codec_from_pmf(pmf_bytes, k)
+
+    encoded = codec.encode(symbols)
+
+    # 首部之后依次为符号字节数、压缩后的码长表
+    table = compress(codec.bits.tobytes(), 9)
+    header = gen_coder_header(CODER_BLOCK_HUFFMAN, len(source))
+    header.append(k)
+    header.extend(len(table).to_bytes(4, 'little'))
+    header.extend(table)
+    return (header, encoded)
+
+
+def encode_rans(pmf_file_name, in_file_name, out_file_name):
     """
-    @description: use to decode
+    @description: use to encode with the (interleaved) rANS coder
+    @param: pmf_file_name: the path of pmf file, None to build the frequencies from the input file itself
     @param: in_file_name: the path of input file
     @param: out_file_name: the path of output file
-    @return: (len(encoded), len(decoded)): (the length of encoded source, the length of decoded source)
+    @return: (len(source), len(encoded)): (the length of source, the length of encoded source)
     """
 
-    # 高低位标志，little 表示反序，左边为低位右边为高位
-    byteorder = 'little'
+    # 以 uint8 读取输入文件中的数据
+    source = fromfile(in_file_name, dtype='uint8')
+    header, encoded = encode_source_rans(source, read_pmf(pmf_file_name))
 
-    '''
-    以二进制读取文件
-    '''
-    with open(in_file_name, 'rb') as in_file:
-        # 第二位是首部长度(header_size)，以反序读取，转为 int
-        header_size = int.from_bytes(in_file.read(2), byteorder)
-        # 操作二进制数据，需使用BytesIO
-        # 以二进制读取首部(Header) header_size-2 位部分
-        header = BytesIO(in_file.read(header_size-2))
-        # 读取全部文件数据
-        encoded = in_file.read()
-
-    codebook = {}
-    # 获取 symbol_count，位于header第一位的第零位
-    symbol_count = header.read(1)[0]
-    # 获取 source_len，位于header第四位，以反序读取后转为int
-    source_len = int.from_bytes(header.read(4), byteorder)
-    # 将编码放入字典 codebook 中
-    for k in range(symbol_count+1):
-        # 读取符号
-        symbol = uint8(header.read(1)[0])
-        # 读取码字长度
-        word_len = header.read(1)[0]
-        # 码字字节数
-        word_bytes = int(ceil(word_len / 8))
-        # 码字
-        word = int.from_bytes(header.read(word_bytes), byteorder)
-        # 将码字长度、码字存入字典codebook中
-        codebook[symbol] = (word_len, word)
+    with open(out_file_name, 'wb') as out_file:
+        out_file.write(header)
+        out_file.write(encoded)
+
+    # 返回信源长度，编码后的信源长度
+    return (len(source), len(encoded))
 
-    # 将字典作为参数初始化一个HuffmanCodec类用于译码
-    codec = HuffmanCodec(codebook)
-    # 译码
-    # np.asarray()，将数据转化为ndarray但不占用新内存
-    decoded = asarray(codec.decode(encoded))[:source_len]
-    # 存入输出文件
-    decoded.tofile(out_file_name)
 
-    # 返回编码后长度，译码后长度
-    return (len(encoded), len(decoded))
+def encode_source_rans(source, pmf_bytes=None):
+    """
+    @description: encode a source in memory with the (interleaved) rANS coder
+    @param: source: uint8 array of the source
+    @param: pmf_bytes: raw contents of the pmf file, None to build the frequencies from the source itself
+    @return: (header, encoded): (the header, the encoded source)
+    """
+
+    if pmf_bytes is None:
+        # 两遍扫描：由信源的经验分布得到频数表，空文件时保留一个符号
+        P = bincount(source, minlength=256)
+        if not P.any():
+            P[0] = 1
+    else:
+        P = pmf_from_bytes(pmf_bytes)
+        # 概率为 0 的符号也分配频数（取最小的概率），与逐字节的霍夫曼编码一致
+        P[P == 0] = P[P > 0].min()
+    codec = RansCodec.from_frequencies(P)
+
+    # 长文件使用多个交错的状态，由 NumPy 同时更新
+    lanes = lanes_for(len(source))
+    encoded = codec.encode(source, lanes)
+
+    # 首部之后为状态的个数以及压缩后的频数表
+    table = compress(codec.frequencies.astype('<u2').tobytes(), 9)
+    header = gen_coder_header(CODER_RANS_INTERLEAVED, len(source))
+    header.extend(lanes.to_bytes(2, 'little'))
+    header.extend(len(table).to_bytes(4, 'little'))
+    header.extend(table)
+    return (header, encoded)
 
 
 def main(argv):
     # 参数列表：
-    #   - 编码指令 PMF文件路径 待编码的输入文件路径 编码后的输出文件路径
- 
-    pmf_file_name = argv[1]
+    #   - PMF文件路径 待编码的输入文件路径 编码后的输出文件路径 [K]
+    #   - -e 待编码的输入文件路径 编码后的输出文件路径 [K]（由输入文件的经验分布构建码书）
+    #   - -a 待编码的输入文件路径 编码后的输出文件路径（自适应霍夫曼编码）
+    #   - -r 待编码的输入文件路径 编码后的输出文件路径 [PMF文件路径]（rANS 编码）
+    # 给出 K 时以 K 字节的扩展符号为单位进行霍夫曼编码
+
     source_file_name = argv[2]
     encoded_file_name = argv[3]
+    pmf_file_name = None if argv[1] == '-e' else argv[1]
 
-    # 接收到编码指令，调用encode函数进行对输入文件进行编码
-    encode(pmf_file_name, source_file_name, encoded_file_name)
+    if argv[1] == '-a':
+        encode_adaptive(source_file_name, encoded_file_name)
+    elif argv[1] == '-r':
+        encode_rans(argv[4] if len(argv) > 4 else None, source_file_name, encoded_file_name)
+    elif len(argv) > 4:
+        encode_block(pmf_file_name, source_file_name, encoded_file_name, int(argv[4]))
+    else:
+        # 接收到编码指令，调用encode函数进行对输入文件进行编码
+        encode(pmf_file_name, source_file_name, encoded_file_name)
 
 
 if __name__ == '__main__':
@@ -1,7 +1,9 @@
-from bitstring import BitStream
 from sys import argv
-from numpy import log2
-from channelDecoder import gen_header, decode_repeat
+from os import stat
+from numpy import log2, bitwise_xor, packbits
+from bitIO import (read_bytes, read_bits, read_header, read_header_extra, decode_header, decode_repeated, header_size, count_ones,
+                   HEADER_BYTES, METHOD_REPEAT, METHOD_LINEAR, METHOD_HAMMING, METHOD_BCH, METHOD_CONV, METHOD_INTERLEAVE)
+from interleaver import deinterleave_block, deinterleave_conv, INTERLEAVE_BLOCK
 import csv
 from pathlib import Path
 
@@ -9,32 +11,40 @@ def gen_BER(FBE, FD):
     '''获取误码率
 
     Args:
-        FBE (str): 编码前文件比特流转换的字符串
-        FD (str): 解码后文件比特流转换的字符串
+        FBE (array): 编码前文件的 uint8 数组
+        FD (array): 解码后文件的 uint8 数组
 
     Returns:
         error_rate (float): 误码率
     '''
 
-    error_bit = list(map(lambda x, y: x == y, FBE, FD)).count(False)
-    error_rate = error_bit / len(FBE)
+    # 逐字节异或后统计 1 的个数即为错误比特数，只比较两者共同的长度
+    common_len = min(len(FBE), len(FD))
+    error_bit = count_ones(bitwise_xor(FBE[:common_len], FD[:common_len]))
+    error_rate = error_bit / (len(FBE) * 8)
     return error_rate
 
-def gen_Rs(method, factor):
+def gen_Rs(method, factor, n=None, k=None):
     '''获取编码前信息传输率以及编码后信息传输率
 
     Args:
-        method (str): 解码方式 0 为重复码 1 为 线性分组码
-        factor (str): 重复码的码字长度 或 线性分组码的奇偶校验长度
+        method (str): 解码方式 0 为重复码 1 为 线性分组码 2 为 汉明码 3 为 BCH 码 4 为 卷积码
+        factor (str): 重复码的码字长度 或 线性分组码的奇偶校验长度 或 卷积码码率 k/(k+1) 的 k
+        n (int): 汉明码或 BCH 码的码字长度
+        k (int): 汉明码或 BCH 码的信息组长度
 
     Returns:
         R_before (float): 编码前信息传输率
         R_after (float): 编码后信息传输率
     '''
     R_before = log2(2) / 1
-    if method == 0:
+    if method == METHOD_REPEAT:
         R_after = log2(2) / factor
-    elif method == 1:
+    elif method in (METHOD_HAMMING, METHOD_BCH):
+        R_after = k * log2(2) / n
+    elif method == METHOD_CONV:
+        R_after = factor * log2(2) / (factor + 1)
+    elif method == METHOD_LINEAR:
         if factor == 3:
             R_after = 4 * log2(2) / 7
         elif factor == 4:
@@ -48,17 +58,47 @@ def gen_Rs(method, factor):
 
     return R_before, R_after
 
-def gen_compression_ratio(source_length, FAE):
+def read_wrapped_header(path):
+    '''读取交织后文件中被交织的信道编码文件的文件头，需要读入整个文件并解交织
+
+    Args:
+        path (str): 交织后文件的路径
+
+    Returns:
+        method (int): 信道编码方式
+        factor (int): 信道编码参数
+        source_length (int): 信道编码前序列的长度
+        extra (bytes): 信道编码的附加参数
+    '''
+    bits = read_bits(path)
+    method = METHOD_INTERLEAVE
+    # 交织可以嵌套，逐层解交织直到得到信道编码文件
+    while method == METHOD_INTERLEAVE:
+        method, kind, length = decode_header(packbits(bits[:HEADER_BYTES * 8]).tobytes())
+        if method != METHOD_INTERLEAVE:
+            break
+        extra = decode_repeated(packbits(bits[HEADER_BYTES * 8:header_size(method) * 8]).tobytes())
+        a, b = int.from_bytes(extra[0:2], 'big'), int.from_bytes(extra[2:4], 'big')
+        payload = bits[header_size(method) * 8:]
+        if kind == INTERLEAVE_BLOCK:
+            bits = deinterleave_block(payload, a, b, length)
+        else:
+            bits = deinterleave_conv(payload, a, b, length)
+    factor, source_length = kind, length
+    extra = decode_repeated(packbits(bits[HEADER_BYTES * 8:header_size(method) * 8]).tobytes())
+    return method, factor, source_length, extra
+
+def gen_compression_ratio(source_length, FAE_len):
     '''获取编码前信息传输率以及编码后信息传输率
 
     Args:
         source_length (int): 编码前文件长度
-        FAE (str): 编码后文件比特流转换的字符串
+        FAE_len (int): 编码后文件的比特数
 
     Returns:
         (float): 压缩比
     '''
-    return source_length / len(FAE)
+    return source_length / FAE_len
 
 
 def output_ratios_to_file(out_file_name, data):
@@ -88,24 +128,29 @@ def main(argv):
     file_decode_path = argv[3]
     file_output_path = argv[4]
 
-    # 得到输入文件的比特流
-    file_before_encode = BitStream(filename=file_before_encode_path)
-    file_after_encode = BitStream(filename=file_after_encode_path)
-    file_decode = BitStream(filename=file_decode_path)
-
-    # 将输入文件的比特流转化为字符串
-    FBE = file_before_encode.bin
-    FAE = file_after_encode.bin
-    FD = file_decode.bin
-
-    # 获得编码后文件的头文件信息
-    headers = BitStream(bin=decode_repeat(file_after_encode, 3, method='-h'))
-    method, factor, source_length = gen_header(headers)
+    # 以 uint8 数组读入编码前文件和解码后文件
+    FBE = read_bytes(file_before_encode_path)
+    FD = read_bytes(file_decode_path)
+
+    # 编码后文件只读取文件头，其长度直接由文件大小得到
+    method, factor, source_length = read_header(file_after_encode_path)
+    FAE_len = stat(file_after_encode_path).st_size * 8
+    n = k = None
+    if method == METHOD_INTERLEAVE:
+        # 交织本身码率为 1，信息传输率与压缩比由被交织的信道编码文件的文件头得到
+        method, factor, source_length, extra = read_wrapped_header(file_after_encode_path)
+    elif method in (METHOD_HAMMING, METHOD_BCH):
+        extra = read_header_extra(file_after_encode_path, method)
+    if method in (METHOD_HAMMING, METHOD_BCH):
+        n, k = int.from_bytes(extra[0:2], 'big'), int.from_bytes(extra[2:4], 'big')
 
     # 获取 误码率、编码前后信道传输率、压缩比
     BER = gen_BER(FBE, FD)
-    R_b, R_a = gen_Rs(method, factor)
-    CR = gen_compression_ratio(source_length, FAE)
+    Rs = gen_Rs(method, factor, n, k)
+    if Rs is None:
+        raise ValueError('Unsupported coding method %d with factor %d' % (method, factor))
+    R_b, R_a = Rs
+    CR = gen_compression_ratio(source_length, FAE_len)
 
     # 将以上计算所得的信息输入到指定的文件(.CSV)中
     data = [file_before_encode_path, file_after_encode_path, file_decode_path, BER, R_b, R_a, CR]
@@ -2,9 +2,12 @@
 信道解码模块
 
 这里使用的编码文件的格式规范是：
-Header  |decode_method  : uint, 解码方式 0 为重复码 1 为 线性分组码
-        |factor : uint, 重复码的码字长度 或 线性分组码的奇偶校验长度
+Header  |decode_method  : uint, 解码方式 0 为重复码 1 为 线性分组码 2 为 汉明码 3 为 BCH 码 4 为 卷积码
+        |factor : uint, 重复码的码字长度 或 线性分组码的奇偶校验长度 或 是否为扩展汉明码 或 BCH 码可纠正的错误个数 或 卷积码码率 k/(k+1) 的 k
   ______|source_len   : uint, 编码前序列的长度
+Extra   |n            : uint, 码字长度（仅汉明码、BCH 码）
+  ______|k            : uint, 信息组长度（仅汉明码、BCH 码）
+Extra   |frame_bits   : uint, 每帧的信息位数（仅卷积码）
 Payload |encoded-data : many uint8
 '''
 
@@ -13,109 +16,170 @@ __email__ = "chy126101@gmail.com"
 __version__ = "20210102.1449"
 
 # 引入相关库
-from numpy import array, hstack, dot, identity
-from bitstring import Bits, BitStream
+from numpy import nonzero, packbits, where, zeros, uint8, intp
 from sys import argv
+from bitIO import (read_bits, write_bits, decode_header, decode_repeated, header_size,
+                   HEADER_BITS, HEADER_REPEAT, HEADER_BYTES, METHOD_REPEAT, METHOD_LINEAR, METHOD_HAMMING, METHOD_BCH, METHOD_CONV)
+from linearCodes import hamming, hamming_code
+from bchCodes import bch
+from convCodes import convolutional
 
 
-def decode_repeat(BS_decode, BDRT, method='-a'):
+def decode_repeat(BS_decode, BDRT, method='-a', erased=None):
     '''
     重复码解码，兼有解码文件头功能
 
     Args:
-        BS_dncode (bitstream): 待解码的输入文件比特流
+        BS_dncode (array): 待解码的输入文件比特数组
         BDRT (int): 重复码的码字长度
         method (str): -a 表示解码文件本身、-h 表示解码文件头，默认为 '-a'
+        erased (array): 与输入等长的删除标记比特数组，被删除的比特不参与多数判决
     Returns:
-        BS_encode_repetition (str): 解码后生成的字符串
+        BS_encode_repetition (array): 解码后的比特数组
     '''
 
-    # 三个字符串备用
-    BS_encode_repetition = '0b'
-    BS = ''
-    BS_decode_rep = ''
-
     if method == '-h':
         # 解码文件头
-        BS_decode_rep = BS_decode.bin[0:144]
+        part = slice(None, HEADER_BITS * HEADER_REPEAT)
     else:
         # 解码文件
-        BS_decode_rep = BS_decode.bin[144:]
-
-    # 解码程序本题
-    for x in BS_decode_rep:
-        BS += x
-        if len(BS) == BDRT:
-            if BS.count('1') > BS.count('0'):
-                BS_encode_repetition += '1'
-            elif BS.count('1') < BS.count('0'):
-                BS_encode_repetition += '0'
-            BS = ''
+        part = slice(HEADER_BITS * HEADER_REPEAT, None)
+    BS_decode_rep = BS_decode[part]
+
+    # 舍去末尾不足一个码字的部分
+    BS_decode_rep = BS_decode_rep[:len(BS_decode_rep) - len(BS_decode_rep) % BDRT]
 
     # 若空文件则返回 None
-    if BS_encode_repetition == '0b':
+    if len(BS_decode_rep) == 0:
         return
 
+    # 每 BDRT 个比特做一次多数判决，有删除时只在未删除的比特中判决
+    BS_decode_rep = BS_decode_rep.reshape(-1, BDRT)
+    if erased is None:
+        votes = BS_decode_rep.sum(axis=1, dtype=intp)
+        BS_encode_repetition = (votes * 2 > BDRT).astype(uint8)
+    else:
+        E = erased[part][:BS_decode_rep.size].reshape(-1, BDRT)
+        votes = (BS_decode_rep & ~E).sum(axis=1, dtype=intp)
+        BS_encode_repetition = (votes * 2 > BDRT - E.sum(axis=1, dtype=intp)).astype(uint8)
+
     return BS_encode_repetition
 
 
-def decode_linear(C_decode, j):
+def decode_linear(C_decode, j, erased=None):
     '''
     线性分组码解码
 
     Args:
-        C_dncode (bitstream): 待解码的输入文件比特流
+        C_dncode (array): 待解码的输入文件比特数组
         j (int): 奇偶校验长度
+        erased (array): 与输入等长的删除标记比特数组
     Returns:
-        BS_info_mat_str (str): 解码后生成的字符串
+        BS_info_mat_ravel (array): 解码后的比特数组
     '''
 
-    # 根据奇偶校验长度，得到(n, k)线性分组码的 n, k
-    if j == 3:
-        n = 7
-        k = 4
-    elif j == 4:
-        n = 15
-        k = 11
-    else:
-        n = 31
-        k = 26
+    # 根据奇偶校验长度，得到(n, k)线性分组码
+    code = hamming(j if j in (3, 4) else 5)
 
     # 去掉文件头部分开始解码
-    BS_bin = C_decode.bin[144:]
+    if erased is not None:
+        erased = erased[HEADER_BITS * HEADER_REPEAT:]
+    return decode_code(C_decode[HEADER_BITS * HEADER_REPEAT:], code, erased)
+
+
+def decode_code(BS_bin, code, erased=None):
+    '''
+    系统线性分组码解码，查伴随式表纠正单个错误；有删除的码字在 GF(2) 上解方程恢复被删除的比特
+
+    Args:
+        BS_bin (array): 去掉文件头后的比特数组
+        code (LinearCode): 线性分组码
+        erased (array): 与 BS_bin 等长的删除标记比特数组
+    Returns:
+        BS_info_mat_ravel (array): 解码后的比特数组
+    '''
+    n = code.n
+    k = code.k
 
     # 还原成 n列 的矩阵形式
     BS_len = len(BS_bin)
-    overflow0 = BS_len % n
-    if overflow0 != 0:
-        BS_bin = BS_bin[:(BS_len - overflow0)]
-    BS_bin_arr = array([int(BS_bin[i], 2) for i in range(len(BS_bin))])
-    BS_data_mat = BS_bin_arr.reshape(-1, n)
+    BS_data_mat = BS_bin[:BS_len - BS_len % n].reshape(-1, n)
 
-    # 获得信息组
-    BS_info_mat = BS_data_mat[:, :k]
+    # 恢复被删除的比特
+    if erased is not None:
+        E_mat = erased[:BS_data_mat.size].reshape(-1, n).astype(bool)
+        BS_data_mat = code.solve_erasures(where(E_mat, 0, BS_data_mat).astype(uint8), E_mat)
 
-    # 获得校验矩阵
-    GT = genG(j)[:, k:].T
-    H = hstack((GT, identity(GT.shape[0])))
+    # 获得信息组
+    BS_info_mat = BS_data_mat[:, :k].copy()
 
-    # 获得伴随式
-    S = dot(BS_data_mat, H.T) % 2
+    # 获得伴随式，查表得到出错位置，有删除的码字不再纠错
+    err = code.syndrome_table[code.syndrome(BS_data_mat)]
+    if erased is not None:
+        err[E_mat.any(axis=1)] = -1
 
     # 纠错
-    HT = array(H.T)
-    pos = []
-    for i in range(len(S)):
-        for j in range(len(HT)):
-            if (S[i] == HT[j]).all():
-                pos.append((i, j))
+    rows = nonzero(err >= 0)[0]
+    pos = (rows, err[rows])
     BS_info_mat = linear_correct(BS_info_mat, pos, k)
 
-    # 将矩阵转换为字符串
+    # 将矩阵展开为比特数组
     BS_info_mat_ravel = BS_info_mat.ravel()
-    BS_info_mat_str = ''.join(str(i) for i in BS_info_mat_ravel)
 
-    return BS_info_mat_str
+    return BS_info_mat_ravel
+
+
+def decode_bch(BS_bin, code):
+    '''
+    BCH 码解码，查表求余式找出有错的码字，再由伴随式求错误位置并纠正
+
+    Args:
+        BS_bin (array): 去掉文件头后的比特数组
+        code (BCHCode): BCH 码
+    Returns:
+        BS_info_mat_ravel (array): 解码后的比特数组
+    '''
+    n = code.n
+    k = code.k
+
+    # 还原成 n列 的矩阵形式
+    BS_len = len(BS_bin)
+    BS_data_mat = BS_bin[:BS_len - BS_len % n].reshape(-1, n)
+
+    # 获得信息组
+    BS_info_mat = BS_data_mat[:, :k].copy()
+
+    # 余式不为 0 的码字有错，只对这些码字计算伴随式，再同时求出所有码字的错误位置
+    R = code.remainder(BS_data_mat)
+    rows = nonzero(R.any(axis=1))[0]
+    err_rows, err_cols = code.error_positions(code.syndromes(R[rows]))
+
+    # 纠错，错误个数超过 t 的码字不纠正
+    BS_info_mat = linear_correct(BS_info_mat, (rows[err_rows], err_cols), k)
+
+    # 将矩阵展开为比特数组
+    BS_info_mat_ravel = BS_info_mat.ravel()
+
+    return BS_info_mat_ravel
+
+
+def decode_conv(BS_bin, code):
+    '''
+    卷积码解码，逐帧 Viterbi 解码
+
+    Args:
+        BS_bin (array): 去掉文件头后的比特数组
+        code (ConvolutionalCode): 卷积码
+    Returns:
+        (array): 解码后的比特数组
+    '''
+    n = code.frame_len
+
+    # 还原成每行一帧的矩阵形式，舍去末尾补的 0
+    BS_len = len(BS_bin)
+    BS_data_mat = BS_bin[:BS_len - BS_len % n].reshape(-1, n)
+
+    return code.decode(BS_data_mat).ravel()
 
 
 def linear_correct(BS_info_mat, pos, n):
@@ -124,14 +188,14 @@ def linear_correct(BS_info_mat, pos, n):
 
     Args:
         BS_info_mat (array): 信息组
-        pos (liat): 误码位置
+        pos (tuple): 误码位置，(行下标数组, 列下标数组)
         n (int): 信息组的长度，与监督元相区别
     Returns:
         BS_info_mat (array): 纠错后的信息组
     '''
-    for i in range(len(pos)):
-        if pos[i][1] < n:
-            BS_info_mat[pos[i]] = not(BS_info_mat[pos[i]]) + 0
+    rows, cols = pos
+    in_info = cols < n
+    BS_info_mat[rows[in_info], cols[in_info]] ^= 1
     return BS_info_mat
 
 
@@ -140,15 +204,16 @@ def gen_header(headers):
     获取文件头信息
 
     Args:
-        headers (bitstream): 文件头
+        headers (array): 文件头比特数组
     Returns:
         method (int): 编码方式，0 为重复码 1 为 线性分组码
         factor (int): 重复码的码字长度 或 线性分组码的奇偶校验长度
         source_length (int): 编码前序列的长度
     '''
-    method = int(headers.bin[0:8], 2)
-    factor = int(headers.bin[8:16], 2)
-    source_length = int(headers.bin[16:], 2)
+    headers = packbits(headers).tobytes()
+    method = headers[0]
+    factor = headers[1]
+    source_length = int.from_bytes(headers[2:6], 'big')
     return method, factor, source_length
 
 
@@ -161,77 +226,8 @@ def genG(j):
     Returns:
         (array): 指定的生成矩阵
     '''
-    G_7_4 = ((1, 0, 0, 0, 1, 1, 1),
-             (0, 1, 0, 0, 1, 0, 1),
-             (0, 0, 1, 0, 0, 1, 1),
-             (0, 0, 0, 1, 1, 1, 0))
-    G_15_11 = ((1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1),
-               (0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 1),
-               (0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 0),
-               (0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1),
-               (0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 1, 0, 0, 1),
-               (0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 1, 0, 1, 0),
-               (0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, 1, 1),
-               (0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 1, 1, 0, 0),
-               (0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 1, 1, 0, 1),
-               (0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 1, 1, 1, 0),
-               (0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1),)
-    G_31_26 = [[1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1],
-               [0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 0],
-               [0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1],
-               [0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 0, 1],
-               [0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 1],
-               [0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 0],
-               [0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1],
-               [0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 0, 0],
-               [0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 1],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 1, 0],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 1, 1],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 0, 0],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 0, 1],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 0],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 0, 1, 1],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 1],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 1, 0],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 1, 1],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 1, 0, 1, 0, 0],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 1, 0, 1, 0, 1],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, 1, 1, 0],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 1, 0, 1, 1, 1],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 1, 1, 0, 0, 0],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 1, 1, 0, 0, 1],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 0, 1, 0]]
-    if j == 3:
-        return array(G_7_4)
-    elif j == 4:
-        return array(G_15_11)
-    elif j == 5:
-        return array(G_31_26)
+    if j in (3, 4, 5):
+        return hamming(j).G
     else:
         return None
 
@@ -243,17 +239,16 @@ def IO(PATH, method='I', data=None):
     Args:
         PATH (str): 文件路径
         method (str): 需要使用的方法，I(输入)、O(输出)，默认为 I
-        data (array): 需要输出到指定文件中的数据，若空置则无输出或生成一个空文件
+        data (array): 需要输出到指定文件中的比特数组，若空置则无输出或生成一个空文件
     Returns:
-        (BitStream): 当调用输入方法时返回输入文件的比特流
+        (array): 当调用输入方法时返回输入文件的比特数组
     '''
 
     def I(PATH):
-        return BitStream(filename=PATH)
+        return read_bits(PATH)
 
     def O(PATH, data):
-        with open(PATH, 'wb') as ofs:
-            data.tofile(ofs)
+        write_bits(PATH, data)
 
     if method == 'I':
         return I(PATH)
@@ -263,32 +258,83 @@ def IO(PATH, method='I', data=None):
         return
 
 
+def channel_decode(BS_decode, E=None):
+    '''
+    由文件头得到编码方式并解码
+
+    Args:
+        BS_decode (array): 编码后文件的比特数组，包括文件头
+        E (array): 与 BS_decode 等长的删除标记比特数组
+    Returns:
+        (array): 解码后的比特数组，编码方式不支持时为 None
+    Raises:
+        ValueError: 文件头中的参数无效，例如文件头被信道错误破坏
+    '''
+
+    # 获取文件头信息
+    if len(BS_decode) < HEADER_BYTES * 8:
+        raise ValueError('Truncated header')
+    method, factor, source_length = decode_header(*_header_bytes(BS_decode, E, 0, HEADER_BYTES))
+
+    def read_extra():
+        return decode_repeated(*_header_bytes(BS_decode, E, HEADER_BYTES, header_size(method)))
+
+    # 根据文件头信息解码
+    if method == METHOD_REPEAT:
+        if factor == 0:
+            raise ValueError('Invalid repetition length 0')
+        R = decode_repeat(BS_decode, factor, erased=E)
+    elif method == METHOD_LINEAR:
+        R = decode_linear(BS_decode, factor, E)
+    elif method == METHOD_HAMMING:
+        # 由附加参数得到 (n, k)，factor 表示是否为扩展汉明码
+        extra = read_extra()
+        code = hamming_code(int.from_bytes(extra[0:2], 'big'), int.from_bytes(extra[2:4], 'big'), factor == 1)
+        R = decode_code(BS_decode[header_size(method) * 8:], code, None if E is None else E[header_size(method) * 8:])
+    elif method == METHOD_BCH:
+        # 由附加参数中的码字长度 n = 2^m - 1 得到 m，factor 为可纠正的错误个数
+        extra = read_extra()
+        code = bch(int.from_bytes(extra[0:2], 'big').bit_length(), factor)
+        R = decode_bch(BS_decode[header_size(method) * 8:], code)
+    elif method == METHOD_CONV:
+        # factor 为码率 k/(k+1) 的 k，附加参数为每帧的信息位数
+        extra = read_extra()
+        code = convolutional(factor, int.from_bytes(extra[0:2], 'big'))
+        R = decode_conv(BS_decode[header_size(method) * 8:], code)
+    else:
+        return
+
+    # 文件头之后没有数据（空文件）
+    if R is None:
+        R = zeros(0, dtype=uint8)
+
+    return R[:source_length]
+
+
+def _header_bytes(BS_decode, E, start, stop):
+    '''
+    取出比特数组及删除标记中第 start 到 stop 字节的文件头，没有删除标记时后者为 None
+    '''
+    part = slice(start * 8, stop * 8)
+    return [None if bits is None else packbits(bits[part]).tobytes() for bits in (BS_decode, E)]
+
+
 def main(argv):
 
-    # 处理用户输入数据
+    # 处理用户输入数据，可选的第三个参数为删除信道输出的删除标记文件
     INPUT = argv[1]
     OUTPUT = argv[2]
+    ERASURES = argv[3] if len(argv) > 3 else None
 
-    # 得到文件信息比特流
+    # 得到文件信息比特数组
     BS_decode = IO(INPUT, method='I')
+    E = IO(ERASURES, method='I') if ERASURES else None
 
-    # 获取文件头信息
-    headers = BitStream(bin=decode_repeat(BS_decode, 3, method='-h'))
-    method, factor, source_length = gen_header(headers)
-
-    # 根据文件头信息解码
-    if method == 0:
-        R_str = decode_repeat(BS_decode, factor)
-    elif method == 1:
-        R_str = decode_linear(BS_decode, factor)
-    else:
+    R = channel_decode(BS_decode, E)
+    if R is None:
         return
 
-    # 将解码后的信息流写入指定文件中
-    if method == 0 or (method == 1 and factor == 3):
-        R = BitStream(bin=R_str[0:source_length + 2])
-    else:
-        R = BitStream(bin=R_str[0:source_length])
+    # 将解码后的比特数组写入指定文件中
     IO(OUTPUT, method='O', data=R)
 
 if __name__ == "__main__":
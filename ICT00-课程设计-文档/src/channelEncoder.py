@@ -2,9 +2,12 @@
 信道编码模块
 
 这里使用的编码文件的格式规范是：
-Header  |decode_method  : uint, 解码方式 0 为重复码 1 为 线性分组码
-        |factor : uint, 重复码的码字长度 或 线性分组码的奇偶校验长度
+Header  |decode_method  : uint, 解码方式 0 为重复码 1 为 线性分组码 2 为 汉明码 3 为 BCH 码 4 为 卷积码
+        |factor : uint, 重复码的码字长度 或 线性分组码的奇偶校验长度 或 是否为扩展汉明码 或 BCH 码可纠正的错误个数 或 卷积码码率 k/(k+1) 的 k
   ______|source_len   : uint, 编码前序列的长度
+Extra   |n            : uint, 码字长度（仅汉明码、BCH 码）
+  ______|k            : uint, 信息组长度（仅汉明码、BCH 码）
+Extra   |frame_bits   : uint, 每帧的信息位数（仅卷积码）
 Payload |encoded-data : many uint8
 '''
 
@@ -12,30 +15,29 @@ __author__ = "Chen, Huiyu"
 __email__ = "chy126101@gmail.com"
 __version__ = "20210102.1458"
 
-from bitstring import Bits, BitStream
 from sys import argv
-from numpy import dot, array, hstack
+from numpy import dot, repeat, hstack, uint8
+from bitIO import read_bits, write_bits, pad_zero, encode_header, METHOD_REPEAT, METHOD_LINEAR, METHOD_HAMMING, METHOD_BCH, METHOD_CONV
+from linearCodes import hamming
+from bchCodes import bch
+from convCodes import convolutional, FRAME_BITS
 
 def encode_repeat(BS_encode, n):
     '''
     重复码编码
 
     Args:
-        BS_encode (bitstream): 输入文件比特流
+        BS_encode (array): 输入文件比特数组
         n (int): 重复码的码字长度
     Returns:
-        BS_encode_repetition (bitstream): 编码后的比特流
+        BS_encode_repetition (array): 编码后的比特数组
     '''
     # 判断是否是规定的重复码的码字长度
     if (n in (3, 5, 7, 9)) == False:
         return
 
-    # 转成二进制便于编码
-    BS_encode_bin = BS_encode.bin
-    BS_encode_rep = ''
-    for i in BS_encode_bin:
-        BS_encode_rep += n * i
-    BS_encode_repetition = BitStream(bin=BS_encode_rep)
+    # 每个比特连续重复 n 次
+    BS_encode_repetition = repeat(BS_encode, n)
 
     return BS_encode_repetition
 
@@ -44,39 +46,72 @@ def encode_linear(BS_encode, j):
     线性分组码编码
 
     Args:
-        BS_encode (bitstream): 输入文件比特流
+        BS_encode (array): 输入文件比特数组
         j (int): 奇偶校验码的码字长度
     Returns:
-        C (array): 编码后的数组
+        C (array): 编码后的比特数组
     '''
     if (j in (3, 4, 5))== False:
         return
 
-    # 获取生成矩阵
-    G = genG(j)
-
-    # 将比特流转换为数组形式
-    BS_bin = BS_encode.bin
-    BS_len = len(BS_bin)
-    BS_bin_arr = array([int(BS_bin[i], 2) for i in range(BS_len)])
-
-    # 将数组转换为指定样式（由奇偶校验长度j决定）的矩阵
-    if j == 3:
-        BS_bin_arr = addZero(BS_bin_arr, 4)
-        BS_mat = BS_bin_arr.reshape(-1, 1).reshape(-1, 4)
-    elif j == 4:
-        BS_bin_arr = addZero(BS_bin_arr, 11)
-        BS_mat = BS_bin_arr.reshape(-1, 1).reshape(-1, 11)
-    elif j == 5:
-        BS_bin_arr = addZero(BS_bin_arr, 26)
-        BS_mat = BS_bin_arr.reshape(-1, 1).reshape(-1, 26)
-
-    # 矩阵相乘相加，得到编码后的数组
-    C = dot(BS_mat, G).ravel() % 2
-    C = addZero(C, 8)
-    C_str = ''.join(str(i) for i in C)
-    C_BS = BitStream(bin=C_str)
-    return C_BS
+    return encode_code(BS_encode, hamming(j))
+
+def encode_code(BS_encode, code):
+    '''
+    系统线性分组码编码
+
+    Args:
+        BS_encode (array): 输入文件比特数组
+        code (LinearCode): 线性分组码
+    Returns:
+        C (array): 编码后的比特数组
+    '''
+    k = code.k
+
+    # 将比特数组转换为每行 k 个信息位的矩阵
+    BS_mat = pad_zero(BS_encode, k).reshape(-1, k)
+
+    # 系统码：信息位之后附加由校验部分 P 得到的校验位
+    parity = (dot(BS_mat, code.P) % 2).astype(uint8)
+    C = hstack((BS_mat, parity)).ravel()
+    C = pad_zero(C, 8)
+    return C
+
+def encode_bch(BS_encode, code):
+    '''
+    BCH 码编码，校验位按字节查表计算
+
+    Args:
+        BS_encode (array): 输入文件比特数组
+        code (BCHCode): BCH 码
+    Returns:
+        C (array): 编码后的比特数组
+    '''
+    k = code.k
+
+    # 将比特数组转换为每行 k 个信息位的矩阵
+    BS_mat = pad_zero(BS_encode, k).reshape(-1, k)
+
+    C = code.encode(BS_mat).ravel()
+    C = pad_zero(C, 8)
+    return C
+
+def encode_conv(BS_encode, code):
+    '''
+    卷积码编码，每帧末尾补 0 使编码器回到全零状态
+
+    Args:
+        BS_encode (array): 输入文件比特数组
+        code (ConvolutionalCode): 卷积码
+    Returns:
+        C (array): 编码后的比特数组
+    '''
+    # 将比特数组转换为每行一帧信息位的矩阵
+    BS_mat = pad_zero(BS_encode, code.frame_bits).reshape(-1, code.frame_bits)
+
+    C = code.encode(BS_mat).ravel()
+    C = pad_zero(C, 8)
+    return C
 
 def IO(PATH, method='I', data=None):
     '''
@@ -85,16 +120,15 @@ def IO(PATH, method='I', data=None):
     Args:
         PATH (str): 文件路径
         method (str): 需要使用的方法，I(输入)、O(输出)，默认为 I
-        data (array): 需要输出到指定文件中的数据，若空置则无输出或生成一个空文件
+        data (tuple): 需要按顺序输出到指定文件中的若干段比特数组
     Returns:
-        (BitStream): 当调用输入方法时返回输入文件的比特流
+        (array): 当调用输入方法时返回输入文件的比特数组
     '''
 
     def I(PATH):
-        return BitStream(filename=PATH)
+        return read_bits(PATH)
     def O(PATH, data):
-        with open(PATH, 'wb') as ofs:
-            data.tofile(ofs)
+        write_bits(PATH, *data)
 
     if method=='I':
         return I(PATH)
@@ -103,24 +137,21 @@ def IO(PATH, method='I', data=None):
     else:
         return
 
-def gen_header(method, var, BS_len, BS):
+def gen_header(method, var, BS_len, BS, extra=b''):
     '''
     生成文件头
 
     Args:
-        method (int): 编码方式，0 为重复码 1 为 线性分组码
-        var (int): 重复码的码字长度 或 线性分组码的奇偶校验长度
+        method (int): 编码方式，0 为重复码 1 为 线性分组码 2 为 汉明码 3 为 BCH 码 4 为 卷积码
+        var (int): 重复码的码字长度 或 线性分组码的奇偶校验长度 或 是否为扩展汉明码 或 BCH 码可纠正的错误个数 或 卷积码码率 k/(k+1) 的 k
         BS_len (int): 编码前序列的长度
-        BS (bitstream): 编码后文件比特流
+        BS (array): 编码后文件比特数组
+        extra (bytes): 文件头附加参数
     Returns:
-        source (bitstream): 最终输出文件比特流
+        source (tuple): 文件头与编码后文件的比特数组，按顺序输出
     '''
-    method = BitStream(uint=method, length=8)
-    factor = BitStream(uint=var, length=8)
-    source_length = Bits(uint=BS_len, length=32)
-    headers = encode_repeat(method + factor + source_length, 3)
-    source = headers + BS
-    return source
+    headers = encode_header(method, var, BS_len, extra)
+    return headers, BS
 
 def genG(j):
     '''
@@ -131,121 +162,88 @@ def genG(j):
     Returns:
         (array): 指定的生成矩阵
     '''
-    G_7_4 = ((1, 0, 0, 0, 1, 1, 1),
-             (0, 1, 0, 0, 1, 0, 1),
-             (0, 0, 1, 0, 0, 1, 1),
-             (0, 0, 0, 1, 1, 1, 0))
-    G_15_11 = ((1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1),
-               (0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 1),
-               (0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 0),
-               (0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1),
-               (0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 1, 0, 0, 1),
-               (0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 1, 0, 1, 0),
-               (0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, 1, 1),
-               (0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 1, 1, 0, 0),
-               (0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 1, 1, 0, 1),
-               (0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 1, 1, 1, 0),
-               (0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1),)
-    G_31_26 = [[1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1],
-               [0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 0],
-               [0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1],
-               [0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 0, 1],
-               [0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 1],
-               [0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 0],
-               [0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1],
-               [0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 0, 0],
-               [0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 1],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 1, 0],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 1, 1],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 0, 0],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 0, 1],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 0],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1,
-                   0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 0, 1, 1],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 1],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 1, 0],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 1, 1],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 1, 0, 1, 0, 0],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 1, 0, 1, 0, 1],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, 1, 1, 0],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 1, 0, 1, 1, 1],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 1, 1, 0, 0, 0],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                   0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 1, 1, 0, 0, 1],
-               [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 0, 1, 0]]
-    if j == 3:
-        return array(G_7_4)
-    elif j == 4:
-        return array(G_15_11)
-    elif j == 5:
-        return array(G_31_26)
+    if j in (3, 4, 5):
+        return hamming(j).G
     else:
         return None
 
-def addZero(arr, n):
+def channel_encode(BS, method, factor, arg=None):
     '''
-    根据需要在数组后面补足 0
+    按命令行中的编码方式对比特数组进行信道编码
 
-    Args：
-        arr (array): 指定的数组
-        n (int): 需要添加的最长长度
+    Args:
+        BS (array): 输入文件比特数组
+        method (str): 编码方式，-r, -l, -h, -H, -b, -c，含义与命令行相同
+        factor (int): 编码方式的第一个参数
+        arg (int): 编码方式的第二个参数，汉明码缩短后的码字长度 或 BCH 码可纠正的错误个数
+    Returns:
+        (tuple): 文件头与编码后的比特数组，编码方式不支持时为 None
     '''
-    lack0 = len(arr) % n
-    if lack0 != 0:
-        arr = hstack((arr, array([0] * (n - lack0))))
-    return arr
-
-def main(argv):
-
-    # 处理用户输入
-    method = argv[1]
-    INPUT = argv[2]
-    OUTPUT = argv[3]
-    factor = int(argv[4])
-
-    # 获取用户输入文件的比特流
-    BS = IO(INPUT, method='I')
     BS_len = len(BS)
 
     # 根据用户输入的参数，调用相关信道编码方式
     M = -1
+    extra = b''
     if method == '-r':
         # 重复码 3, 5, 7
         C = encode_repeat(BS, factor)
-        M = 0
+        M = METHOD_REPEAT
     elif method == '-l':
         # 汉明码 3, 4, 5
         C = encode_linear(BS, factor)
-        M = 1
+        M = METHOD_LINEAR
+    elif method in ('-h', '-H'):
+        # 任意 m 的汉明码，-H 为扩展汉明码，可选参数为缩短后的码字长度
+        extended = method == '-H'
+        code = hamming(factor, extended, arg)
+        C = encode_code(BS, code)
+        M = METHOD_HAMMING
+        factor = int(extended)
+        extra = code.n.to_bytes(2, 'big') + code.k.to_bytes(2, 'big')
+    elif method == '-b':
+        # 码长 2^m - 1、可纠正 t 个错误的 BCH 码，参数为 m t
+        if arg is None:
+            raise ValueError('BCH 码需要两个参数 m t，例如 -b 8 2')
+        code = bch(factor, arg)
+        if code.t > 255:
+            # 文件头中 t 占一个字节
+            raise ValueError('BCH 码的 t 应不超过 255')
+        C = encode_bch(BS, code)
+        M = METHOD_BCH
+        factor = code.t
+        extra = code.n.to_bytes(2, 'big') + code.k.to_bytes(2, 'big')
+    elif method == '-c':
+        # 卷积码，码率 1/2, 2/3, 3/4 对应 factor 为 1, 2, 3，短文件只用一帧
+        code = convolutional(factor, min(FRAME_BITS, max(BS_len, 1)))
+        C = encode_conv(BS, code)
+        M = METHOD_CONV
+        extra = code.frame_bits.to_bytes(2, 'big')
     else:
         return
 
-    C_final = gen_header(M, factor, BS_len, C)
+    # 参数不支持时（如重复码的码字长度为偶数）编码函数返回 None
+    if C is None:
+        return
+
+    return gen_header(M, factor, BS_len, C, extra)
+
+def main(argv):
+
+    # 处理用户输入
+    method = argv[1]
+    INPUT = argv[2]
+    OUTPUT = argv[3]
+    factor = int(argv[4])
+    arg = int(argv[5]) if len(argv) > 5 else None
+
+    # 获取用户输入文件的比特数组
+    BS = IO(INPUT, method='I')
+
+    C_final = channel_encode(BS, method, factor, arg)
+    if C_final is None:
+        return
 
-    # 将编码后的比特流输出到指定路径中
+    # 将编码后的比特数组输出到指定路径中
     IO(OUTPUT, method='O', data=C_final)
 
 if __name__ == "__main__":
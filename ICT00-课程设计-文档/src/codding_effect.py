@@ -1,93 +1,95 @@
 from sys import argv
-from bitstring import Bits, BitStream
 from csv import writer
-from numpy import log,uint8,ceil,log2
-from io import BytesIO
-def H_s(BS):
+from numpy import log2,dot,zeros
+from bitIO import read_histogram, LUT_num_of_1
+from byteSource import ganExtend
+from byteSourceDecoder import read_header
+
+def H_s(hist):
     '''计算信息熵
         根据用户输入的文件计算编码前文件信息熵和编码后文件信息熵
         Args:
-            BS (BitStream): 文件的比特流
+            hist (array): 文件中每个字节取值出现的次数
 
         Returns:
             H(BS1)编码前文件的信息熵    (信息比特/字节)
             H(BS2)编码后文件的信息熵    (信息比特/字节)
     '''
     #由于一个字节由八个二进制字符组成，因此可视为二进制字符信源的八次拓展
-    count = 0
-    for i in range(len(BS)):
-        if BS[i]==1:
-            count=count+1           #数出二进制串1的个数即可
-    P1=count/len(BS)
+    count = int(dot(hist, LUT_num_of_1))    #每种字节的出现次数乘以其中1的个数，即为二进制串1的个数
+    P1=count/(hist.sum()*8)
     P0=1-P1
-    Hs_bit=-P1*log2(P1)-P0*log2(P0)   #计算平均1bit的信息熵
+    Hs_bit=-sum(p*log2(p) for p in (P0, P1) if p > 0)   #计算平均1bit的信息熵
     Hs_byte=Hs_bit*8                    #乘以8即等于平均一个字节的信息熵
     return Hs_byte,P0
 
-def compress_ratio(BS1,BS2):
+def H_byte(hist):
+    '''计算字节信息熵
+        直接由文件中各字节取值的经验分布计算信息熵，不假设字节内各比特相互独立
+        Args:
+            hist (array): 文件中每个字节取值出现的次数
+
+        Returns:
+            H(float)文件的字节信息熵    (信息比特/字节)
+    '''
+    P = hist[hist > 0]/hist.sum()
+    return float(-dot(P, log2(P)))
+
+def compress_ratio(len1,len2):
     '''计算压缩比
         根据用户输入的文件计算压缩比
         Args:
-            BS1 (BitStream): 文件1的比特流
-            BS2 (BitStream): 文件2的比特流
+            len1 (int): 文件1的长度
+            len2 (int): 文件2的长度
         Returns:
             compress(float)压缩比
     '''
     #用编码前文件大小除以编码后文件大小即可得到压缩比
-    compress = len(BS1)/len(BS2)
+    compress = len1/len2
     return compress
 
-def l(in_file_name,P0):
+def code_lengths(codebook):
+    '''读取码书中各符号的码长
+        根据编码后文件首部中的码书，得到每个信源符号对应的码字长度
+        Args:
+            codebook(dict): 由 read_header 读出的码书
+
+        Returns:
+            L(array)长度为 256 的数组，第 i 个元素为符号 i 的码字长度，未出现在码书中的符号为 0
+    '''
+    L = zeros(256)
+    for symbol, (word_len, word) in codebook.items():
+        L[symbol] = word_len
+    return L
+
+def l(in_file_name,P):
     '''计算平均码长
         根据用户输入的文件计算平均码长
         Args:
             in_file_name(string): 输入文件
+            P(array): 信源字节的概率分布，可以是由 P0 得到的八次扩展，也可以是信源文件的经验分布
 
         Returns:
-            l(float)平均码长           (码字数据比特/信源字节)
+            l(float)平均码长           (码字数据比特/信源字节)，没有码书且信源为空时为 nan
     '''
-    byteorder = 'little'
     with open(in_file_name, 'rb') as in_file:
-        # 第二位是首部长度(header_size)，以反序读取，转为 int
-        header_size = int.from_bytes(in_file.read(2), byteorder)
-        # 操作二进制数据，需使用BytesIO
-        # 以二进制读取首部(Header) header_size-2 位部分
-        header = BytesIO(in_file.read(header_size-2))
-        # 读取全部文件数据
-        encoded = in_file.read()
-
-    codebook = {}
-    # 获取 symbol_count，位于header第一位的第零位
-    symbol_count = header.read(1)[0]
-    # 获取 source_len，位于header第四位，以反序读取后转为int
-    source_len = int.from_bytes(header.read(4), byteorder)
-    # 读取码书信息
-    len_code=0
-    for k in range(symbol_count+1):
-        # 读取符号
-        symbol = uint8(header.read(1)[0])
-        # 读取码字长度
-        word_len = header.read(1)[0]
-        # 码字字节数
-        word_bytes = int(ceil(word_len / 8))
-        # 码字
-        word = int.from_bytes(header.read(word_bytes), byteorder)
-        c=bin(symbol)[2:].rjust(8,'0')              #这里将码书的符号转换为8位二进制位
-
-        cou = 0
-        for b in range(len(c)):         #由于码书符号对应的是编码前的码书符号，所以这里用编码前给定的概率P0反算每一个码书符号的概率
-            if c[b]=='0':
-                cou=cou+1
-        len_code = len_code+word_len*pow(P0,cou)*pow(1-P0,8-cou)  #用对应的码书符号概率乘以这个码书符号所对应的编码后码字长度，即可得到平均码长
+        coder_id, codebook, source_len = read_header(in_file)
+        if codebook is None:
+            #没有码书时，用编码后数据的实际比特数除以信源符号个数作为平均码长；信源为空时平均码长无定义
+            if source_len == 0:
+                return float('nan')
+            return len(in_file.read())*8/source_len
+    #用每个码书符号的概率乘以其对应的码字长度再求和，即可得到平均码长
+    len_code = float(dot(code_lengths(codebook), P))
 
     return len_code
 
 def coding_efficiency(Hs,L):
     '''计算编码效率
-        根据用户输入的文件计算编码效率以及编码前文件信息熵和编码后文件信息熵
+        用编码前信源的信息熵除以平均码长得到编码效率
         Args:
-            BS1 (BitStream): 文件1的比特流
-            BS2 (BitStream): 文件2的比特流
+            Hs (float): 编码前文件的信息熵    (信息比特/字节)
+            L (float): 平均码长               (码字数据比特/信源字节)
 
         Returns:
             effict(float)编码效率
@@ -104,21 +106,29 @@ def main(argv):
     INPUT2 = argv[2]
     RESULT = argv[3]
 
-    BS1 = BitStream(filename=INPUT1)
-    BS2 = BitStream(filename=INPUT2)
+    hist1 = read_histogram(INPUT1)
+    hist2 = read_histogram(INPUT2)
 
 
-    H_before,P0_before = H_s(BS1)
-    H_after,P0_after = H_s(BS2)
-    channel_ratio = compress_ratio(BS1,BS2)
-    BS2_LEN = l(INPUT2,P0_before)
+    H_before,P0_before = H_s(hist1)
+    H_after,P0_after = H_s(hist2)
+    H_after_byte = H_byte(hist2)
+    channel_ratio = compress_ratio(hist1.sum(),hist2.sum())
+    #由编码前的P0得到的八次扩展分布计算平均码长和编码效率
+    BS2_LEN = l(INPUT2,ganExtend(P0_before))
     cod = coding_efficiency(H_before,BS2_LEN)
+    #由编码前文件的经验分布计算平均码长和编码效率
+    H_before_byte = H_byte(hist1)
+    BS2_LEN_emp = l(INPUT2,hist1/hist1.sum())
+    cod_emp = coding_efficiency(H_before_byte,BS2_LEN_emp)
 
     with open(RESULT, 'a') as of:
         f_csv = writer(of)
         f_csv.writerow(['编码前的文件', '编码前的文件的信息熵(信息比特/字节)', '编码后的文件',
-                        '编码后的文件的信息熵(信息比特/字节)', '压缩比', '平均码长', '编码效率'])
-        f_csv.writerow([INPUT1,str(H_before), INPUT2, str(H_after),str(channel_ratio),str(BS2_LEN),str(cod)])
+                        '编码后的文件的信息熵(信息比特/字节)', '编码后的文件的字节信息熵(信息比特/字节)', '压缩比', '平均码长', '编码效率',
+                        '编码前的文件的字节信息熵(信息比特/字节)', '平均码长(经验分布)', '编码效率(经验分布)'])
+        f_csv.writerow([INPUT1,str(H_before), INPUT2, str(H_after),str(H_after_byte),str(channel_ratio),str(BS2_LEN),str(cod),
+                        str(H_before_byte),str(BS2_LEN_emp),str(cod_emp)])
 
 if __name__ == '__main__':
     main(argv)
@@ -0,0 +1,195 @@
+'''
+卷积码模块
+
+约束长度 K = 7、生成多项式为 (171, 133)（八进制）的 1/2 码率卷积码，经删余可得 2/3、3/4 码率。
+删余图样按输出顺序 (c1, c2, c1, c2, ...) 给出，1 表示发送，0 表示删去。
+
+输入序列被分成每帧 frame_bits 个信息位，每帧末尾补 K-1 个 0 使编码器回到全零状态，
+因此各帧可以独立解码。解码采用硬判决 Viterbi 算法，每一步的加比选对一批帧的全部状态同时进行，
+判决比特按状态打包保存，到帧尾再一次回溯，内存只取决于每批的帧数，与文件长度无关。
+被删去的比特解码时视为删除，不计入分支度量。
+'''
+
+from functools import lru_cache
+from numpy import (zeros, full, arange, stack, tile, repeat, take, nonzero, packbits, minimum,
+                   uint8, int16, int32, intp)
+
+# 约束长度与生成多项式，生成多项式的最高位对应当前输入
+CONSTRAINT_LENGTH = 7
+GENERATORS = (0o171, 0o133)
+
+# 删余图样，以码率 k/(k+1) 的 k 为键
+PUNCTURE = {1: (1, 1), 2: (1, 1, 0, 1), 3: (1, 1, 0, 1, 1, 0)}
+
+# 每帧的信息位数，以及解码时每批同时处理的帧数
+FRAME_BITS = 2048
+BATCH_FRAMES = 1024
+
+# 删除的比特在接收序列中的取值
+ERASED = 2
+
+# 起始时非零状态的路径度量，以及路径度量减去最小值的间隔步数
+UNREACHED = 1 << 12
+RENORMALIZE = 1 << 12
+
+
+class ConvolutionalCode:
+    '''
+    分帧终止的删余卷积码
+
+    Attributes:
+        rate (int): 码率为 rate/(rate+1)
+        frame_bits (int): 每帧的信息位数
+        steps (int): 每帧的网格步数，即信息位数加 K-1 个尾比特
+        keep (array): 一帧 2·steps 个编码比特中被发送的比特下标
+        frame_len (int): 每帧删余后的编码比特数
+        taps (tuple): 每个生成多项式的抽头，第 j 个抽头对应 j 个时刻之前的输入
+        bm0, bm1 (array): 分支度量表，bm[s, code] 为接收码组 code 与进入状态 s 的两条分支输出的汉明距离
+    '''
+
+    def __init__(self, rate=1, frame_bits=FRAME_BITS):
+        '''
+        构造卷积码
+
+        Args:
+            rate (int): 删余后码率 rate/(rate+1)，可以是 1, 2, 3
+            frame_bits (int): 每帧的信息位数
+        '''
+        if rate not in PUNCTURE:
+            raise ValueError('卷积码码率只能是 1/2, 2/3, 3/4')
+        K = CONSTRAINT_LENGTH
+        self.rate = rate
+        self.frame_bits = frame_bits
+        self.steps = frame_bits + K - 1
+        self.keep = nonzero(tile(PUNCTURE[rate], -(-2 * self.steps // len(PUNCTURE[rate])))[:2 * self.steps])[0]
+        self.frame_len = len(self.keep)
+        self.taps = tuple(tuple((g >> (K - 1 - j)) & 1 for j in range(K)) for g in GENERATORS)
+
+        # 状态为最近 K-1 个输入，最低位为最新的输入
+        # 进入状态 s 的两条分支来自 s >> 1 和 (s >> 1) | 2^(K-2)，输入均为 s & 1
+        states = 1 << (K - 1)
+        s = arange(states)
+        prev0 = s >> 1
+        prev1 = prev0 | (states >> 1)
+        out0 = [self._output((prev0 << 1) | (s & 1), taps) for taps in self.taps]
+        out1 = [self._output((prev1 << 1) | (s & 1), taps) for taps in self.taps]
+
+        # 接收码组 code = r1 + 3·r2，r 为 0, 1 或 ERASED
+        self.bm0 = zeros((states, 9), dtype=int16)
+        self.bm1 = zeros((states, 9), dtype=int16)
+        for code in range(9):
+            for r, o0, o1 in zip((code % 3, code // 3), out0, out1):
+                if r != ERASED:
+                    self.bm0[:, code] += o0 != r
+                    self.bm1[:, code] += o1 != r
+
+    @staticmethod
+    def _output(reg, taps):
+        '''
+        计算移位寄存器状态 reg 对应的一个输出比特
+
+        Args:
+            reg (array): 移位寄存器，第 j 位为 j 个时刻之前的输入
+            taps (tuple): 生成多项式的抽头
+        Returns:
+            (array): 输出比特
+        '''
+        out = zeros(len(reg), dtype=int32)
+        for j, tap in enumerate(taps):
+            if tap:
+                out ^= (reg >> j) & 1
+        return out
+
+    def encode(self, BS_mat):
+        '''
+        逐帧编码并删余
+
+        Args:
+            BS_mat (array): 每行 frame_bits 个信息位的比特矩阵
+        Returns:
+            (array): 每行一帧删余后的编码比特
+        '''
+        frames = len(BS_mat)
+        U = zeros((frames, self.steps), dtype=uint8)
+        U[:, :self.frame_bits] = BS_mat
+
+        # 每个输出为若干个延时后的输入的异或
+        outputs = []
+        for taps in self.taps:
+            c = zeros((frames, self.steps), dtype=uint8)
+            for j, tap in enumerate(taps):
+                if tap:
+                    c[:, j:] ^= U[:, :self.steps - j]
+            outputs.append(c)
+        C = stack(outputs, axis=2).reshape(frames, 2 * self.steps)
+        return C[:, self.keep]
+
+    def decode(self, C_mat):
+        '''
+        硬判决 Viterbi 解码
+
+        Args:
+            C_mat (array): 每行一帧删余后的接收比特
+        Returns:
+            (array): 每行 frame_bits 个信息位的比特矩阵
+        '''
+        BS_mat = zeros((len(C_mat), self.frame_bits), dtype=uint8)
+        for i in range(0, len(C_mat), BATCH_FRAMES):
+            BS_mat[i:i + BATCH_FRAMES] = self._decode_batch(C_mat[i:i + BATCH_FRAMES])
+        return BS_mat
+
+    def _decode_batch(self, C_mat):
+        '''
+        对一批帧同时做 Viterbi 解码
+        '''
+        K = CONSTRAINT_LENGTH
+        frames = len(C_mat)
+        states = 1 << (K - 1)
+
+        # 补回被删去的比特，得到每一步的接收码组
+        R = full((frames, 2 * self.steps), ERASED, dtype=uint8)
+        R[:, self.keep] = C_mat
+        codes = (R[:, 0::2] + 3 * R[:, 1::2]).T.astype(intp)
+
+        # 路径度量按 (状态, 帧) 存放，前一状态 s >> 1 为状态的前一半，(s >> 1) | 2^(K-2) 为后一半
+        # 判决比特为 1 表示幸存路径来自后一半
+        half = states // 2
+        PM = full((states, frames), UNREACHED, dtype=int16)
+        PM[0] = 0
+        decisions = zeros((self.steps, states // 8, frames), dtype=uint8)
+        for t in range(self.steps):
+            code = codes[t]
+            a = repeat(PM[:half], 2, axis=0)
+            a += take(self.bm0, code, axis=1)
+            b = repeat(PM[half:], 2, axis=0)
+            b += take(self.bm1, code, axis=1)
+            d = b < a
+            PM = minimum(a, b, out=a)
+            decisions[t] = packbits(d, axis=0)
+            # 定期减去最小值，防止 int16 溢出
+            if t % RENORMALIZE == RENORMALIZE - 1:
+                PM -= PM.min(axis=0)
+
+        # 帧尾回到全零状态，从状态 0 回溯
+        BS_mat = zeros((frames, self.steps), dtype=uint8)
+        rows = arange(frames)
+        s = zeros(frames, dtype=intp)
+        for t in range(self.steps - 1, -1, -1):
+            BS_mat[:, t] = s & 1
+            d = (decisions[t, s >> 3, rows] >> (7 - (s & 7))) & 1
+            s = (s >> 1) | (d.astype(intp) << (K - 2))
+        return BS_mat[:, :self.frame_bits]
+
+
+@lru_cache(maxsize=None)
+def convolutional(rate, frame_bits=FRAME_BITS):
+    '''
+    获取卷积码，构造一次后缓存
+
+    Args:
+        rate (int): 删余后码率 rate/(rate+1)
+        frame_bits (int): 每帧的信息位数
+    Returns:
+        (ConvolutionalCode): 卷积码
+    '''
+    return ConvolutionalCode(rate, frame_bits)
@@ -1,10 +1,13 @@
 import collections
 import itertools
+import numbers
 import sys
 from heapq import heappush, heappop, heapify
 
+import json
 import logging
 import pickle
+import struct
 from pathlib import Path
 from typing import Union, Any
 
@@ -41,9 +44,43 @@ class _EndOfFileSymbol:
 _EOF = _EndOfFileSymbol()
 
 
-# TODO store/load code table from file
 # TODO Directly encode to and decode from file
 
+# Binary code table file format (all fields little endian):
+#
+#   magic        : 4 bytes, b'PFXC'
+#   version      : uint8
+#   symbol_type  : uint8, one of _SYMBOL_TYPES
+#   concat       : uint8, one of _CONCATS
+#   flags        : uint8, _FLAG_VALUES | _FLAG_EOF
+#   count        : uint32, number of code table entries
+#   eof_index    : int32, index of the "end of file" entry, -1 if none
+#   dtype_len    : uint32, length of the numpy dtype string (numpy symbols only)
+#   meta_len     : uint32, length of the JSON encoded metadata
+#   dtype        : dtype_len bytes, padded to 8 bytes
+#   bits         : count * uint8, code lengths, padded to 8 bytes
+#   values       : count * uint64, code values (only with _FLAG_VALUES)
+#   symbols      : count * int64 (int), count * itemsize (numpy),
+#                  or (count + 1) * uint32 offsets, padded to 8 bytes, followed by
+#                  the concatenated utf-8/raw data (str/bytes)
+#   metadata     : meta_len bytes of JSON
+#
+# Every array starts at a multiple of 8 bytes, so the file can be memory mapped
+# and the arrays viewed in place.
+# Without _FLAG_VALUES the code values are not stored and a canonical code
+# is assigned from the code lengths on load.
+_MAGIC = b'PFXC'
+_VERSION = 1
+_HEADER = struct.Struct('<4sBBBBIiII')
+_SYMBOL_TYPES = {int: 0, str: 1, bytes: 2}
+_SYMBOL_NUMPY = 3
+_CONCATS = {list: 0, u''.join: 1, bytes: 2}
+_FLAG_VALUES = 1
+_FLAG_EOF = 2
+
+# Integer alphabets with all symbols below this limit also get dense code arrays
+_DENSE_LIMIT = 1 << 16
+
 def _guess_concat(data):
     """
     Guess concat function from given data
@@ -54,6 +91,25 @@ def _guess_concat(data):
     }.get(type(data), list)
 
 
+def _pad8(n: int) -> int:
+    return -n % 8
+
+
+def _canonical_values(bits):
+    """
+    Assign canonical code values to given code lengths.
+    """
+    values = [0] * len(bits)
+    code = 0
+    previous = 0
+    for i in sorted(range(len(bits)), key=lambda i: (bits[i], i)):
+        code <<= bits[i] - previous
+        values[i] = code
+        code += 1
+        previous = bits[i]
+    return values
+
+
 def ensure_dir(path: Union[str, Path]) -> Path:
     path = Path(path)
     if not path.exists():
@@ -65,8 +121,14 @@ def ensure_dir(path: Union[str, Path]) -> Path:
 class PrefixCodec:
     """
     Prefix code codec, using given code table.
+
+    The tables derived from the code table (reverse lookup table, maximum code length and,
+    for integer alphabets, dense arrays of code lengths and values indexed by symbol)
+    are built once at construction, so the code table should not be modified afterwards.
     """
 
+    __slots__ = ('_table', '_concat', '_eof', '_lookup', '_max_bits', '_bits', '_values')
+
     def __init__(self, code_table, concat=list, check=True, eof=_EOF):
         """
         Initialize codec with given code table.
@@ -87,6 +149,20 @@ class PrefixCodec:
             )
             # TODO check if code table is actually a prefix code
 
+        # Reverse lookup table, mapping (bitsize, value) to symbols
+        self._lookup = {(b, v): s for s, (b, v) in self._table.items()}
+        self._max_bits = max((b for b, _ in self._table.values()), default=0)
+
+        # Dense code lengths and values (0 for symbols without code), for integer alphabets only
+        self._bits = self._values = None
+        symbols = [s for s in self._table if not isinstance(s, _EndOfFileSymbol)]
+        if symbols and all(isinstance(s, numbers.Integral) and 0 <= s < _DENSE_LIMIT for s in symbols):
+            size = int(max(symbols)) + 1
+            self._bits = [0] * size
+            self._values = [0] * size
+            for s in symbols:
+                self._bits[s], self._values[s] = self._table[s]
+
     def get_code_table(self):
         """
         Get code table
@@ -120,29 +196,44 @@ class PrefixCodec:
         :param data: sequence of symbols (e.g. byte string, unicode string, list, iterator)
         :return: byte string
         """
-        return bytes(self.encode_streaming(data))
+        return b''.join(self.encode_streaming(data))
 
-    def encode_streaming(self, data):
+    def encode_streaming(self, data, chunk_size=1 << 16):
         """
         Encode given data in streaming fashion.
 
         :param data: sequence of symbols (e.g. byte string, unicode string, list, iterator)
-        :return: generator of bytes (single character strings in Python2, ints in Python 3)
+        :param chunk_size: number of bytes to collect before yielding them
+        :return: generator of byte strings
         """
-        # Buffer value and size
+        # Arrays of unsigned integers are encoded with the dense code arrays
+        if self._bits is not None and getattr(getattr(data, 'dtype', None), 'kind', None) == 'u':
+            codes = self._dense_codes(data.tolist())
+        else:
+            codes = (self._table[s] for s in data)
+
+        # Output bytes, buffer value and size.
+        # Whole bytes are only flushed from the buffer once it holds at least 64 bits.
+        out = bytearray()
         buffer = 0
         size = 0
-        for s in data:
-            # TODO: raise custom EncodeException instead of KeyError?
-            b, v = self._table[s]
+        # TODO: raise custom EncodeException instead of KeyError?
+        for b, v in codes:
             # Shift new bits in the buffer
             buffer = (buffer << b) + v
             size += b
-            while size >= 8:
-                byte = buffer >> (size - 8)
-                yield byte
-                buffer = buffer - (byte << (size - 8))
-                size -= 8
+            if size >= 64:
+                n = size >> 3
+                size -= n << 3
+                out += (buffer >> size).to_bytes(n, 'big')
+                buffer &= (1 << size) - 1
+                if len(out) >= chunk_size:
+                    yield bytes(out)
+                    out.clear()
+        n = size >> 3
+        size -= n << 3
+        out += (buffer >> size).to_bytes(n, 'big')
+        buffer &= (1 << size) - 1
 
         # Handling of the final sub-byte chunk.
         # The end of the encoded bit stream does not align necessarily with byte boundaries,
@@ -159,7 +250,22 @@ class PrefixCodec:
                 byte = buffer >> (size - 8)
             else:
                 byte = buffer << (8 - size)
-            yield byte
+            out.append(byte)
+        if out:
+            yield bytes(out)
+
+    def _dense_codes(self, symbols):
+        """
+        Generate the code tuples (bitsize, value) of given non-negative integer symbols
+        from the dense code arrays.
+        """
+        bits = self._bits
+        values = self._values
+        for s in symbols:
+            b = bits[s] if s < len(bits) else 0
+            if not b:
+                raise KeyError(s)
+            yield b, values[s]
 
     def decode(self, data, concat=None):
         """
@@ -178,8 +284,8 @@ class PrefixCodec:
         :param data: sequence of bytes (string, list or generator of bytes)
         :return: generator of symbols
         """
-        # Reverse lookup table: map (bitsize, value) to symbols
-        lookup = {(b, v): s for s, (b, v) in self._table.items()}
+        lookup = self._lookup
+        max_bits = self._max_bits
 
         buffer = 0
         size = 0
@@ -187,6 +293,8 @@ class PrefixCodec:
             for m in [128, 64, 32, 16, 8, 4, 2, 1]:
                 buffer = (buffer << 1) + bool(byte & m)
                 size += 1
+                if size > max_bits:
+                    raise ValueError('Invalid code in data')
                 if (size, buffer) in lookup:
                     symbol = lookup[size, buffer]
                     if symbol == self._eof:
@@ -195,47 +303,158 @@ class PrefixCodec:
                     buffer = 0
                     size = 0
 
-    def save(self, path: Union[str, Path], metadata: Any = None):
+    def save(self, path: Union[str, Path], metadata: Any = None, values: bool = True):
         """
-        Persist the code table to a file.
+        Persist the code table to a file, in the binary code table format.
         :param path: file path to persist to
-        :param metadata: additional metadata
+        :param metadata: additional metadata (must be JSON serializable)
+        :param values: whether to store code values,
+            if False, a canonical code with the same code lengths is restored on load
         :return:
         """
         code_table = self.get_code_table()
-        data = {
-            "code_table": code_table,
-            "type": type(self),
-            "concat": self._concat,
-        }
-        if metadata:
-            data['metadata'] = metadata
         path = Path(path)
         ensure_dir(path.parent)
         with path.open(mode='wb') as f:
-            # TODO also provide JSON option? Requires handling of _EOF and possibly other non-string code table keys.
-            pickle.dump(data, file=f)
+            f.write(self._to_bytes(metadata=metadata, values=values))
         _log.info('Saved {c} code table ({l} items) to {p!r}'.format(
             c=type(self).__name__, l=len(code_table), p=str(path)
         ))
 
-    @staticmethod
-    def load(path: Union[str, Path]) -> 'PrefixCodec':
+    def _to_bytes(self, metadata: Any = None, values: bool = True) -> bytes:
+        """
+        Serialize the code table in the binary code table format.
+        """
+        entries = list(self._table.items())
+        count = len(entries)
+        flags = _FLAG_VALUES if values else 0
+
+        eof_index = -1
+        for i, (s, _) in enumerate(entries):
+            if s == self._eof:
+                eof_index = i
+                if isinstance(s, _EndOfFileSymbol):
+                    flags |= _FLAG_EOF
+                break
+        symbols = [s for i, (s, _) in enumerate(entries) if not (flags & _FLAG_EOF and i == eof_index)]
+
+        # Determine the symbol type
+        types = set(type(s) for s in symbols)
+        dtype = b''
+        if len(types) > 1:
+            raise TypeError('Mixed symbol types are not supported: {t!r}'.format(t=types))
+        symbol_type = types.pop() if types else int
+        if symbol_type in _SYMBOL_TYPES:
+            symbol_tag = _SYMBOL_TYPES[symbol_type]
+        elif hasattr(symbols[0], 'dtype'):
+            symbol_tag = _SYMBOL_NUMPY
+            dtype = symbols[0].dtype.str.encode('ascii')
+        else:
+            raise TypeError('Unsupported symbol type: {t!r}'.format(t=symbol_type))
+        concat_tag = _CONCATS.get(self._concat, 0)
+        meta = json.dumps(metadata).encode('utf-8') if metadata is not None else b''
+
+        bits = [b for _, (b, _) in entries]
+        if values and max(bits, default=0) > 64:
+            raise ValueError('Code values longer than 64 bits can not be stored')
+
+        out = bytearray(_HEADER.pack(
+            _MAGIC, _VERSION, symbol_tag, concat_tag, flags, count, eof_index, len(dtype), len(meta)
+        ))
+        out += dtype + bytes(_pad8(len(dtype)))
+        out += bytes(bits) + bytes(_pad8(count))
+        if values:
+            out += struct.pack('<%dQ' % count, *(v for _, (_, v) in entries))
+
+        # The "end of file" slot keeps a placeholder symbol
+        if flags & _FLAG_EOF:
+            symbols.insert(eof_index, {0: 0, 1: '', 2: b''}.get(symbol_tag, symbols[0] if symbols else 0))
+        if symbol_tag == 0:
+            out += struct.pack('<%dq' % count, *symbols)
+        elif symbol_tag == _SYMBOL_NUMPY:
+            out += b''.join(s.tobytes() for s in symbols)
+            out += bytes(_pad8(len(out)))
+        else:
+            data = [s.encode('utf-8') if symbol_tag == 1 else s for s in symbols]
+            offsets = list(itertools.accumulate((len(d) for d in data), initial=0))
+            out += struct.pack('<%dI' % (count + 1), *offsets) + bytes(_pad8(4 * (count + 1)))
+            out += b''.join(data) + bytes(_pad8(offsets[-1]))
+        out += meta
+        return bytes(out)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], allow_pickle: bool = False) -> 'PrefixCodec':
         """
         Load a persisted PrefixCodec
         :param path: path to serialized PrefixCodec code table data.
+        :param allow_pickle: whether to accept files in the legacy pickle format
         :return:
         """
         path = Path(path)
         with path.open(mode='rb') as f:
-            data = pickle.load(f)
-        cls = data['type']
-        assert issubclass(cls, PrefixCodec)
-        code_table = data['code_table']
+            buffer = f.read()
+        if buffer[:len(_MAGIC)] != _MAGIC:
+            if not allow_pickle:
+                raise ValueError('{p!r} is not a code table file'.format(p=str(path)))
+            data = pickle.loads(buffer)
+            cls = data['type']
+            assert issubclass(cls, PrefixCodec)
+            code_table = data['code_table']
+            _log.info('Loading {c} with {l} code table items from {p!r}'.format(
+                c=cls.__name__, l=len(code_table), p=str(path)
+            ))
+            return cls(code_table, concat=data['concat'])
+
+        codec = cls._from_bytes(buffer)
         _log.info('Loading {c} with {l} code table items from {p!r}'.format(
-            c=cls.__name__, l=len(code_table), p=str(path)
+            c=cls.__name__, l=len(codec._table), p=str(path)
         ))
-        return cls(code_table, concat=data['concat'])
+        return codec
+
+    @classmethod
+    def _from_bytes(cls, buffer) -> 'PrefixCodec':
+        """
+        Construct a codec from a buffer in the binary code table format.
+        """
+        (magic, version, symbol_tag, concat_tag, flags, count, eof_index, dtype_len, meta_len
+         ) = _HEADER.unpack_from(buffer, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError('Unsupported code table format version {v}'.format(v=version))
+        offset = _HEADER.size
+        dtype = bytes(buffer[offset:offset + dtype_len]).decode('ascii')
+        offset += dtype_len + _pad8(dtype_len)
+
+        bits = list(buffer[offset:offset + count])
+        offset += count + _pad8(count)
+        if flags & _FLAG_VALUES:
+            values = list(struct.unpack_from('<%dQ' % count, buffer, offset))
+            offset += 8 * count
+        else:
+            values = _canonical_values(bits)
+
+        if symbol_tag == 0:
+            symbols = list(struct.unpack_from('<%dq' % count, buffer, offset))
+        elif symbol_tag == _SYMBOL_NUMPY:
+            import numpy
+            dtype = numpy.dtype(dtype)
+            symbols = list(numpy.frombuffer(buffer, dtype=dtype, count=count, offset=offset))
+            offset += dtype.itemsize * count + _pad8(offset + dtype.itemsize * count)
+        else:
+            offsets = struct.unpack_from('<%dI' % (count + 1), buffer, offset)
+            offset += 4 * (count + 1) + _pad8(4 * (count + 1))
+            data = [bytes(buffer[offset + a:offset + b]) for a, b in zip(offsets, offsets[1:])]
+            symbols = [d.decode('utf-8') for d in data] if symbol_tag == 1 else data
+
+        eof = _EOF
+        if eof_index >= 0:
+            if flags & _FLAG_EOF:
+                symbols[eof_index] = _EOF
+            else:
+                eof = symbols[eof_index]
+
+        concat = {v: k for k, v in _CONCATS.items()}.get(concat_tag, list)
+        code_table = dict(zip(symbols, zip(bits, values)))
+        return cls(code_table, concat=concat, check=False, eof=eof)
 
 
 class HuffmanCodec(PrefixCodec):
@@ -244,6 +463,8 @@ class HuffmanCodec(PrefixCodec):
     providing encoding and decoding methods.
     """
 
+    __slots__ = ()
+
     @classmethod
     def from_frequencies(cls, frequencies, concat=None, eof=_EOF):
         """
@@ -254,31 +475,56 @@ class HuffmanCodec(PrefixCodec):
         """
         concat = concat or _guess_concat(next(iter(frequencies)))
 
-        # Heap consists of tuples: (frequency, [list of tuples: (symbol, (bitsize, value))])
-        heap = [(f, [(s, (0, 0))]) for s, f in frequencies.items()]
+        symbols = list(frequencies.keys())
+        weights = list(frequencies.values())
         # Add EOF symbol.
         if eof not in frequencies:
-            heap.append((1, [(eof, (0, 0))]))
+            symbols.append(eof)
+            weights.append(1)
 
-        # Use heapq approach to build the encodings of the huffman tree leaves.
-        heapify(heap)
-        while len(heap) > 1:
-            # Pop the 2 smallest items from heap
-            a = heappop(heap)
-            b = heappop(heap)
-            # Merge nodes (update codes for each symbol appropriately)
-            merged = (
-                a[0] + b[0],
-                [(s, (n + 1, v)) for (s, (n, v)) in a[1]]
-                + [(s, (n + 1, (1 << n) + v)) for (s, (n, v)) in b[1]]
-            )
-            heappush(heap, merged)
+        bits = cls._code_lengths(weights)
+        values = _canonical_values(bits)
 
         # Code table is dictionary mapping symbol to (bitsize, value)
-        table = dict(heappop(heap)[1])
+        table = dict(zip(symbols, zip(bits, values)))
 
         return cls(table, concat=concat, check=False, eof=eof)
 
+    @staticmethod
+    def _code_lengths(weights):
+        """
+        Compute Huffman code lengths for given weights.
+
+        Only node ids and their parents are tracked while merging,
+        the code lengths are derived from the tree afterwards in a single pass.
+
+        :param weights: list of symbol weights
+        :return: list of code lengths, in the same order as the weights
+        """
+        n = len(weights)
+        if n == 1:
+            return [1]
+
+        # Heap consists of tuples: (weight, node id), leaves have ids 0..n-1
+        heap = list(zip(weights, range(n)))
+        heapify(heap)
+        parent = [0] * (2 * n - 1)
+        node = n
+        while len(heap) > 1:
+            # Pop the 2 smallest items from heap and merge them into a new node
+            wa, a = heappop(heap)
+            wb, b = heappop(heap)
+            parent[a] = parent[b] = node
+            heappush(heap, (wa + wb, node))
+            node += 1
+
+        # Parents always have a larger id than their children,
+        # so walking down from the root gives every node its depth.
+        depth = [0] * (2 * n - 1)
+        for node in range(2 * n - 3, -1, -1):
+            depth[node] = depth[parent[node]] + 1
+        return depth[:n]
+
     @classmethod
     def from_data(cls, data):
         """
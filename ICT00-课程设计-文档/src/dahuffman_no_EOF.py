@@ -20,6 +20,8 @@ class HuffmanCodec(dahuffman.HuffmanCodec):
     ```
     """
 
+    __slots__ = ()
+
     def __init__(self, code_table, concat=list, check=True, eof=None):
         # Set EOF symbol to be the first symbol in `code_table`, so that encode() `dahuffman` will not fail. 
         eof = next(iter(code_table.keys()))
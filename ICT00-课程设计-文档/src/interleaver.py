@@ -0,0 +1,166 @@
+'''
+比特交织模块
+
+在 channelEncoder 与 byteChannel 之间对信道编码后的文件（包括其文件头）整体做比特交织，
+在 channelDecoder 之前做解交织还原，使信道中的突发错误分散到不同的码字中。
+
+分组交织：每 rows·cols 个比特按行写入 rows 行 cols 列的矩阵，再按列读出，
+长度不超过 rows 的突发错误解交织后相距 cols 个比特。末尾不足一组时补 0。
+
+卷积交织（Forney）：比特依次轮流进入 branches 个支路，第 b 个支路延时 b·depth 个周期，
+即输入的第 t 个比特输出到第 t + (t % branches)·depth·branches 个位置，
+相邻比特解交织后相距 depth·branches 以上，输出比输入多 (branches-1)·depth·branches 个比特。
+
+两种交织都预先计算下标数组，对展开后的比特数组一次完成置换。
+
+交织后文件的格式规范是：
+Header  |decode_method  : uint8, 固定为 5，表示交织
+        |factor : uint8, 交织方式 0 为分组交织 1 为卷积交织
+  ______|source_len   : uint32, 交织前文件的长度（比特）
+Extra   |a            : uint16, 分组交织的行数 或 卷积交织的支路数
+  ______|b            : uint16, 分组交织的列数 或 卷积交织每个支路的延时单位
+Payload |interleaved-data : many uint8
+'''
+
+from sys import argv
+from functools import lru_cache
+from numpy import arange, zeros, uint8, intp
+from bitIO import read_bits, write_bits, pad_zero, encode_header, read_header, read_header_extra, header_size, METHOD_INTERLEAVE
+
+# 交织方式
+INTERLEAVE_BLOCK = 0
+INTERLEAVE_CONV = 1
+
+
+@lru_cache(maxsize=None)
+def block_permutation(rows, cols):
+    '''
+    分组交织的下标数组，交织后第 i 个比特为交织前一组中的第 perm[i] 个比特
+
+    Args:
+        rows (int): 行数
+        cols (int): 列数
+    Returns:
+        (array): 长度为 rows·cols 的下标数组
+    '''
+    return arange(rows * cols).reshape(rows, cols).T.ravel()
+
+
+def interleave_block(bits, rows, cols):
+    '''
+    分组交织
+
+    Args:
+        bits (array): 比特数组
+        rows (int): 行数
+        cols (int): 列数
+    Returns:
+        (array): 交织后的比特数组，长度为 rows·cols 的整数倍
+    '''
+    size = rows * cols
+    return pad_zero(bits, size).reshape(-1, size)[:, block_permutation(rows, cols)].ravel()
+
+
+def deinterleave_block(bits, rows, cols, length):
+    '''
+    分组解交织
+
+    Args:
+        bits (array): 交织后的比特数组
+        rows (int): 行数
+        cols (int): 列数
+        length (int): 交织前的比特数
+    Returns:
+        (array): 解交织后的比特数组
+    '''
+    size = rows * cols
+    bits = bits[:len(bits) - len(bits) % size].reshape(-1, size)
+    out = zeros(bits.shape, dtype=uint8)
+    out[:, block_permutation(rows, cols)] = bits
+    return out.ravel()[:length]
+
+
+def conv_positions(length, branches, depth):
+    '''
+    卷积交织中每个输入比特的输出位置
+
+    Args:
+        length (int): 输入比特数
+        branches (int): 支路数
+        depth (int): 每个支路的延时单位
+    Returns:
+        (array): 第 t 个输入比特的输出位置
+    '''
+    t = arange(length, dtype=intp)
+    return t + (t % branches) * depth * branches
+
+
+def interleave_conv(bits, branches, depth):
+    '''
+    卷积交织，未被输入比特占据的位置为 0
+
+    Args:
+        bits (array): 比特数组
+        branches (int): 支路数
+        depth (int): 每个支路的延时单位
+    Returns:
+        (array): 交织后的比特数组
+    '''
+    out = zeros(len(bits) + (branches - 1) * depth * branches, dtype=uint8)
+    out[conv_positions(len(bits), branches, depth)] = bits
+    return out
+
+
+def deinterleave_conv(bits, branches, depth, length):
+    '''
+    卷积解交织
+
+    Args:
+        bits (array): 交织后的比特数组
+        branches (int): 支路数
+        depth (int): 每个支路的延时单位
+        length (int): 交织前的比特数
+    Returns:
+        (array): 解交织后的比特数组
+    '''
+    return bits[conv_positions(length, branches, depth)]
+
+
+def main(argv):
+
+    # 处理用户输入
+    method = argv[1]
+    INPUT = argv[2]
+    OUTPUT = argv[3]
+
+    BS = read_bits(INPUT)
+
+    if method in ('-b', '-c'):
+        # 交织，-b 为分组交织，参数为行数、列数；-c 为卷积交织，参数为支路数、延时单位
+        a, b = int(argv[4]), int(argv[5])
+        if method == '-b':
+            kind = INTERLEAVE_BLOCK
+            C = interleave_block(BS, a, b)
+        else:
+            kind = INTERLEAVE_CONV
+            C = interleave_conv(BS, a, b)
+        extra = a.to_bytes(2, 'big') + b.to_bytes(2, 'big')
+        write_bits(OUTPUT, encode_header(METHOD_INTERLEAVE, kind, len(BS), extra), C)
+    elif method == '-d':
+        # 解交织，参数由文件头得到
+        M, kind, length = read_header(INPUT)
+        if M != METHOD_INTERLEAVE:
+            return
+        extra = read_header_extra(INPUT, M)
+        a, b = int.from_bytes(extra[0:2], 'big'), int.from_bytes(extra[2:4], 'big')
+        C = BS[header_size(M) * 8:]
+        if kind == INTERLEAVE_BLOCK:
+            R = deinterleave_block(C, a, b, length)
+        else:
+            R = deinterleave_conv(C, a, b, length)
+        write_bits(OUTPUT, R)
+    else:
+        return
+
+if __name__ == "__main__":
+    main(argv)
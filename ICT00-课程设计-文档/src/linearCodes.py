@@ -0,0 +1,287 @@
+'''
+线性分组码登记模块
+
+信道编码、解码模块共用的 (n, k) 系统线性分组码。每种码在登记时一次性生成
+生成矩阵 G、校验矩阵 H 以及伴随式查找表，之后按 (n, k) 直接取用，不再重复构造。
+
+生成矩阵均为系统形式 G = [I_k | P]，对应的校验矩阵为 H = [P^T | I_(n-k)]。
+除原有的 (7,4)、(15,11)、(31,26) 汉明码外，可以登记任意 (n, k) 系统线性分组码，
+并可按 m 生成 (2^m-1, 2^m-1-m) 汉明码及其扩展码、缩短码：
+扩展汉明码在每个码字后附加一位总校验位，可以纠正单个错误并检测两个错误（SECDED），
+缩短码去掉前若干位信息位（视为 0 且不传输）。
+'''
+
+from numpy import array, hstack, identity, dot, full, zeros, arange, nonzero, cumsum, argmax, concatenate, intp, uint8, int64
+
+# 汉明码奇偶校验长度 m 的上限，伴随式查找表共 2^m 项（扩展码为 2^(m+1) 项）
+MAX_HAMMING_M = 12
+
+# 原有的三种汉明码的生成矩阵，信道编码文件中的 factor 3, 4, 5 依次对应这三种码
+G_7_4 = ((1, 0, 0, 0, 1, 1, 1),
+         (0, 1, 0, 0, 1, 0, 1),
+         (0, 0, 1, 0, 0, 1, 1),
+         (0, 0, 0, 1, 1, 1, 0))
+G_15_11 = ((1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1),
+           (0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 1),
+           (0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 0),
+           (0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1),
+           (0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 1, 0, 0, 1),
+           (0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 1, 0, 1, 0),
+           (0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, 1, 1),
+           (0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 1, 1, 0, 0),
+           (0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 1, 1, 0, 1),
+           (0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 1, 1, 1, 0),
+           (0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1),)
+G_31_26 = [[1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1],
+           [0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+               0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 0],
+           [0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+               0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1],
+           [0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+               0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 0, 1],
+           [0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+               0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 1],
+           [0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+               0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 0],
+           [0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+               0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1],
+           [0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0,
+               0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 0, 0],
+           [0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0,
+               0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 1],
+           [0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0,
+               0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 1, 0],
+           [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0,
+               0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 1, 1],
+           [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0,
+               0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 0, 0],
+           [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0,
+               0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 0, 1],
+           [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0,
+               0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 0],
+           [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0,
+               0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1],
+           [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1,
+               0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 0, 1, 1],
+           [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+               1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 1],
+           [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+               0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 1, 0],
+           [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+               0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 1, 1],
+           [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+               0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 1, 0, 1, 0, 0],
+           [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+               0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 1, 0, 1, 0, 1],
+           [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+               0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, 1, 1, 0],
+           [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+               0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 1, 0, 1, 1, 1],
+           [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+               0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 1, 1, 0, 0, 0],
+           [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+               0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 1, 1, 0, 0, 1],
+           [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 0, 1, 0]]
+
+
+class LinearCode:
+    '''
+    (n, k) 系统线性分组码
+
+    Attributes:
+        n (int): 码字长度
+        k (int): 信息组长度
+        extended (bool): 是否为扩展汉明码
+        G (array): k×n 生成矩阵
+        P (array): k×(n-k) 生成矩阵的校验部分
+        H (array): (n-k)×n 校验矩阵
+        weights (array): 伴随式按二进制转换为整数时各位的权重
+        syndrome_table (array): 伴随式整数到出错位置的查找表，-1 表示不纠错
+    '''
+
+    def __init__(self, G, extended=False):
+        '''
+        由系统形式的生成矩阵构造线性分组码
+
+        Args:
+            G (array): k×n 生成矩阵，前 k 列为单位矩阵
+            extended (bool): 是否为扩展汉明码
+        '''
+        G = array(G, dtype=uint8)
+        self.k, self.n = G.shape
+        self.extended = extended
+        if not (G[:, :self.k] == identity(self.k, dtype=uint8)).all():
+            raise ValueError('生成矩阵不是系统形式')
+        r = self.n - self.k
+
+        self.G = G
+        self.P = G[:, self.k:]
+        self.H = hstack((self.P.T, identity(r, dtype=uint8)))
+        self.weights = 1 << arange(r - 1, -1, -1, dtype=int64)
+
+        # 伴随式与 H 的第 i 列相同时，说明第 i 位出错；全 0 伴随式表示无错。
+        # 扩展汉明码 H 的各列重量均为奇数，两个错误的伴随式重量为偶数，不在表中，只检测不纠错
+        self.syndrome_table = full(1 << r, -1, dtype=intp)
+        self.syndrome_table[dot(self.H.T, self.weights)] = arange(self.n)
+        self.syndrome_table[0] = -1
+
+        for a in (self.G, self.P, self.H, self.weights, self.syndrome_table):
+            a.setflags(write=False)
+
+    def syndrome(self, C_mat):
+        '''
+        计算每个码字的伴随式
+
+        Args:
+            C_mat (array): 每行一个码字的比特矩阵
+        Returns:
+            (array): 每个码字的伴随式，按二进制转换为整数
+        '''
+        return dot(dot(C_mat, self.H.T) % 2, self.weights)
+
+    def solve_erasures(self, C_mat, E_mat):
+        '''
+        恢复码字中被删除的比特
+
+        被删除的比特为未知数，由 H·c = 0 得到 H_E·x = H·r，其中 H_E 为删除位置对应的列，
+        r 为删除位置取 0 的接收码字。删除个数不超过 n-k 的码字同时在 GF(2) 上做高斯-约当消元，
+        有唯一解的码字填入解，无解或解不唯一的码字保持不变。
+
+        Args:
+            C_mat (array): 每行一个码字的比特矩阵，被删除的比特为 0
+            E_mat (array): 与 C_mat 同形状，1 表示该比特被删除
+        Returns:
+            (array): 恢复后的码字比特矩阵
+        '''
+        r = self.n - self.k
+        count = E_mat.sum(axis=1)
+        rows = nonzero((count > 0) & (count <= r))[0]
+        C_mat = C_mat.copy()
+        if len(rows) == 0:
+            return C_mat
+        N = len(rows)
+        idx = arange(N)
+
+        # 每行的删除位置，不足 r 个时以 n 补齐，对应 H 之后补的全 0 列
+        rr, cc = nonzero(E_mat[rows])
+        starts = concatenate(([0], cumsum(count[rows])[:-1]))
+        pos = full((N, r), self.n, dtype=intp)
+        pos[rr, arange(len(rr)) - starts[rr]] = cc
+        H0 = hstack((self.H, zeros((r, 1), dtype=uint8)))
+
+        # 增广矩阵 [H_E | H·r]，形状为 (N, r, r + 1)
+        A = zeros((N, r, r + 1), dtype=bool)
+        A[:, :, :r] = H0[:, pos].transpose(1, 0, 2)
+        A[:, :, r] = dot(C_mat[rows], self.H.T) % 2
+
+        # 逐列消元，pivot[i, c] 为第 i 个方程组第 c 个未知数的主元所在行
+        used = zeros((N, r), dtype=bool)
+        pivot = full((N, r), -1, dtype=intp)
+        for c in range(r):
+            cand = A[:, :, c] & ~used
+            has = cand.any(axis=1)
+            p = argmax(cand, axis=1)
+            prow = A[idx, p]
+            elim = A[:, :, c] & has[:, None]
+            elim[idx, p] = False
+            A ^= elim[:, :, None] & prow[:, None, :]
+            used[idx[has], p[has]] = True
+            pivot[has, c] = p[has]
+
+        # 每个删除位置都有主元则解唯一，无主元的方程右边为 1 则无解
+        real = pos < self.n
+        ok = ((pivot >= 0) | ~real).all(axis=1) & ~(A[:, :, r] & ~used).any(axis=1)
+        values = A[idx[:, None], pivot.clip(min=0), r]
+        fill = ok[:, None] & real
+        C_mat[rows[:, None].repeat(r, axis=1)[fill], pos[fill]] = values[fill]
+        return C_mat
+
+
+# 已登记的线性分组码，以 (n, k, extended) 为键
+CODES = {}
+
+
+def register(G, extended=False):
+    '''
+    登记一种系统线性分组码
+
+    Args:
+        G (array): k×n 生成矩阵，前 k 列为单位矩阵
+        extended (bool): 是否为扩展汉明码
+    Returns:
+        (LinearCode): 登记的线性分组码
+    '''
+    code = LinearCode(G, extended)
+    CODES[code.n, code.k, extended] = code
+    return code
+
+
+def get_code(n, k, extended=False):
+    '''
+    获取已登记的 (n, k) 线性分组码
+
+    Args:
+        n (int): 码字长度
+        k (int): 信息组长度
+        extended (bool): 是否为扩展汉明码
+    Returns:
+        (LinearCode): 线性分组码，未登记时为 None
+    '''
+    return CODES.get((n, k, extended))
+
+
+def hamming(m, extended=False, n=None):
+    '''
+    获取 (2^m-1, 2^m-1-m) 汉明码或其扩展码、缩短码，未登记时生成并登记
+
+    汉明码生成矩阵的校验部分 P 的各行依次为重量不小于 2 的全部 m 比特列向量；
+    扩展码在 P 后附加一列，使每行的重量为偶数；缩短码去掉 G 的前若干行和前若干列
+
+    Args:
+        m (int): 奇偶校验长度（扩展码的总校验位不计在内）
+        extended (bool): 是否为扩展汉明码
+        n (int): 缩短后的码字长度，默认不缩短
+    Returns:
+        (LinearCode): 汉明码
+    '''
+    if not 2 <= m <= MAX_HAMMING_M:
+        raise ValueError('汉明码的奇偶校验长度应在 2 到 %d 之间' % MAX_HAMMING_M)
+    full_n = (1 << m) - 1 + extended
+    full_k = (1 << m) - 1 - m
+    if n is None:
+        n = full_n
+    k = n - (full_n - full_k)
+    if not 0 < k <= full_k:
+        raise ValueError('无法将 (%d, %d) 汉明码缩短为码长 %d' % (full_n, full_k, n))
+
+    code = get_code(n, k, extended)
+    if code is None:
+        if extended or n != full_n:
+            # 由汉明码的校验部分得到扩展码、缩短码
+            P = hamming(m).P
+            if extended:
+                P = hstack((P, (1 + P.sum(axis=1, keepdims=True)) % 2))
+            P = P[full_k - k:]
+        else:
+            columns = [c for c in range(1, n + 1) if c & (c - 1)]
+            P = (array(columns)[:, None] >> arange(m - 1, -1, -1)) & 1
+        code = register(hstack((identity(k, dtype=uint8), P.astype(uint8))), extended)
+    return code
+
+
+def hamming_code(n, k, extended=False):
+    '''
+    由码字长度和信息组长度获取汉明码（或其扩展码、缩短码）
+
+    Args:
+        n (int): 码字长度
+        k (int): 信息组长度
+        extended (bool): 是否为扩展汉明码
+    Returns:
+        (LinearCode): 汉明码
+    '''
+    return hamming(n - k - extended, extended, n)
+
+
+for _G in (G_7_4, G_15_11, G_31_26):
+    register(_G)
@@ -0,0 +1,372 @@
+'''
+信息传输系统流水线模块
+
+在一个进程中依次完成 信源 → 信源编码 → 信道编码 → 信道 → 信道解码 → 信源解码，
+各级之间直接传递 NumPy 数组，不生成中间文件，最后把各级的指标写入 CSV 文件的一行。
+给出 spill 目录时，各级的中间结果按与对应命令行程序相同的格式写入该目录，
+可以再用单独的程序（如 byteChannel_calc、channelCoder_calc）检查。
+
+信源编码方式：
+    none       不做信源编码
+    huffman    霍夫曼编码，给出 P0 时由其八次扩展构建码书，否则由信源的经验分布构建（两遍扫描），
+               block 大于 1 时以 block 字节的扩展符号为单位编码
+    adaptive   自适应霍夫曼编码
+    rans       rANS 编码，码书的来源与 huffman 相同
+
+信道编码与 channelEncoder 的参数相同，例如 -r 3、-h 7、-b 8 2、-c 2，不给出时不做信道编码。
+
+信道：
+    bsc p                 错误概率为 p 的二元对称信道
+    ge p r e_g e_b        Gilbert-Elliott 突发信道，参数与 byteChannel -g 相同
+    bec eps               删除概率为 eps 的二元删除信道，信道解码时使用删除标记
+'''
+
+import csv
+import zlib
+from pathlib import Path
+from time import perf_counter
+from sys import argv
+from numpy import random, fromfile, frombuffer, searchsorted, packbits, unpackbits, concatenate, bincount, array_equal, zeros, uint8
+
+from bitIO import count_ones, decode_header, decode_repeated, HEADER_BYTES, header_size, METHOD_HAMMING, METHOD_BCH
+from byteSource import ganExtend
+from byteSourceEncoder import encode_source, encode_source_adaptive, encode_source_block, encode_source_rans
+from byteSourceDecoder import decode_source
+from channelEncoder import channel_encode
+from channelDecoder import channel_decode
+from byteChannel import gilbert_elliott
+from byteChannel_calc import calc_joint_p_xy, calc_p_x, calc_p_y, calc_H_p, calc_cond_H_xy
+from codding_effect import H_s, H_byte, compress_ratio, coding_efficiency
+from channelCoder_calc import gen_BER, gen_Rs
+
+# 信源编码方式
+SOURCE_CODERS = ('none', 'huffman', 'adaptive', 'rans')
+
+# 信道错误破坏文件头、码书或编码数据时解码程序抛出的异常，其他异常不捕获
+DECODE_ERRORS = (ValueError, zlib.error)
+
+# 输出 CSV 文件的列
+COLUMNS = ['source_len', 'P0', 'H(S)', 'H_byte(S)',
+           'coder', 'encoded_len', 'compression_ratio', 'average_length', 'coding_efficiency',
+           'code', 'code_rate', 'channel_len',
+           'channel', 'channel_BER', 'H(X)', 'H(Y)', 'I(X;Y)',
+           'decoded_BER', 'source_decoded', 'end_to_end_BER', 'decode_error',
+           'time_source_encode', 'time_channel_encode', 'time_channel', 'time_channel_decode', 'time_source_decode']
+
+
+def pmf_csv(P0):
+    '''
+    由数据比特概率分布生成与 PMF 文件内容相同的字节串，可直接作为信源编码器的 pmf_bytes
+
+    Args:
+        P0 (float): 数据比特概率分布
+    Returns:
+        (bytes): 256 行 "符号,概率" 的 CSV 文件内容
+    '''
+    return ''.join('%d,%r\n' % (i, p) for i, p in enumerate(ganExtend(P0).tolist())).encode('utf-8')
+
+
+def gen_source(P0, length, seed=None):
+    '''
+    按数据比特概率分布生成信源，方法与 byteSource 相同
+
+    Args:
+        P0 (float): 数据比特概率分布
+        length (int): 信源的字节数
+        seed (int): 随机数种子
+    Returns:
+        (array): 信源，uint8 数组
+    '''
+    symbol_random = random.RandomState(seed).uniform(size=length)
+    return searchsorted(ganExtend(P0).cumsum(), symbol_random).astype(uint8)
+
+
+def source_encode(source, coder, pmf_bytes=None, block=1):
+    '''
+    信源编码
+
+    Args:
+        source (array): 信源，uint8 数组
+        coder (str): 信源编码方式，见 SOURCE_CODERS
+        pmf_bytes (bytes): PMF 文件内容，None 时由信源的经验分布构建码书
+        block (int): 霍夫曼编码的扩展符号字节数
+    Returns:
+        header (bytes): 编码后文件的首部，不做信源编码时为空
+        payload (bytes): 编码后的数据
+    '''
+    if coder == 'none':
+        return b'', source.tobytes()
+    if coder == 'adaptive':
+        header, payload = encode_source_adaptive(source)
+    elif coder == 'rans':
+        header, payload = encode_source_rans(source, pmf_bytes)
+    elif coder == 'huffman' and block > 1:
+        header, payload = encode_source_block(source, pmf_bytes, block)
+    elif coder == 'huffman':
+        header, payload = encode_source(source, pmf_bytes)
+    else:
+        raise ValueError('Unknown source coder %r' % coder)
+    if not isinstance(payload, (bytes, bytearray)):
+        payload = b''.join(payload)
+    return bytes(header), bytes(payload)
+
+
+def transmit(X, channel, seed=None):
+    '''
+    信道传输
+
+    Args:
+        X (array): 信道输入，uint8 数组
+        channel (tuple): 信道名称及参数，如 ('bsc', 0.01)
+        seed (int): 随机数种子
+    Returns:
+        Y (array): 信道输出，uint8 数组
+        E (array): 删除标记，与 Y 等长的 uint8 数组，只有删除信道不为 None
+    '''
+    name, *params = channel
+    rng = random.default_rng(seed)
+    if name == 'bsc':
+        # 每个比特独立地以概率 p 翻转
+        return X ^ packbits(rng.random(len(X) * 8) < params[0]), None
+    if name == 'ge':
+        return X ^ gilbert_elliott(*params, seed=seed).noise(len(X)), None
+    if name == 'bec':
+        E = packbits(rng.random(len(X) * 8) < params[0])
+        return X & ~E, E
+    raise ValueError('Unknown channel %r' % name)
+
+
+def channel_info(X, Y):
+    '''
+    计算信道输入输出的信息熵与平均互信息量，单位为 信息比特/二元消息，与 byteChannel_calc 相同
+
+    Args:
+        X (array): 信道输入，uint8 数组
+        Y (array): 信道输出，uint8 数组
+    Returns:
+        (tuple): H(X), H(Y), I(X;Y)
+    '''
+    if len(X) == 0:
+        return 0.0, 0.0, 0.0
+    joint_p_xy = calc_joint_p_xy(X, Y)
+    H_x = calc_H_p(calc_p_x(joint_p_xy)) / 8
+    H_y = calc_H_p(calc_p_y(joint_p_xy)) / 8
+    I_xy = H_x - calc_cond_H_xy(joint_p_xy) / 8
+    return float(H_x), float(H_y), float(I_xy)
+
+
+def code_rate(C_final):
+    '''
+    由信道编码的文件头得到码率
+
+    Args:
+        C_final (tuple): 文件头与编码后的比特数组
+    Returns:
+        (float): 码率
+    '''
+    raw = packbits(C_final[0]).tobytes()
+    method, factor, source_length = decode_header(raw)
+    n = k = None
+    if method in (METHOD_HAMMING, METHOD_BCH):
+        extra = decode_repeated(raw[HEADER_BYTES:header_size(method)])
+        n, k = int.from_bytes(extra[0:2], 'big'), int.from_bytes(extra[2:4], 'big')
+    return float(gen_Rs(method, factor, n, k)[1])
+
+
+def run_pipeline(source, coder='huffman', code=None, channel=('bsc', 0.0),
+                 pmf_bytes=None, block=1, seed=None, spill_dir=None):
+    '''
+    在内存中运行整个信息传输系统
+
+    Args:
+        source (array): 信源，uint8 数组
+        coder (str): 信源编码方式，见 SOURCE_CODERS
+        code (tuple): 信道编码方式及参数，与 channelEncoder 相同，如 ('-r', 3)，None 表示不做信道编码
+        channel (tuple): 信道名称及参数，如 ('bsc', 0.01)
+        pmf_bytes (bytes): PMF 文件内容，None 时由信源的经验分布构建码书
+        block (int): 霍夫曼编码的扩展符号字节数
+        seed (int): 信道的随机数种子
+        spill_dir (str): 写出中间结果的目录，None 表示不写出
+    Returns:
+        (dict): 各项指标，键为 COLUMNS
+    '''
+    spill = Path(spill_dir) if spill_dir is not None else None
+    if spill is not None:
+        spill.mkdir(parents=True, exist_ok=True)
+        source.tofile(spill / 'source.dat')
+    hist = bincount(source, minlength=256)
+    H_source, P0 = H_s(hist) if len(source) else (0.0, 1.0)
+    H_source_byte = H_byte(hist) if len(source) else 0.0
+
+    # 信源编码
+    start = perf_counter()
+    header, payload = source_encode(source, coder, pmf_bytes, block)
+    encoded = frombuffer(header + payload, dtype=uint8)
+    t_source_encode = perf_counter() - start
+    average_length = len(payload) * 8 / len(source) if len(source) else 0.0
+    if spill is not None:
+        encoded.tofile(spill / 'source_encoded.dat')
+
+    # 信道编码，文件头与编码后的比特数组打包为字节
+    start = perf_counter()
+    if code is None:
+        X = encoded
+        rate = 1.0
+    else:
+        C_final = channel_encode(unpackbits(encoded), *code)
+        if C_final is None:
+            raise ValueError('Unknown channel code %r' % (code,))
+        X = packbits(concatenate(C_final))
+        rate = code_rate(C_final)
+    t_channel_encode = perf_counter() - start
+    if spill is not None:
+        X.tofile(spill / 'channel_encoded.dat')
+
+    # 信道
+    start = perf_counter()
+    Y, E = transmit(X, channel, seed)
+    t_channel = perf_counter() - start
+    channel_BER = count_ones(X ^ Y) / (len(X) * 8) if len(X) else 0.0
+    H_x, H_y, I_xy = channel_info(X, Y)
+    if spill is not None:
+        Y.tofile(spill / 'channel_output.dat')
+        if E is not None:
+            E.tofile(spill / 'erasures.dat')
+
+    # 信道解码，信道错误可能破坏文件头，解码失败时结果记为空，并记录异常的类型
+    decode_error = ''
+    start = perf_counter()
+    if code is None:
+        D = Y
+    else:
+        try:
+            R = channel_decode(unpackbits(Y), None if E is None else unpackbits(E))
+        except DECODE_ERRORS as e:
+            R = None
+            decode_error = 'channel_decode: %s' % error_name(e)
+        D = packbits(R) if R is not None else frombuffer(b'', dtype=uint8)
+    t_channel_decode = perf_counter() - start
+    if spill is not None:
+        D.tofile(spill / 'channel_decoded.dat')
+
+    # 信源解码，码书或首部出错时同样记为解码失败
+    start = perf_counter()
+    if coder == 'none':
+        decoded = D
+    else:
+        try:
+            decoded = decode_source(D.tobytes())[0].astype(uint8)
+        except DECODE_ERRORS as e:
+            decoded = frombuffer(b'', dtype=uint8)
+            decode_error = decode_error or 'decode_source: %s' % error_name(e)
+    t_source_decode = perf_counter() - start
+    if spill is not None:
+        decoded.tofile(spill / 'decoded.dat')
+
+    return dict(zip(COLUMNS, [
+        len(source), P0, H_source, H_source_byte,
+        coder if block == 1 else '%s-%d' % (coder, block), len(encoded),
+        compress_ratio(len(source), len(encoded)) if len(encoded) else 0.0,
+        average_length, coding_efficiency(H_source_byte, average_length) if average_length else 0.0,
+        ' '.join(str(c) for c in code) if code is not None else 'none', rate, len(X),
+        ' '.join(str(c) for c in channel), channel_BER, H_x, H_y, I_xy,
+        error_rate(encoded, D),
+        int(array_equal(source, decoded)),
+        error_rate(source, decoded), decode_error,
+        t_source_encode, t_channel_encode, t_channel, t_channel_decode, t_source_decode]))
+
+
+def error_name(e):
+    '''
+    异常的类型名，非内置的异常带模块名，如 ValueError、zlib.error
+    '''
+    cls = type(e)
+    return cls.__name__ if cls.__module__ == 'builtins' else '%s.%s' % (cls.__module__, cls.__name__)
+
+
+def error_rate(reference, received):
+    '''
+    以 reference 的长度计算误码率，received 长于 reference 的部分舍去，缺少的部分补 0 后比较
+
+    Args:
+        reference (array): 发送的 uint8 数组
+        received (array): 接收的 uint8 数组
+    Returns:
+        (float): 误码率
+    '''
+    if len(reference) == 0:
+        return 0.0
+    if len(received) < len(reference):
+        received = concatenate((received, zeros(len(reference) - len(received), dtype=uint8)))
+    return gen_BER(reference, received[:len(reference)])
+
+
+def write_row(out_file_name, row, columns=COLUMNS):
+    '''
+    将一组指标追加写入 CSV 文件，文件不存在时先写入各列的名称
+
+    Args:
+        out_file_name (str): 输出文件(.CSV) 的路径
+        row (dict): run_pipeline 返回的指标
+        columns (list): 输出的列
+    '''
+    if not Path(out_file_name).is_file():
+        with open(out_file_name, 'w', newline='') as out_file:
+            csvwriter = csv.writer(out_file, quoting=csv.QUOTE_ALL)
+            csvwriter.writerow(columns)
+    with open(out_file_name, 'a', newline='') as out_file:
+        csvwriter = csv.writer(out_file, quoting=csv.QUOTE_ALL)
+        csvwriter.writerow([row[c] for c in columns])
+
+
+def parse_code(args):
+    '''
+    解析命令行中的信道编码参数，如 ['-b', '8', '2']
+    '''
+    if not args or args[0] == 'none':
+        return None
+    return (args[0],) + tuple(int(a) for a in args[1:])
+
+
+def parse_channel(args):
+    '''
+    解析命令行中的信道参数，如 ['bsc', '0.01']
+    '''
+    return (args[0],) + tuple(float(a) for a in args[1:])
+
+
+def main(argv):
+    # 参数列表：
+    #   OUTPUT P0 length coder code channel [seed] [SPILL]
+    #     OUTPUT   追加写入指标的 CSV 文件
+    #     P0       信源的数据比特概率分布；length 为 '-' 时 P0 为信源文件路径
+    #     length   信源的字节数
+    #     coder    信源编码方式，huffman[-K]、huffman-e[-K]（由经验分布构建码书）、adaptive、rans、rans-e、none
+    #     code     信道编码参数，以逗号分隔，如 -r,3 或 -b,8,2，none 表示不做信道编码
+    #     channel  信道参数，以逗号分隔，如 bsc,0.01 或 ge,0.001,0.05,0,0.3 或 bec,0.1
+    #     seed     可选，随机数种子，同时用于生成信源
+    #     SPILL    可选，写出中间结果的目录
+    OUTPUT = argv[1]
+    seed = int(argv[7]) if len(argv) > 7 else None
+    spill_dir = argv[8] if len(argv) > 8 else None
+
+    if argv[3] == '-':
+        source = fromfile(argv[2], dtype=uint8)
+        P0 = None
+    else:
+        P0 = float(argv[2])
+        source = gen_source(P0, int(argv[3]), seed)
+
+    # 信源编码方式，-e 表示由经验分布构建码书，最后的数字为扩展符号的字节数
+    coder, *options = argv[4].split('-')
+    empirical = 'e' in options
+    block = int(options[-1]) if options and options[-1].isdigit() else 1
+    pmf_bytes = None if empirical or P0 is None or coder in ('none', 'adaptive') else pmf_csv(P0)
+
+    row = run_pipeline(source, coder, parse_code(argv[5].split(',')), parse_channel(argv[6].split(',')),
+                       pmf_bytes, block, seed, spill_dir)
+    write_row(OUTPUT, row)
+
+
+if __name__ == '__main__':
+    main(argv)
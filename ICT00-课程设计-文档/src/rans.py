@@ -0,0 +1,238 @@
+""" Range asymmetric numeral system (rANS) coder for integer alphabets.
+
+The coder works with symbol frequencies quantized to a total of 2**PROB_BITS,
+a 32-bit state and 16-bit renormalization, so a symbol of probability p costs
+very close to -log2(p) bits instead of a whole number of bits as with Huffman codes.
+
+rANS is last in, first out: symbols are encoded in reverse order, so that the decoder
+reads them back in forward order. The encoded data is the final state (uint32, little endian)
+followed by the renormalization words (uint16, little endian) in the order the decoder consumes them.
+
+With `lanes` > 1 the symbols are interleaved over independent states, symbol i belongs to lane
+i % lanes, and all lanes are updated at once with NumPy, one row of `lanes` symbols per step.
+The last row is padded with the most probable symbol. The encoded data starts with the final
+states of all lanes, the renormalization words of a row follow in lane order.
+
+```python
+from rans import RansCodec
+codec = RansCodec.from_frequencies([100, 20, 1, 40, 3])
+encoded = codec.encode([0, 3, 0, 1, 4])
+decoded = codec.decode(encoded, 5)
+```
+"""
+
+from numpy import (asarray, zeros, full, empty, repeat, arange, cumsum, argmax, argsort, concatenate,
+                   count_nonzero, frombuffer, uint64, int64)
+
+# Frequencies are quantized to a total of 2**PROB_BITS
+PROB_BITS = 15
+# Lower bound of the normalized state, the state stays in [RANS_L, RANS_L << 16)
+RANS_L = 1 << 16
+# Largest number of interleaved lanes and number of rows per lane aimed at by `lanes_for`
+MAX_LANES = 4096
+ROWS_PER_LANE = 4096
+
+
+def lanes_for(count):
+    """
+    Choose the number of interleaved lanes for `count` symbols.
+    Every lane costs 4 bytes of final state, so short inputs use few lanes.
+
+    :param count: number of symbols
+    :return: number of lanes
+    """
+    return min(MAX_LANES, max(1, count // ROWS_PER_LANE))
+
+
+def normalize_frequencies(frequencies, prob_bits=PROB_BITS):
+    """
+    Quantize frequencies to integers summing to 2**prob_bits.
+    Every symbol with a nonzero frequency keeps a frequency of at least 1.
+
+    :param frequencies: sequence of frequencies, indexed by symbol
+    :param prob_bits: number of bits of the total
+    :return: int64 array of quantized frequencies
+    """
+    frequencies = asarray(frequencies, dtype=float)
+    total = 1 << prob_bits
+    used = frequencies > 0
+    if used.sum() > total:
+        raise ValueError('More than %d symbols with nonzero frequency' % total)
+    if not used.any():
+        raise ValueError('No symbol with nonzero frequency')
+
+    quantized = zeros(len(frequencies), dtype=int64)
+    quantized[used] = (frequencies[used] * total / frequencies.sum()).round().clip(min=1)
+    # Fix the rounding error: add a surplus to the largest frequency,
+    # take a deficit from the largest frequencies first, never dropping a symbol to 0
+    error = total - int(quantized.sum())
+    if error >= 0:
+        quantized[argmax(quantized)] += error
+    else:
+        for s in argsort(-quantized, kind='stable'):
+            take = min(-error, int(quantized[s]) - 1)
+            quantized[s] -= take
+            error += take
+            if error == 0:
+                break
+    return quantized
+
+
+class RansCodec:
+    """
+    rANS codec built from quantized frequencies.
+    """
+
+    def __init__(self, frequencies, prob_bits=PROB_BITS):
+        """
+        Initialize codec with given quantized frequencies.
+
+        :param frequencies: integer frequencies indexed by symbol, summing to 2**prob_bits
+        :param prob_bits: number of bits of the total
+        """
+        self.frequencies = asarray(frequencies, dtype=int64)
+        self.prob_bits = prob_bits
+        if int(self.frequencies.sum()) != 1 << prob_bits:
+            raise ValueError('Frequencies must sum to %d' % (1 << prob_bits))
+        self.starts = cumsum(self.frequencies) - self.frequencies
+        # Symbol of every slot in [0, 2**prob_bits)
+        self.slot_symbol = repeat(arange(len(self.frequencies)), self.frequencies)
+
+    @classmethod
+    def from_frequencies(cls, frequencies, prob_bits=PROB_BITS):
+        """
+        Build a codec for given (not normalized) symbol frequencies.
+
+        :param frequencies: sequence of frequencies, indexed by symbol
+        :param prob_bits: number of bits of the total
+        :return: RansCodec
+        """
+        return cls(normalize_frequencies(frequencies, prob_bits), prob_bits)
+
+    def encode(self, symbols, lanes=1):
+        """
+        Encode given symbols.
+
+        :param symbols: sequence of integer symbols
+        :param lanes: number of interleaved states
+        :return: byte string
+        """
+        if lanes > 1:
+            return self._encode_interleaved(symbols, lanes)
+        n = self.prob_bits
+        frequencies = self.frequencies.tolist()
+        starts = self.starts.tolist()
+        # Renormalize before coding a symbol when the state would leave [RANS_L, RANS_L << 16)
+        bounds = [((RANS_L >> n) << 16) * f for f in frequencies]
+
+        words = []
+        x = RANS_L
+        for s in reversed(asarray(symbols).tolist()):
+            f = frequencies[s]
+            if f == 0:
+                raise KeyError('Symbol without frequency in data: %d' % s)
+            if x >= bounds[s]:
+                words.append(x & 0xFFFF)
+                x >>= 16
+            x = ((x // f) << n) + x % f + starts[s]
+        words.reverse()
+        return x.to_bytes(4, 'little') + asarray(words, dtype='<u2').tobytes()
+
+    def decode(self, data, count, lanes=1):
+        """
+        Decode given data.
+
+        :param data: encoded byte string
+        :param count: number of symbols to decode
+        :param lanes: number of interleaved states
+        :return: int64 array of symbols
+        :raise ValueError: if the data is truncated
+        """
+        # The states are followed by whole 16-bit words
+        if len(data) < 4 * max(lanes, 1) or len(data) % 2:
+            raise ValueError('Truncated data')
+        if lanes > 1:
+            return self._decode_interleaved(data, count, lanes)
+        n = self.prob_bits
+        mask = (1 << n) - 1
+        frequencies = self.frequencies.tolist()
+        starts = self.starts.tolist()
+        slot_symbol = self.slot_symbol.tolist()
+        words = frombuffer(data, dtype='<u2', offset=4).tolist()
+        total = len(words)
+
+        decoded = [0] * count
+        x = int.from_bytes(data[:4], 'little')
+        w = 0
+        for i in range(count):
+            slot = x & mask
+            s = slot_symbol[slot]
+            decoded[i] = s
+            x = frequencies[s] * (x >> n) + slot - starts[s]
+            if x < RANS_L:
+                if w == total:
+                    raise ValueError('Truncated data: out of renormalization words at symbol %d' % i)
+                x = (x << 16) | words[w]
+                w += 1
+        return asarray(decoded, dtype=int64)
+
+    def _encode_interleaved(self, symbols, lanes):
+        """
+        Encode given symbols with `lanes` interleaved states updated by NumPy.
+        """
+        n = self.prob_bits
+        symbols = asarray(symbols, dtype=int64)
+        rows = -(-len(symbols) // lanes)
+        padded = full(rows * lanes, argmax(self.frequencies), dtype=int64)
+        padded[:len(symbols)] = symbols
+        padded = padded.reshape(rows, lanes)
+        if symbols.size and self.frequencies[symbols].min() == 0:
+            raise KeyError('Symbol without frequency in data')
+
+        frequencies = self.frequencies.astype(uint64)
+        starts = self.starts.astype(uint64)
+        bounds = ((RANS_L >> n) << 16) * frequencies
+
+        # Words are collected backwards and reversed at the end,
+        # so the words of a row are emitted in reverse lane order
+        chunks = []
+        x = full(lanes, RANS_L, dtype=uint64)
+        for r in range(rows - 1, -1, -1):
+            s = padded[r]
+            f = frequencies[s]
+            need = x >= bounds[s]
+            if need.any():
+                chunks.append(x[need][::-1] & 0xFFFF)
+                x[need] >>= 16
+            x = ((x // f) << n) + x % f + starts[s]
+        words = concatenate(chunks)[::-1] if chunks else zeros(0, dtype=uint64)
+        return x.astype('<u4').tobytes() + words.astype('<u2').tobytes()
+
+    def _decode_interleaved(self, data, count, lanes):
+        """
+        Decode data of `lanes` interleaved states updated by NumPy.
+        """
+        n = self.prob_bits
+        mask = uint64((1 << n) - 1)
+        frequencies = self.frequencies.astype(uint64)
+        starts = self.starts.astype(uint64)
+        slot_symbol = self.slot_symbol
+        x = frombuffer(data, dtype='<u4', count=lanes).astype(uint64)
+        words = frombuffer(data, dtype='<u2', offset=4 * lanes).astype(uint64)
+
+        rows = -(-count // lanes)
+        decoded = empty((rows, lanes), dtype=int64)
+        w = 0
+        for r in range(rows):
+            slot = x & mask
+            s = slot_symbol[slot]
+            decoded[r] = s
+            x = frequencies[s] * (x >> n) + slot - starts[s]
+            need = x < RANS_L
+            k = count_nonzero(need)
+            if k:
+                if w + k > len(words):
+                    raise ValueError('Truncated data: out of renormalization words at row %d' % r)
+                x[need] = (x[need] << 16) | words[w:w + k]
+                w += k
+        return decoded.ravel()[:count]
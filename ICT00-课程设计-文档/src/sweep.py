@@ -0,0 +1,234 @@
+'''
+参数扫描模块
+
+对 P0 × 信道错误概率 p × 信道编码 × 是否做霍夫曼编码 的每个组合运行一次 pipeline，
+各点在进程池中并行运行，进程数默认为 CPU 核数，结果汇总到同一个 CSV 文件，每个点一行。
+
+P0 相同的点使用同一个信源（由 P0、长度和随机数种子确定），在启动进程池之前生成一次并写入临时文件，
+各进程读取后缓存；霍夫曼码书同样预先构建一次，进程中由 byteSourceEncoder 的磁盘缓存读取。
+每个点完成后立即写入结果文件，再次运行时跳过结果文件中已有的点，因此中断后可以继续。
+出错的点输出到标准错误，不写入结果文件，其他点继续运行，修正后再次运行时重新计算。
+
+网格文件为 JSON，例如：
+{
+    "P0": [0.5, 0.9],
+    "p": [0.001, 0.01, 0.05],
+    "repeat": [3, 5],
+    "hamming": [3, 7],
+    "codes": ["-b,8,2"],
+    "uncoded": true,
+    "huffman": [true, false],
+    "length": 1048576,
+    "seed": 1
+}
+repeat 为重复码的码字长度，hamming 为汉明码的 m，codes 为其他信道编码（格式与 pipeline 相同），
+uncoded 表示是否包括不做信道编码的点，以上除 P0、p 外均可省略。
+
+每个点同时由 analytic 模块给出解码后误码率与平均码长的理论值（EXPECTED_COLUMNS），
+网格中给出 "predict": true 时，有闭式的点只计算理论值而不仿真，仿真的各列留空。
+'''
+
+import csv
+import json
+from sys import argv, stderr
+from os import cpu_count
+from zlib import crc32
+from functools import lru_cache
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from numpy import fromfile, uint8
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from byteSourceEncoder import codec_from_pmf
+from pipeline import gen_source, pmf_csv, parse_code, run_pipeline, write_row, COLUMNS
+from analytic import channel_error, source_coding
+
+# 确定一个点的列，用于跳过已完成的点
+KEY_COLUMNS = ['grid_P0', 'grid_p', 'grid_code', 'grid_huffman', 'length', 'seed']
+
+# 理论值的列，没有闭式时留空
+EXPECTED_COLUMNS = ['expected_decoded_BER', 'expected_block_error', 'expected_average_length']
+
+# 默认的信源长度（字节）
+DEFAULT_LENGTH = 1 << 20
+
+
+def grid_points(grid):
+    '''
+    展开网格中的全部点
+
+    Args:
+        grid (dict): 网格，格式见模块说明
+    Returns:
+        (list): 每个点为以 KEY_COLUMNS 为键的字典，P0 相同的点相邻
+    '''
+    codes = ['none'] if grid.get('uncoded', False) else []
+    codes += ['-r,%d' % n for n in grid.get('repeat', [])]
+    codes += ['-h,%d' % m for m in grid.get('hamming', [])]
+    codes += list(grid.get('codes', []))
+    length = grid.get('length', DEFAULT_LENGTH)
+    seed = grid.get('seed', 0)
+
+    points = []
+    for P0 in grid['P0']:
+        for huffman in grid.get('huffman', [True]):
+            for code in codes:
+                for p in grid['p']:
+                    points.append(dict(zip(KEY_COLUMNS, [P0, p, code, int(huffman), length, seed])))
+    return points
+
+
+def point_key(point):
+    '''
+    点在结果文件中的标识，与 CSV 中读回的字符串一致
+    '''
+    return tuple(str(point[c]) for c in KEY_COLUMNS)
+
+
+def completed_points(out_file_name):
+    '''
+    读取结果文件中已完成的点
+
+    Args:
+        out_file_name (str): 结果文件路径
+    Returns:
+        (set): 已完成的点的标识
+    '''
+    if not Path(out_file_name).is_file():
+        return set()
+    with open(out_file_name, newline='') as in_file:
+        return {tuple(row[c] for c in KEY_COLUMNS) for row in csv.DictReader(in_file)}
+
+
+def source_key(point):
+    '''
+    确定信源的参数，这些参数相同的点使用同一个信源
+    '''
+    return point['grid_P0'], point['length'], point['seed']
+
+
+@lru_cache(maxsize=4)
+def cached_source(source_file):
+    '''
+    读取预先生成的信源，同一进程中 P0 相同的点复用
+    '''
+    return fromfile(source_file, dtype=uint8)
+
+
+def expected(point):
+    '''
+    由 analytic 模块计算一个点的理论值
+
+    Args:
+        point (dict): 以 KEY_COLUMNS 为键的字典
+    Returns:
+        (dict): 以 EXPECTED_COLUMNS 为键的理论值，没有闭式的项为空字符串
+    '''
+    code = parse_code(point['grid_code'].split(','))
+    p = point['grid_p']
+    errors = (p, '') if code is None else channel_error(code, p)
+    if errors is None:
+        errors = ('', '')
+    L = source_coding(point['grid_P0'])[1] if point['grid_huffman'] else 8.0
+    return dict(zip(EXPECTED_COLUMNS, [errors[0], errors[1], L]))
+
+
+def needs_source(point, predict):
+    '''
+    点是否需要仿真，有闭式且只计算理论值的点不需要信源；参数无效的点由 run_point 报错
+    '''
+    if not predict:
+        return True
+    try:
+        return expected(point)['expected_decoded_BER'] == ''
+    except ValueError:
+        return True
+
+
+def run_point(point, predict=False, source_file=None):
+    '''
+    运行一个点
+
+    Args:
+        point (dict): 以 KEY_COLUMNS 为键的字典
+        predict (bool): 有闭式的点是否只计算理论值
+        source_file (str): 预先生成的信源文件，None 时由点的参数生成
+    Returns:
+        (dict): 点的参数、理论值与 run_pipeline 返回的指标
+    '''
+    row = expected(point)
+    if predict and row['expected_decoded_BER'] != '':
+        row.update(dict.fromkeys(COLUMNS, ''))
+        row.update(point)
+        return row
+
+    P0 = point['grid_P0']
+    source = gen_source(*source_key(point)) if source_file is None else cached_source(source_file)
+    coder = 'huffman' if point['grid_huffman'] else 'none'
+    pmf_bytes = pmf_csv(P0) if point['grid_huffman'] else None
+
+    # 每个点的信道噪声由点的参数决定，与运行顺序无关
+    channel_seed = crc32(repr(point_key(point)).encode('utf-8'))
+    row.update(run_pipeline(source, coder, parse_code(point['grid_code'].split(',')), ('bsc', point['grid_p']),
+                            pmf_bytes, seed=channel_seed))
+    row.update(point)
+    return row
+
+
+def sweep(grid, out_file_name, workers=None):
+    '''
+    运行网格中尚未完成的点，结果逐行追加写入结果文件
+
+    Args:
+        grid (dict): 网格，格式见模块说明
+        out_file_name (str): 结果文件路径
+        workers (int): 进程数，默认为 CPU 核数
+    Returns:
+        (int): 本次完成的点数，不包括出错的点
+    '''
+    done = completed_points(out_file_name)
+    points = [point for point in grid_points(grid) if point_key(point) not in done]
+    if not points:
+        return 0
+    predict = grid.get('predict', False)
+
+    # 预先构建霍夫曼码书并写入磁盘缓存，各进程直接读取
+    for P0 in {point['grid_P0'] for point in points if point['grid_huffman']}:
+        codec_from_pmf(pmf_csv(P0))
+
+    completed = 0
+    with TemporaryDirectory() as tmp, ProcessPoolExecutor(workers or cpu_count()) as executor:
+        # 需要仿真的点的每个信源只生成一次并写入临时文件，各进程读取
+        simulated = [point for point in points if needs_source(point, predict)]
+        source_files = {}
+        for i, key in enumerate(dict.fromkeys(source_key(point) for point in simulated)):
+            source_files[key] = str(Path(tmp) / ('source_%d.dat' % i))
+            gen_source(*key).tofile(source_files[key])
+
+        futures = {executor.submit(run_point, point, predict, source_files.get(source_key(point))): point
+                   for point in points}
+        for future in as_completed(futures):
+            try:
+                row = future.result()
+            except Exception as e:
+                # 一个点出错不影响其他点，已完成的点照常写入
+                print('Point %s failed: %s: %s' % (point_key(futures[future]), type(e).__name__, e), file=stderr)
+                continue
+            write_row(out_file_name, row, KEY_COLUMNS + EXPECTED_COLUMNS + COLUMNS)
+            completed += 1
+    return completed
+
+
+def main(argv):
+    # 参数列表：网格文件路径 结果文件路径 [进程数]
+    GRID = argv[1]
+    OUTPUT = argv[2]
+    workers = int(argv[3]) if len(argv) > 3 else None
+
+    with open(GRID, encoding='utf-8') as grid_file:
+        grid = json.load(grid_file)
+    sweep(grid, OUTPUT, workers)
+
+
+if __name__ == '__main__':
+    main(argv)
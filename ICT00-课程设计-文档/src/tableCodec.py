@@ -0,0 +1,211 @@
+""" Table driven canonical prefix codec for integer alphabets.
+
+Symbols are the integers 0..n-1 and the code is fully described by the code length of every symbol
+(0 for symbols without code), so only the code lengths have to be stored.
+Codes are assigned canonically: sorted by (code length, symbol), consecutive values.
+
+Encoding is vectorized with NumPy. Decoding looks up the next `TABLE_BITS` bits in a
+precomputed table, codes longer than that fall back to canonical decoding bit by bit,
+which is rare because long codes belong to improbable symbols.
+This keeps alphabets of 65536 symbols fast.
+
+```python
+from tableCodec import TableCodec
+codec = TableCodec.from_frequencies([100, 20, 1, 40, 3])
+encoded = codec.encode([0, 3, 0, 1, 4])
+decoded = codec.decode(encoded, 5)
+```
+"""
+
+from numpy import (asarray, zeros, arange, lexsort, argsort, repeat, cumsum, bincount,
+                   concatenate, packbits, frombuffer, uint8, uint32, uint64, int64)
+
+from dahuffman import HuffmanCodec
+
+# Number of bits looked up at once while decoding
+TABLE_BITS = 16
+# Longest code length allowed, Huffman codes are limited to it
+MAX_CODE_BITS = 32
+# Number of symbols encoded per vectorized chunk
+CHUNK_SYMBOLS = 1 << 20
+
+
+class TableCodec:
+    """
+    Canonical prefix codec built from code lengths.
+    """
+
+    def __init__(self, bits):
+        """
+        Initialize codec with given code lengths.
+
+        :param bits: code length of every symbol, 0 for symbols without code
+        """
+        self.bits = asarray(bits, dtype=uint8)
+        self.max_bits = int(self.bits.max(initial=0))
+        if self.max_bits > MAX_CODE_BITS:
+            raise ValueError('Code lengths above %d bits are not supported' % MAX_CODE_BITS)
+
+        # Canonical code assignment: symbols sorted by (code length, symbol)
+        used = self.bits > 0
+        order = lexsort((arange(len(self.bits)), self.bits))
+        self.sorted_symbols = order[used[order]]
+        sorted_bits = self.bits[self.sorted_symbols].astype(int64)
+        self.count = bincount(sorted_bits, minlength=self.max_bits + 1)
+        self.first_code = [0] * (self.max_bits + 2)
+        self.first_index = [0] * (self.max_bits + 2)
+        code = 0
+        for n in range(1, self.max_bits + 1):
+            code = (code + int(self.count[n - 1])) << 1 if n > 1 else 0
+            self.first_code[n] = code
+            self.first_index[n] = self.first_index[n - 1] + int(self.count[n - 1])
+        self.values = zeros(len(self.bits), dtype=uint64)
+        rank = arange(len(self.sorted_symbols)) - asarray(self.first_index, dtype=int64)[sorted_bits]
+        self.values[self.sorted_symbols] = (
+            asarray(self.first_code, dtype=uint64)[sorted_bits] + rank.astype(uint64))
+
+        # Primary decode table: all codes up to TABLE_BITS, left aligned, occupy a prefix of the table
+        self.table_bits = min(TABLE_BITS, max(self.max_bits, 1))
+        short = sorted_bits <= self.table_bits
+        spans = 1 << (self.table_bits - sorted_bits[short])
+        self.table_symbol = zeros(1 << self.table_bits, dtype=int64)
+        self.table_length = zeros(1 << self.table_bits, dtype=uint8)
+        filled = int(spans.sum())
+        self.table_symbol[:filled] = repeat(self.sorted_symbols[short], spans)
+        self.table_length[:filled] = repeat(sorted_bits[short], spans)
+
+    @classmethod
+    def from_frequencies(cls, frequencies):
+        """
+        Build a Huffman code for given symbol frequencies.
+        Symbols with zero frequency get no code.
+
+        :param frequencies: sequence of frequencies, indexed by symbol
+        :return: TableCodec
+        """
+        frequencies = asarray(frequencies, dtype=float)
+        used = (frequencies > 0).nonzero()[0]
+        bits = zeros(len(frequencies), dtype=uint8)
+        if len(used):
+            lengths = asarray(HuffmanCodec._code_lengths(list(frequencies[used])))
+            if lengths.max() > MAX_CODE_BITS:
+                lengths = _limit_lengths(frequencies[used], lengths, MAX_CODE_BITS)
+            bits[used] = lengths
+        return cls(bits)
+
+    def encode_bits(self, symbols):
+        """
+        Encode given symbols to an unpacked bit array.
+
+        :param symbols: integer array of symbols
+        :return: uint8 array of bits
+        """
+        symbols = asarray(symbols)
+        bits = self.bits[symbols].astype(int64)
+        if symbols.size and bits.min() == 0:
+            raise KeyError('Symbol without code in data')
+        values = self.values[symbols]
+        ends = cumsum(bits)
+        starts = ends - bits
+        out = zeros(int(ends[-1]) if len(ends) else 0, dtype=uint8)
+        # Write bit j (counted from the most significant one) of every code at once
+        for j in range(self.max_bits):
+            mask = bits > j
+            if not mask.any():
+                break
+            shift = (bits[mask] - 1 - j).astype(uint64)
+            out[starts[mask] + j] = (values[mask] >> shift) & uint64(1)
+        return out
+
+    def encode(self, symbols):
+        """
+        Encode given symbols.
+
+        :param symbols: integer array of symbols
+        :return: byte string, the last byte padded with zeros
+        """
+        symbols = asarray(symbols)
+        chunks = []
+        rest = zeros(0, dtype=uint8)
+        for i in range(0, len(symbols), CHUNK_SYMBOLS):
+            bits = concatenate((rest, self.encode_bits(symbols[i:i + CHUNK_SYMBOLS])))
+            whole = len(bits) - len(bits) % 8
+            chunks.append(packbits(bits[:whole]).tobytes())
+            rest = bits[whole:]
+        chunks.append(packbits(rest).tobytes())
+        return b''.join(chunks)
+
+    def decode(self, data, count):
+        """
+        Decode given data.
+
+        :param data: encoded byte string
+        :param count: number of symbols to decode
+        :return: int64 array of symbols, fewer than `count` if the data ends early
+        """
+        # 32-bit big endian window starting at every byte of the data, zero padded past the end
+        data = bytes(data) + bytes(4)
+        d = frombuffer(data, dtype=uint8).astype(uint32)
+        windows = ((d[:-3] << 24) | (d[1:-2] << 16) | (d[2:-1] << 8) | d[3:]).tolist()
+        shift = 32 - self.table_bits
+        mask = (1 << self.table_bits) - 1
+        table_symbol = self.table_symbol.tolist()
+        table_length = self.table_length.tolist()
+        end = (len(data) - 4) * 8
+
+        decoded = [0] * count
+        p = 0
+        for i in range(count):
+            # Truncated data: stop at the end like dahuffman, a code running past it is dropped
+            if p >= end:
+                count = i
+                break
+            w = (windows[p >> 3] >> (shift - (p & 7))) & mask
+            n = table_length[w]
+            if n:
+                decoded[i] = table_symbol[w]
+                p += n
+            else:
+                decoded[i], p = self._decode_long(data, p)
+        if p > end:
+            count -= 1
+        return asarray(decoded[:count], dtype=int64)
+
+    def _decode_long(self, data, p):
+        """
+        Canonical decoding of a code longer than the lookup table, bit by bit.
+
+        :return: (symbol, position after the code)
+        """
+        code = 0
+        for n in range(1, self.max_bits + 1):
+            code = (code << 1) | ((data[(p + n - 1) >> 3] >> (7 - ((p + n - 1) & 7))) & 1)
+            offset = code - self.first_code[n]
+            if 0 <= offset < self.count[n]:
+                return int(self.sorted_symbols[self.first_index[n] + offset]), p + n
+        raise ValueError('Invalid code at bit %d' % p)
+
+
+def _limit_lengths(frequencies, lengths, limit):
+    """
+    Limit Huffman code lengths to `limit` bits.
+
+    Too long codes are clamped, then codes are lengthened starting from the longest ones below the
+    limit until the Kraft inequality holds again. The resulting lengths are handed out
+    to the symbols by decreasing frequency.
+
+    :return: array of code lengths
+    """
+    count = bincount(lengths.clip(max=limit), minlength=limit + 1).tolist()
+    total = sum(c << (limit - n) for n, c in enumerate(count) if n)
+    while total > 1 << limit:
+        n = limit - 1
+        while count[n] == 0:
+            n -= 1
+        count[n] -= 1
+        count[n + 1] += 1
+        total -= 1 << (limit - n - 1)
+    order = argsort(-frequencies, kind='stable')
+    limited = zeros(len(lengths), dtype=int64)
+    limited[order] = repeat(arange(limit + 1), count)
+    return limited